@@ -4,13 +4,20 @@ Core components for the camera streaming client.
 
 This package contains the main components:
 - video_recorder: Video recording and management
+- segment_manifest: Per-camera index of recorded segment files
 - stream_viewer: Video stream display and handling
 - mqtt_listener: MQTT communication handling
+- sensor_store: In-memory per-topic sensor time series
+- server_registry: Live list of servers from presence messages
+- async_client: Single-process asyncio multi-stream client
 """
 
 from .video_recorder import VideoRecorder
 from .stream_viewer import StreamViewer
 from .mqtt_listener import MQTTListener
 from .sensor_logger import SensorDataLogger
+from .server_registry import ServerRegistry
+from .segment_manifest import SegmentManifest
+from .sensor_store import SensorStore
 
-__all__ = ['VideoRecorder', 'StreamViewer', 'MQTTListener', 'SensorDataLogger']
+__all__ = ['VideoRecorder', 'StreamViewer', 'MQTTListener', 'SensorDataLogger', 'ServerRegistry', 'SegmentManifest', 'SensorStore']
@@ -0,0 +1,330 @@
+import cv2
+import time
+import socket
+import asyncio
+import logging
+import threading
+from time import perf_counter_ns
+from concurrent.futures import ThreadPoolExecutor
+import config as cfg
+from protocol import (PROTOCOL_V1, PROTOCOL_V2, V1_HEADER, V2_HEADER, HELLO_HEADER, HELLO_MAGIC,
+                      ProtocolError, pack_hello, try_unpack_hello, unpack_v2_header)
+from .stream_viewer import StreamViewer, START_COMMANDS, STOP_COMMANDS
+from .server_registry import ServerRegistry
+from .sensor_ingest import queue_depth
+
+class AsyncStreamViewer(StreamViewer):
+    """asyncio 스트림으로 수신하는 뷰어
+
+    프레임 처리 로직(순서 추적, pre-roll, 녹화)은 StreamViewer와 같고, 수신은 이벤트 루프에서,
+    JPEG 디코딩은 공유 작업 스레드 풀에서 수행합니다. 화면 표시는 MultiStreamClient가 모아서 처리합니다.
+    """
+
+    def __init__(self, server_ip: str):
+        super().__init__(server_ip)
+        self.reader = None
+        self.writer = None
+        self.display_frame = None  # 다음 화면 갱신 때 표시할 프레임
+        self._receiving = asyncio.Event()  # 녹화를 시작하는 동안에는 해제되어 프레임 처리를 멈춤
+        self._receiving.set()
+
+    async def connect_async(self) -> bool:
+        """서버 연결 및 핸드셰이크 (미지원 서버는 v1으로 재연결)"""
+        try:
+            await self._open()
+            if cfg.STREAM_PROTOCOL_VERSION >= PROTOCOL_V2 and not await self._handshake_async():
+                self._close_stream()
+                await self._open()
+                self.protocol_version = PROTOCOL_V1
+            logging.info(f"[{self.server_ip}] Connected to streaming server (protocol v{self.protocol_version})")
+            return True
+        except OSError as e:
+            logging.error(f"[{self.server_ip}] Connection failed: {e}")
+            return False
+
+    async def _open(self):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if cfg.STREAM_SO_RCVBUF:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, cfg.STREAM_SO_RCVBUF)
+        sock.setblocking(False)
+        try:
+            await asyncio.get_running_loop().sock_connect(sock, (self.server_ip, cfg.STREAM_PORT))
+        except OSError:
+            sock.close()
+            raise
+        self.reader, self.writer = await asyncio.open_connection(sock=sock)
+
+    async def _handshake_async(self) -> bool:
+        try:
+            self.writer.write(pack_hello(self.hello_message()))
+            header = await asyncio.wait_for(self.reader.readexactly(HELLO_HEADER.size), cfg.HANDSHAKE_TIMEOUT * 4)
+            magic, length = HELLO_HEADER.unpack(header)
+            if magic != HELLO_MAGIC:
+                raise ProtocolError("Server did not answer handshake")
+            body = await asyncio.wait_for(self.reader.readexactly(length), cfg.HANDSHAKE_TIMEOUT * 4)
+            reply, _ = try_unpack_hello(header + body)
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ProtocolError) as e:
+            logging.warning(f"[{self.server_ip}] Handshake failed ({e}), falling back to v1")
+            return False
+        self.accept_handshake(reply)
+        return True
+
+    async def _receive_header_async(self):
+        if self.protocol_version == PROTOCOL_V2:
+            return unpack_v2_header(await self.reader.readexactly(V2_HEADER.size))
+        return 0, V1_HEADER.unpack(await self.reader.readexactly(V1_HEADER.size))[0], None, None
+
+    async def run(self, executor: ThreadPoolExecutor, decode_slots: asyncio.Semaphore, on_first_frame=None):
+        """연결이 끊길 때까지 프레임 수신 및 처리
+
+        Args:
+            executor: JPEG 디코딩용 작업 스레드 풀
+            decode_slots: 동시에 대기할 수 있는 디코딩 작업 수 제한
+            on_first_frame: 첫 프레임 수신 시 (server_ip, time.time())로 호출할 함수
+        """
+        loop = asyncio.get_running_loop()
+        latency = self.latency
+        while True:
+            try:
+                flags, msg_size, sequence, capture_us = await self._receive_header_async()
+                if __debug__ and latency is not None:
+                    start = perf_counter_ns()
+                data = await self.reader.readexactly(msg_size) if msg_size else b''
+            except (asyncio.IncompleteReadError, OSError):
+                logging.warning(f"[{self.server_ip}] Connection lost")
+                return
+            except ProtocolError as e:
+                logging.error(f"[{self.server_ip}] {e}")
+                return
+            if not data:
+                continue
+            if not self._receiving.is_set():
+                await self._receiving.wait()
+            if __debug__ and latency is not None:
+                received = perf_counter_ns()
+                latency.record('receive', received - start)
+                latency.tick(received)
+
+            first = self.first_frame_at is None
+            decode = self.accept_frame(flags, sequence, capture_us, data)
+            if first and self.first_frame_at is not None and on_first_frame is not None:
+                on_first_frame(self.server_ip, self.first_frame_at)
+            if not decode:
+                continue
+
+            # 스트림별로 순서대로 디코딩하되, 여러 스트림이 작업 스레드 풀을 공유
+            async with decode_slots:
+                frame = await loop.run_in_executor(executor, self.decode, data, self.decode_scale, self._full_decode)
+            if frame is None:
+                logging.warning(f"[{self.server_ip}] Frame decode failed")
+                continue
+            if __debug__ and latency is not None:
+                start = perf_counter_ns()
+            show = self.deliver(frame)
+            if __debug__ and latency is not None:
+                latency.record('handoff', perf_counter_ns() - start)
+            if show:
+                # 녹화기로 넘긴 풀 버퍼는 화면 갱신 전에 다음 디코딩에 재사용될 수 있으므로 복사본 표시
+                self.display_frame = self.display_copy(frame) if self._full_decode else frame
+
+    async def handle_command_async(self, command: str, session_id: str, executor: ThreadPoolExecutor):
+        """녹화 명령 처리 (녹화기 시작/정지는 executor에서 수행하여 이벤트 루프를 막지 않음)
+
+        녹화기를 시작하는 동안에는 이 스트림의 프레임 처리를 멈추므로, StreamViewer와 같이
+        pre-roll 요청과 녹화 시작이 다음 프레임보다 먼저 적용됩니다.
+        """
+        loop = asyncio.get_running_loop()
+        normalized = command.lower().strip()
+        if normalized in START_COMMANDS:
+            if self.recorder.is_recording:
+                return
+            self._receiving.clear()
+            try:
+                self._start_preroll()
+                await loop.run_in_executor(executor, self.recorder.start_recording, session_id)
+            finally:
+                self._receiving.set()
+        elif normalized in STOP_COMMANDS:
+            self._end_preroll()
+            # 녹화 스레드 종료와 ffmpeg 종료 대기
+            await loop.run_in_executor(executor, self.recorder.stop_recording)
+
+    def send_control(self, message: dict):
+        self.writer.write(pack_hello(message))
+
+    def _close_stream(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def cleanup(self):
+        """연결을 닫고 진행 중인 녹화를 마무리"""
+        self._close_stream()
+        if self.recorder.is_recording:
+            self.recorder.stop_recording()
+        if self.frame_bus is not None:
+            self.frame_bus.close()
+            self.frame_bus = None
+        self.dump_latency()
+        try:
+            cv2.destroyWindow(self.window_name)
+        except cv2.error:
+            pass
+
+class MultiStreamClient:
+    """모든 서버 스트림을 하나의 asyncio 이벤트 루프에서 수신하는 클라이언트
+
+    서버별 프로세스 대신 서버별 코루틴을 사용하고, JPEG 디코딩은 크기가 제한된 작업 스레드 풀에서
+    수행합니다. MQTT 리스너가 보낸 이벤트(presence, 탐색 응답, 녹화 명령, 센서 데이터)는
+    브리지 스레드가 이벤트 루프로 전달합니다. 녹화 명령과 센서 데이터는 받은 순서대로 하나씩
+    처리하되, 파일 I/O와 녹화 정지 대기는 I/O 스레드 풀에서 수행합니다.
+    """
+
+    def __init__(self, event_queue, sensor_logger=None, decode_workers: int = 4, display_fps: float = 15.0):
+        self.event_queue = event_queue
+        self.sensor_logger = sensor_logger
+        self.decode_workers = decode_workers
+        self.display_fps = display_fps
+        self.registry = ServerRegistry(timeout=cfg.PRESENCE_TIMEOUT)
+        self.viewers = {}  # server_ip -> AsyncStreamViewer
+        self.tasks = {}  # server_ip -> asyncio.Task
+        self.executor = None
+        self.io_executor = None
+        self.decode_slots = None
+        self.loop = None
+        self._work = None  # 순서대로 처리할 (코루틴 함수, 인자) 대기열
+
+    async def run(self):
+        """이벤트 루프 실행 (취소될 때까지)"""
+        self.loop = asyncio.get_running_loop()
+        self.executor = ThreadPoolExecutor(max_workers=self.decode_workers, thread_name_prefix="Decode")
+        self.io_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ClientIO")
+        self.decode_slots = asyncio.Semaphore(self.decode_workers * 2)
+        self._work = asyncio.Queue()
+        threading.Thread(target=self._pump_events, name="EventBridge", daemon=True).start()
+        logging.info(f"Async client started (decode workers={self.decode_workers})")
+        try:
+            await asyncio.gather(self._display_loop(), self._expire_loop(), self._work_loop())
+        finally:
+            for server_ip in list(self.tasks):
+                self.stop_viewer(server_ip)
+            await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+            self.executor.shutdown(wait=False)
+            self.io_executor.shutdown(wait=False)
+
+    def _pump_events(self):
+        """multiprocessing 큐의 이벤트를 이벤트 루프로 전달"""
+        while True:
+            data = self.event_queue.get()
+            self.loop.call_soon_threadsafe(self.on_event, data)
+
+    def on_event(self, data):
+        """MQTT 리스너 이벤트 처리"""
+        try:
+            if not isinstance(data, tuple):
+                # 폴링 탐색 응답으로 받은 서버 IP
+                logging.info(f"Received data from queue: {data}")
+                self.registry.seen(data)
+                self.start_viewer(data)
+                return
+            command, payload = data
+            if command == "server_online":
+                server_ip, presence = payload
+                self.registry.seen(server_ip, presence, heartbeat=True)
+                self.start_viewer(server_ip)
+            elif command == "server_offline":
+                self.registry.remove(payload)
+                self.stop_viewer(payload)
+            elif command == "sensor_batch":
+                if self.sensor_logger is not None:
+                    self._work.put_nowait((self._save_batch, (payload, queue_depth(self.event_queue))))
+            else:
+                self._work.put_nowait((self.handle_command, (command, payload)))
+        except Exception:
+            logging.exception("Error handling client event")
+
+    async def _work_loop(self):
+        """녹화 명령과 센서 데이터를 받은 순서대로 처리"""
+        while True:
+            function, args = await self._work.get()
+            try:
+                await function(*args)
+            except Exception:
+                logging.exception("Error handling client event")
+
+    async def _save_batch(self, batch, depth: int):
+        await self.loop.run_in_executor(self.io_executor, self.sensor_logger.save_batch, batch, depth)
+
+    async def handle_command(self, command: str, session_id: str = None):
+        """녹화 명령을 모든 뷰어에 동시에 전달 (session_id: 녹화 세션 ID)"""
+        logging.info(f"Received command: {command}")
+        if self.sensor_logger is not None:
+            if command == "recording_start":
+                await self.loop.run_in_executor(self.io_executor, self.sensor_logger.start_recording, session_id)
+            elif command == "recording_stop":
+                await self.loop.run_in_executor(self.io_executor, self.sensor_logger.stop_recording)
+        if not self.viewers:
+            logging.warning("No active viewers to send command to")
+        await asyncio.gather(*(viewer.handle_command_async(command, session_id, self.io_executor)
+                               for viewer in list(self.viewers.values())))
+
+    def start_viewer(self, server_ip: str):
+        """서버 스트림 수신 시작 (이미 수신 중이면 무시)"""
+        task = self.tasks.get(server_ip)
+        if task is not None and not task.done():
+            return
+        self.tasks[server_ip] = self.loop.create_task(self._run_viewer(server_ip), name=f"Stream-{server_ip}")
+        logging.info(f"Started viewer for {server_ip}")
+
+    def stop_viewer(self, server_ip: str):
+        """서버 스트림 수신 중지"""
+        task = self.tasks.get(server_ip)
+        if task is not None and not task.done():
+            task.cancel()
+            logging.info(f"Stopped viewer for {server_ip}")
+
+    async def _run_viewer(self, server_ip: str):
+        viewer = AsyncStreamViewer(server_ip)
+        try:
+            # 연결에 실패해도 생성자가 만든 공유 메모리 등은 정리
+            if not await viewer.connect_async():
+                return
+            self.viewers[server_ip] = viewer
+            await viewer.run(self.executor, self.decode_slots, self.registry.first_frame)
+        finally:
+            self.viewers.pop(server_ip, None)
+            if viewer.recorder.is_recording:
+                await self.loop.run_in_executor(self.io_executor, viewer.recorder.stop_recording)
+            viewer.cleanup()
+
+    async def _display_loop(self):
+        """모든 스트림의 최신 프레임을 일정 주기로 화면에 표시"""
+        interval = 1.0 / self.display_fps
+        while True:
+            start = time.monotonic()
+            shown = False
+            for viewer in list(self.viewers.values()):
+                frame, viewer.display_frame = viewer.display_frame, None
+                if frame is not None:
+                    if __debug__ and viewer.latency is not None:
+                        shown_at = perf_counter_ns()
+                    viewer.show(frame)
+                    if __debug__ and viewer.latency is not None:
+                        viewer.latency.record('display', perf_counter_ns() - shown_at)
+                    shown = True
+            if shown:
+                cv2.waitKey(1)
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - start)))
+
+    async def _expire_loop(self):
+        """하트비트가 끊긴 서버의 스트림 정리"""
+        while True:
+            await asyncio.sleep(1.0)
+            for server_ip in self.registry.expire():
+                self.stop_viewer(server_ip)
+
+def run_async_client(event_queue, sensor_logger=None):
+    """단일 프로세스 asyncio 클라이언트 실행 (블로킹)"""
+    client = MultiStreamClient(event_queue, sensor_logger, decode_workers=cfg.ASYNC_DECODE_WORKERS,
+                               display_fps=cfg.ASYNC_DISPLAY_FPS)
+    asyncio.run(client.run())
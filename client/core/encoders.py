@@ -0,0 +1,224 @@
+import os
+import cv2
+import shutil
+import logging
+import subprocess
+import multiprocessing
+import numpy as np
+
+class OpenCVEncoder:
+    """cv2.VideoWriter(mp4v) 기반 인코더 (추가 설치 없이 사용 가능)
+
+    Attributes:
+        path (str): 기록 중인 파일 경로
+    """
+
+    extension = ".mp4"
+    copies_frames = False
+
+    def __init__(self, path_without_ext: str, width: int, height: int, fps: float, **options):
+        self.path = path_without_ext + self.extension
+        self._writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*'mp4v'), fps, (width, height))
+        if not self._writer.isOpened():
+            raise IOError(f"Failed to create video writer for {self.path}")
+
+    def write(self, frame: np.ndarray):
+        self._writer.write(frame)
+
+    def release(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+def x264_command(ffmpeg: str, path: str, width: int, height: int, fps: float,
+                 preset: str = 'veryfast', crf: int = 23, threads: int = 0) -> list:
+    """BGR 원시 프레임을 표준 입력으로 받아 libx264로 인코딩하는 ffmpeg 명령 생성"""
+    return [ffmpeg, '-hide_banner', '-loglevel', 'error', '-y',
+            '-f', 'rawvideo', '-pix_fmt', 'bgr24', '-s', f'{width}x{height}', '-framerate', str(fps),
+            '-i', 'pipe:0',
+            '-c:v', 'libx264', '-preset', preset, '-crf', str(crf), '-threads', str(threads),
+            '-pix_fmt', 'yuv420p', '-movflags', '+faststart', path]
+
+class FFmpegEncoder:
+    """ffmpeg 프로세스에 원시 프레임을 파이프로 보내 libx264로 인코딩하는 인코더
+
+    preset/crf/threads로 속도와 파일 크기를 조절합니다. 인코딩은 ffmpeg 프로세스에서 수행되므로
+    클라이언트 프로세스의 GIL과 무관하게 별도 코어를 사용합니다.
+    """
+
+    extension = ".mp4"
+    copies_frames = True  # 프레임을 파이프로 복사해 전달
+
+    def __init__(self, path_without_ext: str, width: int, height: int, fps: float,
+                 preset: str = 'veryfast', crf: int = 23, threads: int = 0):
+        ffmpeg = shutil.which('ffmpeg')
+        if ffmpeg is None:
+            raise IOError("ffmpeg not found")
+        self.path = path_without_ext + self.extension
+        self._frame_size = width * height * 3
+        command = x264_command(ffmpeg, self.path, width, height, fps, preset, crf, threads)
+        self._process = subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    def write(self, frame: np.ndarray):
+        if frame.nbytes != self._frame_size:
+            raise ValueError(f"Frame size changed during segment ({frame.shape})")
+        self._process.stdin.write(memoryview(np.ascontiguousarray(frame)).cast('B'))
+
+    def release(self):
+        """입력을 닫고 ffmpeg가 파일을 마무리할 때까지 대기"""
+        if self._process is None:
+            return
+        try:
+            self._process.stdin.close()
+            self._process.wait(timeout=30.0)
+        except subprocess.TimeoutExpired:
+            logging.error(f"ffmpeg did not finish writing {self.path}, killing it")
+            self._process.kill()
+            self._process.wait()
+        self._process = None
+
+# 디코딩된 프레임을 인코딩하는 백엔드 ('mjpeg'는 디코딩 없이 JPEG를 그대로 저장하는 MJPEGSegmentWriter 사용)
+ENCODERS = {
+    'opencv': OpenCVEncoder,
+    'ffmpeg': FFmpegEncoder,
+}
+
+def create_encoder(backend: str, path_without_ext: str, width: int, height: int, fps: float, options: dict = None):
+    """백엔드 이름으로 인코더 생성 (ffmpeg가 없으면 OpenCV로 대체)"""
+    if backend == 'ffmpeg' and shutil.which('ffmpeg') is None:
+        logging.warning("ffmpeg not found. Falling back to OpenCV encoder")
+        backend = 'opencv'
+    encoder_class = ENCODERS.get(backend)
+    if encoder_class is None:
+        raise ValueError(f"Unknown encoder backend: {backend}")
+    if encoder_class is OpenCVEncoder:
+        options = None
+    return encoder_class(path_without_ext, width, height, fps, **(options or {}))
+
+def _encoder_process_main(conn):
+    """인코더 프로세스 메인 루프
+
+    ('open', ...) → 'frame' + 프레임 바이트 반복 → ('close',) 순서로 파일 단위 명령을 처리합니다.
+    프레임은 미리 할당한 버퍼로 직접 수신하여 프레임마다 메모리를 할당하지 않습니다.
+    프레임 기록 오류는 파이프 순서가 어긋나지 않도록 close 응답으로 전달합니다.
+    """
+    encoder = None
+    buffer = frame = None
+    error = None
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break
+        if message == 'frame':
+            try:
+                if buffer is None:
+                    conn.recv_bytes()
+                    continue
+                conn.recv_bytes_into(buffer)
+                if error is None:
+                    encoder.write(frame)
+            except Exception as e:
+                error = error or f"{type(e).__name__}: {e}"
+            continue
+
+        command = message[0]
+        if command == 'stop':
+            break
+        try:
+            reply = None
+            if command == 'open':
+                _, backend, path_without_ext, width, height, fps, options = message
+                error = None
+                encoder = create_encoder(backend, path_without_ext, width, height, fps, options)
+                buffer = bytearray(width * height * 3)
+                frame = np.frombuffer(buffer, np.uint8).reshape(height, width, 3)
+                reply = encoder.path
+            elif command == 'close':
+                if encoder is not None:
+                    encoder.release()
+                encoder = None
+                buffer = frame = None
+                if error is not None:
+                    raise IOError(error)
+            conn.send(('ok', reply))
+        except Exception as e:
+            conn.send(('error', f"{type(e).__name__}: {e}"))
+    if encoder is not None:
+        encoder.release()
+    conn.close()
+
+class EncoderProcess:
+    """인코더를 별도 프로세스에서 실행하는 프록시
+
+    인코더와 같은 write()/release() 인터페이스를 제공하므로 녹화 스레드는 인코더 종류와 무관하게
+    사용할 수 있습니다. 카메라마다 인코더 프로세스를 두어 여러 카메라의 인코딩이 여러 코어에서
+    병렬로 수행되고, 파일을 분할해도 프로세스는 재사용합니다.
+
+    Attributes:
+        path (str): 기록 중인 파일 경로
+        extension (str): 파일 확장자
+    """
+
+    REPLY_TIMEOUT = 60.0
+    copies_frames = True  # 프레임을 파이프로 복사해 전달
+
+    def __init__(self, name: str = "Encoder"):
+        context = multiprocessing.get_context('spawn')  # 스레드가 있는 프로세스에서 fork하지 않음
+        self._conn, child_conn = context.Pipe()
+        self._process = context.Process(target=_encoder_process_main, args=(child_conn,), name=name, daemon=True)
+        self._process.start()
+        child_conn.close()
+        self.path = None
+        self.extension = None
+
+    def open(self, backend: str, path_without_ext: str, width: int, height: int, fps: float, options: dict = None):
+        """새 파일 열기
+
+        Returns:
+            EncoderProcess: 자기 자신 (인코더처럼 사용)
+        """
+        self._conn.send(('open', backend, path_without_ext, width, height, fps, options))
+        self.path = self._reply()
+        self.extension = os.path.splitext(self.path)[1]
+        return self
+
+    def write(self, frame: np.ndarray):
+        self._conn.send('frame')
+        # 다차원 배열은 len()이 행 수이므로 1차원 바이트 뷰로 전송
+        self._conn.send_bytes(memoryview(np.ascontiguousarray(frame)).cast('B'))
+
+    def release(self):
+        """현재 파일을 마무리 (인코더 프로세스가 파일을 닫을 때까지 대기)"""
+        if self.path is None:
+            return
+        self.path = None
+        self._conn.send(('close',))
+        self._reply()
+
+    def is_alive(self) -> bool:
+        """인코더 프로세스가 실행 중인지 여부"""
+        return self._process.is_alive()
+
+    @property
+    def exitcode(self):
+        return self._process.exitcode
+
+    def stop(self):
+        """인코더 프로세스 종료"""
+        try:
+            self._conn.send(('stop',))
+        except OSError:
+            pass
+        self._process.join(timeout=5.0)
+        if self._process.is_alive():
+            self._process.terminate()
+        self._conn.close()
+
+    def _reply(self):
+        if not self._conn.poll(self.REPLY_TIMEOUT):
+            raise IOError("Encoder process did not respond")
+        status, value = self._conn.recv()
+        if status == 'error':
+            raise IOError(f"Encoder process error: {value}")
+        return value
@@ -0,0 +1,228 @@
+import sys
+import time
+import logging
+import numpy as np
+from multiprocessing import shared_memory
+
+BUS_MAGIC = 0x46425553  # 'FBUS'
+# 공유 메모리 헤더: magic, 슬롯 수, 슬롯 데이터 크기, 마지막으로 게시한 시퀀스
+BUS_HEADER = np.dtype({'names': ['magic', 'slots', 'slot_bytes', 'head'],
+                       'formats': ['<u8', '<u8', '<u8', '<u8'],
+                       'offsets': [0, 8, 16, 24], 'itemsize': 64})
+# 슬롯 헤더: sequence가 0이면 기록 중 (seqlock), 그 외에는 슬롯에 담긴 프레임의 시퀀스
+SLOT_HEADER = np.dtype({'names': ['sequence', 'timestamp', 'height', 'width', 'channels', 'nbytes'],
+                        'formats': ['<u8', '<f8', '<u4', '<u4', '<u4', '<u8'],
+                        'offsets': [0, 8, 16, 20, 24, 32], 'itemsize': 64})
+
+def bus_name(server_ip: str, prefix: str = "cambus_") -> str:
+    """카메라(서버 IP)별 공유 메모리 이름"""
+    return prefix + server_ip.replace('.', '_').replace(':', '_')
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """기존 공유 메모리에 연결 (읽기 프로세스가 종료될 때 공유 메모리를 지우지 않도록 추적 해제)"""
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    if sys.platform == 'win32':
+        return shared_memory.SharedMemory(name=name)
+    # 3.12 이하는 연결만 해도 추적 대상으로 등록되어 읽기 프로세스 종료 시 공유 메모리가 삭제되므로
+    # 연결하는 동안 등록을 막음 (등록 후 해제하면 같은 프로세스의 쓰기 측 등록까지 지워짐)
+    from multiprocessing import resource_tracker
+    register = resource_tracker.register
+    resource_tracker.register = lambda name, rtype: None
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+class _BusLayout:
+    """공유 메모리 위의 헤더/슬롯 배열 뷰"""
+
+    def __init__(self, shm: shared_memory.SharedMemory, slots: int, slot_bytes: int):
+        self.shm = shm
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.header = np.ndarray((), BUS_HEADER, shm.buf, 0)
+        self.slot_headers = np.ndarray((slots,), SLOT_HEADER, shm.buf, BUS_HEADER.itemsize)
+        data_offset = BUS_HEADER.itemsize + slots * SLOT_HEADER.itemsize
+        self.data = np.ndarray((slots, slot_bytes), np.uint8, shm.buf, data_offset)
+
+    @staticmethod
+    def size(slots: int, slot_bytes: int) -> int:
+        return BUS_HEADER.itemsize + slots * (SLOT_HEADER.itemsize + slot_bytes)
+
+    def close(self):
+        # 공유 메모리를 참조하는 배열을 먼저 해제해야 close() 가능
+        self.header = self.slot_headers = self.data = None
+        self.shm.close()
+
+class FrameBus:
+    """카메라별 디코딩 프레임 공유 메모리 링 (쓰기 측)
+
+    뷰어가 한 번 디코딩한 프레임을 slots개의 슬롯에 돌아가며 기록하고, 같은 PC의 다른 프로세스
+    (모자이크 화면, 분석, 썸네일 등)는 FrameBusReader로 읽습니다. 프레임을 프로세스 간에 pickle로
+    주고받지 않으며, 읽는 쪽은 각자 커서를 가지므로 쓰기 측은 잠금이나 읽기 측을 기다리지 않습니다.
+    느린 읽기 측은 덮어써진 프레임을 건너뜁니다.
+
+    Attributes:
+        name (str): 공유 메모리 이름
+        slots (int): 슬롯 수
+        slot_bytes (int): 슬롯당 최대 프레임 크기 (바이트)
+        published (int): 게시한 프레임 수
+        oversized (int): 슬롯보다 커서 게시하지 못한 프레임 수
+    """
+
+    def __init__(self, name: str, slots: int = 8, slot_bytes: int = 1920 * 1080 * 3):
+        if slots < 2:
+            raise ValueError("Frame bus needs at least 2 slots")
+        self.name = name
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.published = 0
+        self.oversized = 0
+        size = _BusLayout.size(slots, slot_bytes)
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # 이전 실행이 비정상 종료되어 남은 공유 메모리는 지우고 다시 생성
+            logging.warning(f"Frame bus {name} already exists. Recreating it")
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self._layout = _BusLayout(shm, slots, slot_bytes)
+        self._layout.header['slots'] = slots
+        self._layout.header['slot_bytes'] = slot_bytes
+        self._layout.header['head'] = 0
+        self._layout.header['magic'] = BUS_MAGIC
+
+    def publish(self, frame: np.ndarray, timestamp: float = None) -> int:
+        """프레임을 다음 슬롯에 복사하여 게시
+
+        Returns:
+            int: 게시한 프레임의 시퀀스 (슬롯보다 큰 프레임이면 0)
+        """
+        if frame.nbytes > self.slot_bytes:
+            self.oversized += 1
+            if self.oversized == 1:
+                logging.warning(f"Frame bus {self.name}: frame {frame.shape} exceeds slot size {self.slot_bytes}")
+            return 0
+        layout = self._layout
+        sequence = int(layout.header['head']) + 1
+        index = sequence % self.slots
+        slot = layout.slot_headers[index]  # 구조체 배열 원소는 공유 메모리를 직접 가리키는 뷰
+        # 기록 중 표시 → 데이터/메타데이터 기록 → 시퀀스 기록 순서로 써서 읽기 측이 찢어진 프레임을 감지
+        slot['sequence'] = 0
+        height, width = frame.shape[:2]
+        channels = frame.shape[2] if frame.ndim == 3 else 1
+        layout.data[index, :frame.nbytes] = np.ascontiguousarray(frame).reshape(-1)
+        slot['timestamp'] = time.time() if timestamp is None else timestamp
+        slot['height'] = height
+        slot['width'] = width
+        slot['channels'] = channels
+        slot['nbytes'] = frame.nbytes
+        slot['sequence'] = sequence
+        layout.header['head'] = sequence
+        self.published += 1
+        return sequence
+
+    def close(self):
+        """공유 메모리 해제 및 삭제 (연결된 읽기 측은 이후 새 프레임을 받지 못함)"""
+        if self._layout is None:
+            return
+        shm = self._layout.shm
+        self._layout.close()
+        self._layout = None
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+class FrameBusReader:
+    """FrameBus 읽기 측 (다른 프로세스에서 사용)
+
+    읽기 측마다 마지막으로 읽은 시퀀스(커서)를 자기 프로세스에 보관하므로 읽기 측 수에 제한이
+    없고 쓰기 측에 아무것도 기록하지 않습니다. 읽는 동안 슬롯이 덮어써지면 다시 시도합니다.
+
+    Attributes:
+        cursor (int): 마지막으로 읽은 시퀀스
+        skipped (int): 뒤처져서 건너뛴 프레임 수
+    """
+
+    def __init__(self, name: str):
+        shm = _attach(name)
+        header = np.ndarray((), BUS_HEADER, shm.buf, 0)
+        if int(header['magic']) != BUS_MAGIC:
+            del header
+            shm.close()
+            raise ValueError(f"{name} is not a frame bus")
+        slots, slot_bytes = int(header['slots']), int(header['slot_bytes'])
+        del header
+        self.name = name
+        self._layout = _BusLayout(shm, slots, slot_bytes)
+        self.cursor = int(self._layout.header['head'])  # 연결 이후 게시된 프레임부터 읽음
+        self.skipped = 0
+
+    @property
+    def head(self) -> int:
+        """쓰기 측이 마지막으로 게시한 시퀀스"""
+        return int(self._layout.header['head'])
+
+    def read(self, latest: bool = False, out: np.ndarray = None):
+        """다음 프레임 읽기 (기다리지 않음)
+
+        Args:
+            latest: True면 밀린 프레임을 모두 건너뛰고 가장 최근 프레임을 읽음
+            out: 프레임을 복사할 버퍼 (크기가 맞으면 재사용, 아니면 새로 할당)
+
+        Returns:
+            tuple: (sequence, timestamp, frame), 새 프레임이 없으면 None
+        """
+        layout = self._layout
+        while True:
+            head = int(layout.header['head'])
+            if head <= self.cursor:
+                return None
+            sequence = head if latest else self.cursor + 1
+            if head - sequence >= layout.slots - 1:
+                # 링 한 바퀴 이상 뒤처짐: 곧 덮어써질 슬롯은 건너뜀
+                sequence = head - layout.slots + 2
+            index = sequence % layout.slots
+            slot = layout.slot_headers[index]
+            if int(slot['sequence']) != sequence:
+                self._skip_to(sequence)
+                continue
+            timestamp = float(slot['timestamp'])
+            shape = (int(slot['height']), int(slot['width']), int(slot['channels']))
+            nbytes = int(slot['nbytes'])
+            if out is None or out.shape != shape or out.dtype != np.uint8:
+                out = np.empty(shape, np.uint8)
+            out.reshape(-1)[:] = layout.data[index, :nbytes]
+            if int(slot['sequence']) != sequence:
+                # 복사하는 동안 쓰기 측이 슬롯을 덮어씀
+                self._skip_to(sequence)
+                continue
+            self._skip_to(sequence - 1)
+            self.cursor = sequence
+            return sequence, timestamp, out
+
+    def _skip_to(self, sequence: int):
+        """sequence까지 읽은 것으로 처리하고 건너뛴 프레임 수 집계"""
+        if sequence > self.cursor:
+            self.skipped += sequence - self.cursor
+            self.cursor = sequence
+
+    def wait(self, timeout: float = None, latest: bool = False, out: np.ndarray = None, poll_interval: float = 0.002):
+        """새 프레임이 게시될 때까지 폴링하며 대기 (timeout 초 내에 없으면 None)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            result = self.read(latest, out)
+            if result is not None:
+                return result
+            if deadline is not None and time.monotonic() >= deadline:
+                return None
+            time.sleep(poll_interval)
+
+    def close(self):
+        if self._layout is not None:
+            self._layout.close()
+            self._layout = None
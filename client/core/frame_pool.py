@@ -0,0 +1,60 @@
+import weakref
+import threading
+from collections import deque
+import numpy as np
+
+class FramePool:
+    """미리 할당한 프레임 버퍼 풀
+
+    뷰어가 acquire()로 버퍼를 받아 그 안에 디코딩하고, 녹화기로 넘기면 소유권도 함께 넘어갑니다.
+    녹화기는 인코딩이 끝난 버퍼를 release()로 돌려주므로, 정상 상태에서는 프레임마다 메모리를
+    새로 할당하거나 복사하지 않습니다. 풀이 비면(인코딩 지연) 새로 할당하고 allocations로 집계합니다.
+    acquire()로 내준 버퍼(또는 그 뷰)만 돌려받고, cv2.imdecode 결과처럼 풀 밖에서 만든 프레임은
+    release()해도 보관하지 않습니다.
+
+    Attributes:
+        size (int): 보관할 최대 여유 버퍼 수
+        allocations (int): 새로 할당한 버퍼 수
+        bytes_allocated (int): 새로 할당한 바이트 수
+        reused (int): 재사용한 버퍼 수
+    """
+
+    def __init__(self, size: int = 4):
+        self.size = size
+        self.allocations = 0
+        self.bytes_allocated = 0
+        self.reused = 0
+        self._free = deque()
+        self._free_ids = set()  # _free에 있는 버퍼의 id (같은 버퍼를 두 번 반환해도 한 번만 보관)
+        self._issued = weakref.WeakValueDictionary()  # id -> acquire()로 내준 버퍼 (버려지면 자동 삭제)
+        self._lock = threading.Lock()
+
+    def acquire(self, shape: tuple) -> np.ndarray:
+        """shape 크기의 uint8 버퍼 반환 (여유 버퍼가 있으면 재사용)"""
+        with self._lock:
+            while self._free:
+                buffer = self._free.pop()
+                self._free_ids.discard(id(buffer))
+                if buffer.shape == shape:
+                    self.reused += 1
+                    return buffer
+                # 해상도가 바뀌면 이전 크기의 버퍼는 버림
+            self.allocations += 1
+            self.bytes_allocated += int(np.prod(shape))
+            buffer = np.empty(shape, np.uint8)
+            self._issued[id(buffer)] = buffer
+        return buffer
+
+    def release(self, buffer: np.ndarray):
+        """다 쓴 버퍼 반환 (호출 후에는 버퍼를 사용하지 않아야 함, 풀에서 내준 버퍼가 아니면 무시)"""
+        with self._lock:
+            # 디코더가 버퍼의 뷰를 돌려주는 경우가 있으므로 base를 따라가 원래 버퍼를 찾음
+            while buffer is not None and self._issued.get(id(buffer)) is not buffer:
+                buffer = buffer.base if isinstance(buffer.base, np.ndarray) else None
+            if buffer is not None and id(buffer) not in self._free_ids and len(self._free) < self.size:
+                self._free.append(buffer)
+                self._free_ids.add(id(buffer))
+
+    @property
+    def free(self) -> int:
+        return len(self._free)
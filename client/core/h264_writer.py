@@ -0,0 +1,70 @@
+import os
+import shutil
+import logging
+import subprocess
+
+class H264SegmentWriter:
+    """H.264 액세스 유닛을 재인코딩 없이 파일로 저장하는 writer
+
+    ffmpeg가 설치되어 있으면 스트림 복사(-c copy)로 MP4 컨테이너에 담고,
+    없으면 Annex-B 엘리멘터리 스트림(.h264)을 그대로 기록합니다.
+
+    Attributes:
+        path (str): 기록 중인 파일 경로
+        frame_count (int): 기록한 액세스 유닛 수
+        bytes_written (int): 기록한 바이트 수
+    """
+
+    def __init__(self, path_without_ext: str, fps: float = 30.0):
+        self.ffmpeg = shutil.which('ffmpeg')
+        self.frame_count = 0
+        self.bytes_written = 0
+        self._process = None
+        self._file = None
+
+        if self.ffmpeg:
+            self.path = path_without_ext + ".mp4"
+            # 수신 시각을 타임스탬프로 사용하여 가변 프레임레이트를 그대로 보존
+            command = [self.ffmpeg, '-hide_banner', '-loglevel', 'error', '-y',
+                       '-use_wallclock_as_timestamps', '1', '-f', 'h264', '-framerate', str(fps),
+                       '-i', 'pipe:0', '-c', 'copy', '-movflags', '+faststart', self.path]
+            self._process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        else:
+            self.path = path_without_ext + ".h264"
+            self._file = open(self.path, "wb")
+            logging.warning(f"ffmpeg not found. Writing raw H.264 stream to {self.path}")
+
+    def write(self, data: bytes, timestamp: float = None, sequence: int = None):
+        """액세스 유닛 기록 (타임스탬프는 ffmpeg가 수신 시각으로 부여하므로 사용하지 않음)"""
+        if self._process is not None:
+            self._process.stdin.write(data)
+        else:
+            self._file.write(data)
+        self.frame_count += 1
+        self.bytes_written += len(data)
+
+    def release(self):
+        """파일을 닫고 ffmpeg 종료 대기"""
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+                self._process.wait(timeout=10.0)
+            except subprocess.TimeoutExpired:
+                logging.error(f"ffmpeg did not finish writing {self.path}, killing it")
+                self._process.kill()
+                self._process.wait()
+            self._process = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def extension(self) -> str:
+        return os.path.splitext(self.path)[1]
+
+    def rename(self, path_without_ext: str) -> str:
+        """닫힌 파일의 이름 변경 후 새 경로 반환"""
+        new_path = path_without_ext + self.extension
+        os.rename(self.path, new_path)
+        self.path = new_path
+        return new_path
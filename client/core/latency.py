@@ -0,0 +1,197 @@
+# client/core/latency.py
+
+import os
+import sys
+import json
+import math
+import time
+import logging
+
+# 프레임 처리 단계: 페이로드 수신, JPEG 디코딩, 녹화기/프레임 버스 전달, 화면 표시, 인코딩/파일 기록
+STAGES = ('receive', 'decode', 'handoff', 'display', 'encode')
+SUB_BITS = 3  # 2의 거듭제곱 구간마다 2^SUB_BITS개 버킷 (상대 오차 약 12% 이내)
+SUB_BUCKETS = 1 << SUB_BITS
+MAX_EXPONENT = 40  # 약 1100초 이상은 마지막 버킷에 합산
+BUCKET_COUNT = (MAX_EXPONENT - SUB_BITS + 2) * SUB_BUCKETS
+
+def bucket_index(ns: int) -> int:
+    """나노초 값이 속한 버킷 번호 (정수 연산만 사용)"""
+    if ns < SUB_BUCKETS:
+        return max(ns, 0)
+    shift = ns.bit_length() - 1 - SUB_BITS
+    index = (shift + 1) * SUB_BUCKETS + (ns >> shift) - SUB_BUCKETS
+    return min(index, BUCKET_COUNT - 1)
+
+def bucket_bounds(index: int) -> tuple:
+    """버킷의 [하한, 상한) 나노초"""
+    if index < SUB_BUCKETS:
+        return index, index + 1
+    shift = index // SUB_BUCKETS - 1
+    mantissa = index % SUB_BUCKETS + SUB_BUCKETS
+    return mantissa << shift, (mantissa + 1) << shift
+
+class LatencyHistogram:
+    """고정 버킷 지연 시간 히스토그램 (나노초)
+
+    버킷 경계가 2의 거듭제곱 구간을 SUB_BUCKETS개로 나눈 값으로 고정되어 있어, 기록은 버킷 번호
+    계산과 정수 덧셈뿐이고 메모리는 값의 개수와 무관합니다. 한 스레드만 record()를 호출합니다.
+
+    Attributes:
+        counts (list): 버킷별 개수
+        count (int): 기록한 값 수
+        total (int): 기록한 값의 합 (나노초)
+        max (int): 최대값 (나노초)
+    """
+
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, ns: int):
+        # bucket_index()를 함수 호출 없이 계산 (프레임마다 단계별로 호출되므로)
+        if ns < SUB_BUCKETS:
+            index = max(ns, 0)
+        else:
+            shift = ns.bit_length() - 1 - SUB_BITS
+            index = min((shift + 1) * SUB_BUCKETS + (ns >> shift) - SUB_BUCKETS, BUCKET_COUNT - 1)
+        self.counts[index] += 1
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    def snapshot(self) -> tuple:
+        """(버킷별 개수, 개수, 합) 복사본 (구간 요약용)"""
+        return list(self.counts), self.count, self.total
+
+    @staticmethod
+    def percentiles(counts: list, quantiles=(0.5, 0.95, 0.99)) -> list:
+        """버킷 개수로 계산한 분위수 (버킷 중앙값, 나노초, 값이 없으면 None)"""
+        total = sum(counts)
+        if not total:
+            return [None] * len(quantiles)
+        targets = [max(1, math.ceil(q * total)) for q in quantiles]
+        results = [None] * len(quantiles)
+        seen = 0
+        for index, n in enumerate(counts):
+            if not n:
+                continue
+            seen += n
+            for i, target in enumerate(targets):
+                if results[i] is None and seen >= target:
+                    low, high = bucket_bounds(index)
+                    results[i] = (low + high) // 2
+            if results[-1] is not None:
+                break
+        return results
+
+def _summary(counts: list, count: int, total: int, maximum: int = None) -> dict:
+    p50, p95, p99 = LatencyHistogram.percentiles(counts)
+    result = {'count': count}
+    if count:
+        result.update(mean_ms=total / count / 1e6, p50_ms=p50 / 1e6, p95_ms=p95 / 1e6, p99_ms=p99 / 1e6)
+        if maximum is not None:
+            result['max_ms'] = maximum / 1e6
+    return result
+
+class PipelineLatency:
+    """카메라 하나의 단계별 지연 시간 히스토그램
+
+    뷰어(수신 스레드)와 녹화기(녹화 스레드)가 같은 인스턴스에 단계별로 기록합니다. 단계마다
+    기록하는 스레드가 하나이므로 잠금이 없습니다. tick()이 interval초마다 직전 구간의 p50/p95/p99를
+    로그로 남기고, export()/dump()는 시작 이후 누적 히스토그램을 내보냅니다.
+
+    Attributes:
+        name (str): 카메라 이름 (서버 IP)
+        stages (dict): 단계 이름 -> LatencyHistogram
+    """
+
+    def __init__(self, name: str, interval: float = 10.0):
+        self.name = name
+        self.interval = interval
+        self.stages = {stage: LatencyHistogram() for stage in STAGES}
+        self.started_at = time.time()
+        self._interval_ns = int(interval * 1e9)
+        self._next_summary = time.perf_counter_ns() + self._interval_ns
+        self._marks = {stage: histogram.snapshot() for stage, histogram in self.stages.items()}
+
+    def record(self, stage: str, ns: int):
+        self.stages[stage].record(ns)
+
+    def tick(self, now_ns: int):
+        """interval이 지났으면 직전 구간 요약을 로그로 기록 (now_ns: perf_counter_ns)"""
+        if now_ns < self._next_summary:
+            return
+        self._next_summary = now_ns + self._interval_ns
+        parts = []
+        for stage, summary in self.interval_summary().items():
+            if summary['count']:
+                parts.append(f"{stage} p50={summary['p50_ms']:.2f}/p95={summary['p95_ms']:.2f}"
+                             f"/p99={summary['p99_ms']:.2f}ms (n={summary['count']})")
+        if parts:
+            logging.info(f"[{self.name}] Latency: " + ", ".join(parts))
+
+    def interval_summary(self) -> dict:
+        """직전 interval_summary() 호출 이후 구간의 단계별 요약"""
+        result = {}
+        for stage, histogram in self.stages.items():
+            counts, count, total = histogram.snapshot()
+            last_counts, last_count, last_total = self._marks[stage]
+            self._marks[stage] = (counts, count, total)
+            result[stage] = _summary([a - b for a, b in zip(counts, last_counts)], count - last_count, total - last_total)
+        return result
+
+    def summary(self) -> dict:
+        """시작 이후 누적 단계별 {'count', 'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'}"""
+        return {stage: _summary(*histogram.snapshot(), histogram.max) for stage, histogram in self.stages.items()}
+
+    def export(self) -> dict:
+        """JSON으로 저장할 수 있는 누적 히스토그램 (값이 있는 버킷만 [하한 ns, 상한 ns, 개수])"""
+        stages = {}
+        for stage, histogram in self.stages.items():
+            counts, count, total = histogram.snapshot()
+            stages[stage] = dict(_summary(counts, count, total, histogram.max),
+                                 buckets=[list(bucket_bounds(i)) + [n] for i, n in enumerate(counts) if n])
+        return {'name': self.name, 'started_at': self.started_at, 'exported_at': time.time(), 'stages': stages}
+
+    def dump(self, directory: str) -> str:
+        """export() 결과를 directory/<이름>_<시작 시각>.json에 저장하고 경로 반환"""
+        os.makedirs(directory, exist_ok=True)
+        started = time.strftime('%Y%m%d_%H%M%S', time.localtime(self.started_at))
+        path = os.path.join(directory, f"{self.name}_{started}.json")
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(self.export(), f)
+        os.replace(temp_path, path)
+        return path
+
+_pipelines = {}
+
+def pipeline_latency(name: str, enabled: bool = True, interval: float = 10.0):
+    """카메라별 PipelineLatency (같은 프로세스의 뷰어와 녹화기가 공유, enabled가 False면 None)"""
+    if not enabled:
+        return None
+    pipeline = _pipelines.get(name)
+    if pipeline is None:
+        pipeline = _pipelines[name] = PipelineLatency(name, interval)
+    return pipeline
+
+def format_export(data: dict) -> str:
+    """dump()로 저장한 파일 내용을 표로 변환"""
+    lines = [f"{data['name']} ({time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(data['started_at']))})",
+             f"{'stage':<8} {'count':>8} {'mean':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)"]
+    for stage, summary in data['stages'].items():
+        if not summary['count']:
+            continue
+        lines.append(f"{stage:<8} {summary['count']:>8} " + " ".join(
+            f"{summary[key]:>8.2f}" for key in ('mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms')))
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    # 사용법: python -m client.core.latency Data/latency/*.json
+    for path in sys.argv[1:]:
+        with open(path) as f:
+            print(format_export(json.load(f)))
+        print()
@@ -0,0 +1,94 @@
+import os
+import struct
+import logging
+
+FRAME_HEADER = struct.Struct(">I")  # 각 JPEG 앞에 붙는 길이
+INDEX_COLUMNS = "timestamp_ms,offset,size,sequence"
+
+class MJPEGSegmentWriter:
+    """수신한 JPEG를 디코딩/재인코딩 없이 저장하는 writer
+
+    데이터 파일(.mjpeg)에는 4바이트 big-endian 길이 + JPEG 레코드를 이어서 기록하고,
+    인덱스 파일(.idx)에는 프레임별 캡처 시각, 파일 내 위치, 크기, 시퀀스 번호를 CSV로 기록합니다.
+    인덱스가 없어도 길이 헤더만으로 프레임을 복구할 수 있습니다.
+
+    Attributes:
+        path (str): 데이터 파일 경로
+        index_path (str): 인덱스 파일 경로
+        frame_count (int): 기록한 프레임 수
+        bytes_written (int): 기록한 바이트 수
+    """
+
+    extension = ".mjpeg"
+
+    def __init__(self, path_without_ext: str, fps: float = None):
+        self.path = path_without_ext + self.extension
+        self.index_path = path_without_ext + ".idx"
+        self.frame_count = 0
+        self.bytes_written = 0
+        self._file = open(self.path, "wb")
+        self._index = open(self.index_path, "w")
+        self._index.write(INDEX_COLUMNS + "\n")
+
+    def write(self, data, timestamp: float = None, sequence: int = None):
+        """JPEG 프레임 기록
+
+        Args:
+            data: JPEG 바이트 (bytes 또는 memoryview)
+            timestamp: 캡처 시각 (time.time 기준 초)
+            sequence: 서버 프레임 순번
+        """
+        size = len(data)
+        offset = self.bytes_written
+        self._file.write(FRAME_HEADER.pack(size))
+        self._file.write(data)
+        timestamp_ms = int(timestamp * 1000) if timestamp is not None else ""
+        self._index.write(f"{timestamp_ms},{offset},{size},{'' if sequence is None else sequence}\n")
+        self.frame_count += 1
+        self.bytes_written += FRAME_HEADER.size + size
+
+    def release(self):
+        """파일 닫기"""
+        if self._file is not None:
+            self._file.close()
+            self._index.close()
+            self._file = None
+            self._index = None
+
+    def rename(self, path_without_ext: str) -> str:
+        """닫힌 세그먼트의 데이터/인덱스 파일 이름 변경 후 새 데이터 파일 경로 반환"""
+        new_path = path_without_ext + self.extension
+        os.rename(self.path, new_path)
+        os.rename(self.index_path, path_without_ext + ".idx")
+        self.path, self.index_path = new_path, path_without_ext + ".idx"
+        return new_path
+
+def read_mjpeg_segment(path: str):
+    """MJPEG 세그먼트 파일의 프레임을 순서대로 반환
+
+    Yields:
+        tuple: (timestamp_ms 또는 None, sequence 또는 None, JPEG bytes)
+    """
+    index_path = os.path.splitext(path)[0] + ".idx"
+    entries = []
+    if os.path.exists(index_path):
+        with open(index_path) as f:
+            next(f, None)
+            for line in f:
+                timestamp_ms, _, _, sequence = line.rstrip("\n").split(",")
+                entries.append((int(timestamp_ms) if timestamp_ms else None, int(sequence) if sequence else None))
+
+    with open(path, "rb") as f:
+        i = 0
+        while True:
+            header = f.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                break
+            size = FRAME_HEADER.unpack(header)[0]
+            data = f.read(size)
+            if len(data) < size:
+                logging.warning(f"Truncated frame at the end of {path}")
+                break
+            timestamp_ms, sequence = entries[i] if i < len(entries) else (None, None)
+            yield timestamp_ms, sequence, data
+            i += 1
@@ -2,15 +2,39 @@ import logging
 import uuid
 import time
 import json
+import threading
 import paho.mqtt.client as mqtt
 import multiprocessing
 import config as cfg
+from .session_manifest import new_session_id
+from .sensor_ingest import SensorBatcher
+
+def parse_discovery_response(payload: str):
+    """탐색 응답 해석
+
+    새 서버는 JSON 서버 정보({"ip": ..., "port": ..., "codec": ...})를, 기존 서버는 IP 문자열만 보냅니다.
+
+    Returns:
+        tuple: (서버 IP, 서버 정보 dict 또는 None)
+    """
+    payload = payload.strip()
+    if payload.startswith('{'):
+        try:
+            descriptor = json.loads(payload)
+        except json.JSONDecodeError:
+            logging.error(f"[MQTT] Invalid discovery response: {payload}")
+            return None, None
+        return descriptor.get('ip'), descriptor
+    return payload, None
 
 class MQTTListener:
     """MQTT 리스너 클래스"""
     
     def __init__(self, ip_queue: multiprocessing.Queue):
         self.ip_queue = ip_queue
+        self.session_id = None  # 마지막 녹화 시작 명령의 세션 ID
+        # 센서 메시지는 여기서 한 번만 해석하고 묶어서 메인 프로세스로 전달
+        self.sensor_batcher = SensorBatcher(ip_queue, cfg.SENSOR_BATCH_ROWS, cfg.SENSOR_BATCH_SECONDS)
         self.client_id = f"discovery-client-{uuid.uuid4()}"
         self.response_topic = f"camera/response/{self.client_id}"
         self.client = None
@@ -24,6 +48,7 @@ class MQTTListener:
             topics = [
                 (self.response_topic, 0),
                 (cfg.MQTT_TOPIC_COMMAND, 0),
+                (f"{cfg.MQTT_TOPIC_PRESENCE}/+", 1),  # 서버 presence/하트비트
                 ("sensor/#", 0),  # 모든 센서 토픽 구독
             ]
             client.subscribe(topics)
@@ -41,46 +66,88 @@ class MQTTListener:
             payload = msg.payload.decode()
             topic = msg.topic
             
+            if topic.startswith(cfg.MQTT_TOPIC_PRESENCE + "/"):
+                self.on_presence(topic, payload)
+                return
+            if topic.startswith("sensor/"):
+                self.on_sensor(topic, payload)
+                return
+
             logging.info(f"[MQTT] Received message on topic '{topic}': {payload}")
             
             if topic == cfg.MQTT_TOPIC_COMMAND:
                 # 명령 토픽 처리: payload == start/stop/true/false
                 normalized = payload.strip().lower()
+                # 명령 이전에 받은 센서 행이 먼저 처리되도록 모아 둔 묶음을 먼저 전송
+                self.sensor_batcher.flush()
                 if normalized in ("start", "true", "recording_start"):
-                    logging.info("[MQTT] Recording start command received")
-                    self.ip_queue.put(("recording_start", None))
+                    # 모든 카메라와 센서 기록을 하나로 묶는 세션 ID를 명령 수신 시점에 생성
+                    self.session_id = new_session_id()
+                    logging.info(f"[MQTT] Recording start command received (session {self.session_id})")
+                    self.ip_queue.put(("recording_start", self.session_id))
                 elif normalized in ("stop", "false", "recording_stop"):
                     logging.info("[MQTT] Recording stop command received")
                     self.ip_queue.put(("recording_stop", None))
                 else:
                     logging.info(f"[MQTT] Unknown command: {payload}")
             elif topic == self.response_topic:  # 서버로부터의 IP 응답
-                if payload:
-                    logging.info(f"[MQTT] Server IP received: {payload}")
+                server_ip, descriptor = parse_discovery_response(payload)
+                if server_ip:
+                    logging.info(f"[MQTT] Server IP received: {server_ip}")
+                    if descriptor:
+                        logging.info(f"[MQTT] Server {server_ip}: codec={descriptor.get('codec')}, "
+                                     f"resolution={descriptor.get('resolution')}, fps={descriptor.get('fps')}, "
+                                     f"viewers={descriptor.get('viewers')}, load={descriptor.get('load')}")
                     # IP 주소를 큐에 추가
-                    self.ip_queue.put(payload)
+                    self.ip_queue.put(server_ip)
             elif "camera/response" in topic and payload:  # 다른 클라이언트의 응답도 처리
-                logging.info(f"[MQTT] Additional server IP received: {payload}")
-                self.ip_queue.put(payload)
-            elif topic.startswith("sensor/"):  # 센서 데이터 처리
-                logging.debug(f"[MQTT] Sensor data received on topic {topic}")
-                try:
-                    # 센서 데이터 파싱 및 큐로 전달
-                    data = json.loads(payload)
-                    self.ip_queue.put(("sensor_data", (topic, data)))
-                except json.JSONDecodeError:
-                    logging.error(f"[MQTT] Invalid sensor data format: {payload}")
+                server_ip, _ = parse_discovery_response(payload)
+                if server_ip:
+                    logging.info(f"[MQTT] Additional server IP received: {server_ip}")
+                    self.ip_queue.put(server_ip)
         except Exception as e:
             logging.error(f"[MQTT] Message processing error: {e}")
 
+    def on_sensor(self, topic: str, payload: str):
+        """센서 데이터 해석 후 수신 시각과 함께 묶음에 추가 (메시지별 로그 없음)"""
+        received_ms = int(time.time() * 1000)
+        try:
+            data = json.loads(payload)
+        except json.JSONDecodeError:
+            logging.error(f"[MQTT] Invalid sensor data format on {topic}: {payload}")
+            return
+        if not isinstance(data, dict):
+            logging.error(f"[MQTT] Invalid sensor data format on {topic}: {payload}")
+            return
+        data.pop('id', None)
+        self.sensor_batcher.add(topic, data, received_ms)
+
+    def on_presence(self, topic: str, payload: str):
+        """서버 presence 메시지 처리 (online/하트비트 또는 offline/LWT)"""
+        server_ip = topic[len(cfg.MQTT_TOPIC_PRESENCE) + 1:]
+        presence = {}
+        if payload:
+            try:
+                presence = json.loads(payload)
+            except json.JSONDecodeError:
+                logging.error(f"[MQTT] Invalid presence message from {server_ip}: {payload}")
+                return
+        # 빈 retained 메시지(삭제)도 offline으로 처리
+        if presence.get('status') == 'online':
+            logging.debug(f"[MQTT] Presence from {server_ip}")
+            self.ip_queue.put(("server_online", (server_ip, presence)))
+        else:
+            logging.info(f"[MQTT] Server {server_ip} went offline")
+            self.ip_queue.put(("server_offline", server_ip))
+
     def periodic_request(self):
-        """주기적 IP 요청"""
+        """주기적 IP 요청 (presence를 발행하지 않는 서버를 위한 보조 탐색)"""
         while self.is_running:
             try:
                 if self.client and self.client.is_connected():
                     logging.info(f"[MQTT] Discovery request: '{cfg.MQTT_TOPIC_REQUEST}'")
                     self.client.publish(cfg.MQTT_TOPIC_REQUEST, self.response_topic)
-                time.sleep(15)
+                time.sleep(cfg.DISCOVERY_POLL_INTERVAL)
             except Exception as e:
                 logging.error(f"[MQTT] Request error: {e}")
                 break
@@ -102,6 +169,9 @@ class MQTTListener:
             # MQTT 메인 루프 시작
             self.client.loop_start()
             
+            # 센서 묶음 시간 기준 전송 스레드
+            threading.Thread(target=self.sensor_batcher.run, name="SensorBatcher", daemon=True).start()
+
             # 요청 전송 루프 시작
             self.periodic_request()
             
@@ -112,3 +182,4 @@ class MQTTListener:
             logging.error(f"[MQTT] Error: {e}")
         finally:
             self.is_running = False
+            self.sensor_batcher.stop()
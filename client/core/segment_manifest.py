@@ -0,0 +1,73 @@
+import os
+import bisect
+import logging
+import threading
+
+MANIFEST_FILENAME = "manifest.csv"
+MANIFEST_COLUMNS = "start_ms,end_ms,frames,bytes,path"
+
+class SegmentManifest:
+    """카메라별 녹화 파일 목록 (추가 전용 CSV)
+
+    녹화 디렉토리의 manifest.csv에 파일이 닫힐 때마다 한 줄씩 추가합니다. 시간 구간에 해당하는
+    파일은 디렉토리를 훑지 않고 시작 시각 정렬 목록에서 이진 탐색으로 찾습니다.
+
+    Attributes:
+        path (str): manifest 파일 경로
+        entries (list): (start_ms, end_ms, frames, bytes, path) 목록 (start_ms 순)
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_FILENAME)
+        self.entries = []
+        self._starts = []
+        self._max_duration_ms = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path) as f:
+            next(f, None)
+            for line in f:
+                try:
+                    start_ms, end_ms, frames, size, path = line.rstrip("\n").split(",", 4)
+                    self._insert((int(start_ms), int(end_ms), int(frames), int(size), path))
+                except ValueError:
+                    # 기록 중 종료되어 잘린 마지막 줄
+                    logging.warning(f"Skipping malformed manifest line in {self.path}: {line!r}")
+
+    def _insert(self, entry: tuple):
+        i = bisect.bisect_right(self._starts, entry[0])
+        self._starts.insert(i, entry[0])
+        self.entries.insert(i, entry)
+        self._max_duration_ms = max(self._max_duration_ms, entry[1] - entry[0])
+
+    def append(self, start_ms: int, end_ms: int, frames: int, size: int, path: str):
+        """닫힌 녹화 파일 등록
+
+        Args:
+            start_ms: 첫 프레임 캡처 시각 (Unix 밀리초)
+            end_ms: 마지막 프레임 캡처 시각 (Unix 밀리초)
+            frames: 프레임 수
+            size: 파일 크기 (바이트)
+            path: 파일 경로 (녹화 디렉토리 기준 상대 경로로 기록)
+        """
+        entry = (int(start_ms), int(end_ms), int(frames), int(size), os.path.relpath(path, self.directory))
+        with self._lock:
+            is_new = not os.path.exists(self.path)
+            with open(self.path, "a") as f:
+                if is_new:
+                    f.write(MANIFEST_COLUMNS + "\n")
+                f.write(",".join(str(value) for value in entry) + "\n")
+            self._insert(entry)
+
+    def find(self, start_ms: int, end_ms: int) -> list:
+        """[start_ms, end_ms] 구간과 겹치는 파일 목록 반환 (시작 시각 순)"""
+        with self._lock:
+            # 구간보다 가장 긴 파일 길이 이상 먼저 시작한 파일은 겹칠 수 없음
+            lo = bisect.bisect_left(self._starts, start_ms - self._max_duration_ms)
+            hi = bisect.bisect_right(self._starts, end_ms)
+            return [entry for entry in self.entries[lo:hi] if entry[1] >= start_ms]
@@ -0,0 +1,131 @@
+import time
+import logging
+import threading
+
+def queue_depth(queue):
+    """프로세스 간 큐에 쌓인 항목 수 (macOS 등 qsize()를 지원하지 않으면 None)"""
+    try:
+        return queue.qsize()
+    except NotImplementedError:
+        return None
+
+class SensorBatcher:
+    """센서 메시지를 묶어 프로세스 간 큐로 보내는 생산 측 (MQTT 리스너 프로세스)
+
+    메시지마다 큐 항목을 하나씩 pickle하지 않고, 수신 시각을 붙인 행을 모았다가 max_rows개가
+    쌓이거나 첫 행을 받은 뒤 max_delay초가 지나면 ("sensor_batch", (보낸 시각, 행 목록)) 하나로
+    보냅니다. 녹화 명령처럼 센서 행과 순서가 중요한 메시지를 보내기 전에는 flush()를 호출합니다.
+
+    Attributes:
+        rows_sent (int): 보낸 행 수
+        batches_sent (int): 보낸 묶음 수
+    """
+
+    def __init__(self, queue, max_rows: int = 50, max_delay: float = 0.2):
+        self.queue = queue
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.rows_sent = 0
+        self.batches_sent = 0
+        self._rows = []
+        self._first_row_at = None
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def add(self, topic: str, data: dict, timestamp_ms: int = None):
+        """센서 메시지 한 건 추가 (timestamp_ms: 수신 시각, 없으면 현재 시각)"""
+        if timestamp_ms is None:
+            timestamp_ms = int(time.time() * 1000)
+        with self._lock:
+            if not self._rows:
+                self._first_row_at = time.monotonic()
+            self._rows.append((topic, timestamp_ms, data))
+            if len(self._rows) >= self.max_rows:
+                self._send()
+
+    def flush(self):
+        """모아 둔 행을 바로 전송"""
+        with self._lock:
+            self._send()
+
+    def _send(self):
+        if not self._rows:
+            return
+        rows, self._rows = self._rows, []
+        self.queue.put(("sensor_batch", (time.time(), rows)))
+        self.rows_sent += len(rows)
+        self.batches_sent += 1
+
+    def run(self):
+        """max_delay가 지난 묶음을 전송하는 루프 (메시지가 끊겨도 행이 남아 있지 않도록, 별도 스레드에서 실행)"""
+        while not self._stopped.wait(self.max_delay / 2):
+            with self._lock:
+                if self._rows and time.monotonic() - self._first_row_at >= self.max_delay:
+                    self._send()
+
+    def stop(self):
+        self._stopped.set()
+        self.flush()
+
+class SensorIngestStats:
+    """센서 수신 경로 지표 (소비 측)
+
+    묶음마다 수신 후 기록까지 걸린 시간(lag)과 큐 대기 시간, 큐에 쌓인 항목 수를 집계하여
+    interval초마다 로그로 남깁니다.
+
+    Attributes:
+        rows (int): 처리한 행 수
+        batches (int): 처리한 묶음 수
+        last_lag (float): 마지막 묶음에서 가장 오래된 행의 수신 후 경과 시간 (초)
+        max_queue_depth (int): 관측한 최대 큐 항목 수
+    """
+
+    def __init__(self, interval: float = 10.0):
+        self.interval = interval
+        self.rows = 0
+        self.batches = 0
+        self.last_lag = None
+        self.max_queue_depth = 0
+        self._reset(time.time())
+
+    def _reset(self, now: float):
+        self._start = now
+        self._rows = 0
+        self._batches = 0
+        self._lag_sum = 0.0
+        self._lag_max = 0.0
+        self._transit_sum = 0.0
+        self._depth_max = None
+
+    def record(self, sent_at: float, rows: list, depth: int = None):
+        """처리한 묶음 하나 집계
+
+        Args:
+            sent_at: 생산 측이 묶음을 보낸 시각 (time.time)
+            rows: (topic, 수신 시각 ms, data) 목록
+            depth: 묶음을 꺼낸 뒤 큐에 남은 항목 수 (알 수 없으면 None)
+        """
+        now = time.time()
+        lag = now - min(row[1] for row in rows) / 1000 if rows else 0.0
+        self.rows += len(rows)
+        self.batches += 1
+        self.last_lag = lag
+        self._rows += len(rows)
+        self._batches += 1
+        self._lag_sum += lag
+        self._lag_max = max(self._lag_max, lag)
+        self._transit_sum += now - sent_at
+        if depth is not None:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+            self._depth_max = depth if self._depth_max is None else max(self._depth_max, depth)
+
+        elapsed = now - self._start
+        if elapsed >= self.interval:
+            message = (f"[Sensor] Ingest stats: Rows={self._rows / elapsed:.1f}/s, "
+                       f"Batches={self._batches / elapsed:.1f}/s, "
+                       f"AvgLag={self._lag_sum / self._batches * 1000:.1f}ms, MaxLag={self._lag_max * 1000:.1f}ms, "
+                       f"AvgTransit={self._transit_sum / self._batches * 1000:.1f}ms")
+            if self._depth_max is not None:
+                message += f", QueueDepth={self._depth_max}"
+            logging.info(message)
+            self._reset(now)
@@ -4,15 +4,27 @@ import os
 import json
 import time
 import logging
-import pandas as pd
+import threading
+import config as cfg
+from .sensor_writer import sensor_writer_class
+from .sensor_store import SensorStore
+from .session_manifest import SessionTrack, new_session_id
+from .sensor_ingest import SensorIngestStats
 
 class SensorDataLogger:
     def __init__(self):
         self.base_dir = os.path.join("Data", "sensors")
         os.makedirs(self.base_dir, exist_ok=True)
         self.columns = ['timestamp', 'mp905', 'mp901', 'mp801', 'sgp30', 'fermion', 'ens160']
-        self.active_recordings = {}  # topic -> (start_time, temp_file_path)
+        self.writer_class = sensor_writer_class(cfg.SENSOR_FILE_FORMAT)
+        self.active_recordings = {}  # topic -> (start_time, 토픽 기록기)
         self.is_recording = False
+        self.session_id = None  # 현재 녹화 세션 ID (카메라 녹화와 같은 ID로 인덱스를 묶음)
+        self.store = SensorStore(self.columns[1:], cfg.SENSOR_STORE_CAPACITY)  # 녹화와 무관하게 항상 갱신
+        self.ingest = SensorIngestStats(cfg.SENSOR_INGEST_STATS_INTERVAL)  # 프로세스 간 수신 경로 지표
+        self._lock = threading.Lock()  # MQTT 콜백 스레드와 녹화 명령 처리 간 기록기 보호
+        self._flusher = None  # 녹화 중 SENSOR_FLUSH_SECONDS가 지난 행을 기록하는 스레드
+        self._flusher_stop = threading.Event()
 
     def get_topic_dir(self, topic):
         """토픽별 디렉토리 경로 반환"""
@@ -22,21 +34,70 @@ class SensorDataLogger:
         os.makedirs(topic_dir, exist_ok=True)
         return topic_dir
 
-    def start_recording(self):
-        """센서 데이터 기록 시작"""
-        self.is_recording = True
-        start_time = int(time.time() * 1000)  # 밀리초 단위
-        
+    def start_recording(self, session_id: str = None):
+        """센서 데이터 기록 시작 (SENSOR_PRETRIGGER_SECONDS 이내의 보관 데이터부터 기록)
+
+        Args:
+            session_id: 녹화 세션 ID (없으면 새로 생성). 토픽별 행 인덱스를 이 세션에 기록
+        """
         for topic in list(self.active_recordings.keys()):
             self.stop_recording_topic(topic)
-            
+
+        with self._lock:
+            self.session_id = session_id or new_session_id()
+            self.is_recording = True
+            start_time = int(time.time() * 1000)  # 밀리초 단위
+            if cfg.SENSOR_PRETRIGGER_SECONDS:
+                self._write_pretrigger(start_time - int(cfg.SENSOR_PRETRIGGER_SECONDS * 1000), start_time)
+
+        if self._flusher is None:
+            self._flusher_stop = threading.Event()
+            self._flusher = threading.Thread(target=self._run_flusher, args=(self._flusher_stop,),
+                                             name="SensorFlush", daemon=True)
+            self._flusher.start()
+
         logging.info("[Sensor] Started sensor data recording")
         return start_time
 
+    def _run_flusher(self, stop_event: threading.Event):
+        """새 행이 끊긴 토픽의 모아 둔 행도 SENSOR_FLUSH_SECONDS 안에 기록되도록 주기적으로 확인"""
+        while not stop_event.wait(max(cfg.SENSOR_FLUSH_SECONDS / 2, 0.01)):
+            self.flush_due()
+
+    def flush_due(self):
+        """첫 행을 받은 뒤 SENSOR_FLUSH_SECONDS가 지난 토픽의 행 기록"""
+        with self._lock:
+            for topic, (_, writer) in self.active_recordings.items():
+                try:
+                    writer.flush_due()
+                except Exception as e:
+                    logging.error(f"[Sensor] Failed to flush recording for topic '{topic}': {e}")
+
+    def _write_pretrigger(self, start_ms, end_ms):
+        """녹화 시작 이전 구간을 메모리 저장소에서 꺼내 토픽별 기록 시작 (self._lock 보유 상태에서 호출)"""
+        for topic in self.store.topics():
+            timestamps, values = self.store.window(topic, start_ms, end_ms)
+            if len(timestamps) == 0:
+                continue
+            writer = self._open_writer(topic)
+            for timestamp, row in zip(timestamps.tolist(), values.tolist()):
+                writer.append((timestamp,) + tuple(None if value != value else value for value in row))  # NaN은 빈 값
+            self.active_recordings[topic] = (int(timestamps[0]), writer)
+            logging.info(f"[Sensor] Started recording for topic '{topic}' with {len(timestamps)} pre-trigger rows")
+
+    def _open_writer(self, topic):
+        index = SessionTrack(self.session_id, 'sensor', topic)
+        return self.writer_class(self.get_temp_path(topic), self.columns, cfg.SENSOR_FLUSH_ROWS,
+                                 cfg.SENSOR_FLUSH_SECONDS, index)
+
     def stop_recording(self):
         """센서 데이터 기록 종료"""
         self.is_recording = False
         end_time = int(time.time() * 1000)  # 밀리초 단위
+        if self._flusher is not None:
+            self._flusher_stop.set()
+            self._flusher.join()
+            self._flusher = None
         
         # 모든 활성 토픽의 기록 종료
         for topic in list(self.active_recordings.keys()):
@@ -46,55 +107,70 @@ class SensorDataLogger:
         return end_time
 
     def get_temp_path(self, topic):
-        """임시 CSV 파일 경로 반환"""
+        """임시 기록 파일 경로 반환"""
         topic_dir = self.get_topic_dir(topic)
-        return os.path.join(topic_dir, "temp_recording.csv")
+        return os.path.join(topic_dir, "temp_recording" + self.writer_class.extension)
+
+    def save_sensor_data(self, topic, data, timestamp=None):
+        """토픽별로 센서 데이터 저장
+
+        모든 메시지를 메모리 저장소(store)에 보관하고, 녹화 중이면 토픽 기록기에 모았다가 묶음 단위로
+        기록합니다. 녹화 시작 시 pre-trigger 구간과 겹치지 않도록 시각 부여부터 잠금 안에서 처리합니다.
+
+        Args:
+            timestamp: 수신 시각 (밀리초 Unix timestamp, 없으면 현재 시각)
+        """
+        with self._lock:
+            self._save(topic, data, timestamp if timestamp is not None else int(time.time() * 1000))
 
-    def save_sensor_data(self, topic, data):
-        """토픽별로 센서 데이터를 CSV에 저장"""
+    def save_batch(self, batch, depth=None):
+        """SensorBatcher가 보낸 묶음 저장 (잠금을 한 번만 잡고 모든 행 처리)
+
+        Args:
+            batch: (보낸 시각, [(topic, 수신 시각 ms, data), ...])
+            depth: 묶음을 꺼낸 뒤 큐에 남은 항목 수 (수신 경로 지표용)
+        """
+        sent_at, rows = batch
+        with self._lock:
+            for topic, timestamp, data in rows:
+                self._save(topic, data, timestamp)
+        self.ingest.record(sent_at, rows, depth)
+
+    def _save(self, topic, data, timestamp):
+        self.store.append(topic, timestamp, data)
         if not self.is_recording:
-            logging.debug(f"[Sensor] Skipping data from {topic} (not recording)")
             return
-            
-        timestamp = int(time.time() * 1000)  # 밀리초 단위의 Unix timestamp
-        
-        # 데이터 프레임 생성
-        row_data = {
-            'timestamp': timestamp,
-            'mp905': data.get('mp905', None),
-            'mp901': data.get('mp901', None),
-            'mp801': data.get('mp801', None),
-            'sgp30': data.get('sgp30', None),
-            'fermion': data.get('fermion', None),
-            'ens160': data.get('ens160', None)
-        }
-        
-        df = pd.DataFrame([row_data])
-        
+
+        row = (timestamp,) + tuple(data.get(column) for column in self.columns[1:])
         # 토픽에 대한 recording 세션이 없으면 새로 생성
-        if topic not in self.active_recordings:
-            temp_path = self.get_temp_path(topic)
-            df.to_csv(temp_path, index=False, columns=self.columns)
-            self.active_recordings[topic] = (timestamp, temp_path)
+        recording = self.active_recordings.get(topic)
+        if recording is None:
+            recording = self.active_recordings[topic] = (timestamp, self._open_writer(topic))
             logging.info(f"[Sensor] Started recording for topic '{topic}'")
-        else:
-            # 기존 파일에 데이터 추가
-            _, temp_path = self.active_recordings[topic]
-            df.to_csv(temp_path, mode='a', header=False, index=False, columns=self.columns)
+        recording[1].append(row)
 
     def stop_recording_topic(self, topic):
-        """특정 토픽의 기록 종료 및 파일 이름 변경"""
-        if topic in self.active_recordings:
-            start_time, temp_path = self.active_recordings[topic]
-            end_time = int(time.time() * 1000)
-            
-            if os.path.exists(temp_path):
-                topic_dir = self.get_topic_dir(topic)
-                # 시작-종료 시간 포맷으로 파일명 생성
-                new_filename = f"{start_time}-{end_time}.csv"
-                new_path = os.path.join(topic_dir, new_filename)
-                
-                os.rename(temp_path, new_path)
-                logging.info(f"[Sensor] Renamed recording file for topic '{topic}' to {new_filename}")
-            
-            del self.active_recordings[topic]
+        """특정 토픽의 기록 종료 (남은 행 기록 후 파일 이름 변경)"""
+        with self._lock:
+            recording = self.active_recordings.pop(topic, None)
+        if recording is None:
+            return
+        start_time, writer = recording
+        end_time = int(time.time() * 1000)
+        try:
+            writer.close()
+        except Exception as e:
+            logging.error(f"[Sensor] Failed to flush recording for topic '{topic}': {e}")
+        finally:
+            writer.index.close()
+
+        if os.path.exists(writer.path):
+            topic_dir = self.get_topic_dir(topic)
+            # 시작-종료 시간 포맷으로 파일명 생성
+            new_filename = f"{start_time}-{end_time}{writer.extension}"
+            new_path = os.path.join(topic_dir, new_filename)
+
+            os.rename(writer.path, new_path)
+            writer.index.rename_file(writer.path, new_path)
+            logging.info(f"[Sensor] Renamed recording file for topic '{topic}' to {new_filename} "
+                         f"({writer.rows_written} rows)")
@@ -0,0 +1,141 @@
+import threading
+import numpy as np
+
+class TopicRing:
+    """한 토픽의 고정 크기 센서 링 버퍼
+
+    수신 시각(ms)과 채널 값을 미리 할당한 배열에 돌아가며 기록합니다. 값이 없거나 숫자가 아니면
+    NaN으로 저장하고, 집계는 NaN을 제외합니다. 수신 시각 순으로 쌓이므로 구간 조회는 링의 두
+    연속 구간에서 각각 이진 탐색합니다.
+
+    Attributes:
+        channels (list): 채널 이름 목록
+        capacity (int): 보관하는 최대 행 수
+        count (int): 보관 중인 행 수
+    """
+
+    def __init__(self, channels: list, capacity: int):
+        self.channels = channels
+        self.capacity = capacity
+        self.count = 0
+        self._head = 0  # 다음에 기록할 위치
+        self._timestamps = np.zeros(capacity, np.int64)
+        self._values = np.full((capacity, len(channels)), np.nan)
+        self._lock = threading.Lock()
+
+    def append(self, timestamp: int, values):
+        with self._lock:
+            self._timestamps[self._head] = timestamp
+            self._values[self._head] = values
+            self._head = (self._head + 1) % self.capacity
+            self.count = min(self.count + 1, self.capacity)
+
+    def _segments(self):
+        """오래된 순서의 연속 구간 목록 (start, stop)"""
+        if self.count < self.capacity:
+            return [(0, self.count)]
+        return [(self._head, self.capacity), (0, self._head)]
+
+    def latest(self):
+        """(timestamp, values) 또는 None"""
+        with self._lock:
+            if self.count == 0:
+                return None
+            index = self._head - 1
+            return int(self._timestamps[index]), self._values[index].copy()
+
+    def window(self, start_ms: int = None, end_ms: int = None):
+        """[start_ms, end_ms] 구간의 (timestamps, values) 복사본 (시각 순)"""
+        with self._lock:
+            times, values = [], []
+            for start, stop in self._segments():
+                segment = self._timestamps[start:stop]
+                lo = 0 if start_ms is None else np.searchsorted(segment, start_ms, 'left')
+                hi = len(segment) if end_ms is None else np.searchsorted(segment, end_ms, 'right')
+                times.append(segment[lo:hi])
+                values.append(self._values[start + lo:start + hi])
+            return np.concatenate(times), np.concatenate(values)
+
+class SensorStore:
+    """토픽별 센서 시계열 메모리 저장소
+
+    녹화 여부와 무관하게 모든 센서 메시지를 토픽별 TopicRing에 보관하여 최근 값, 구간 최소/최대/평균,
+    구간 평균 다운샘플링을 NumPy 벡터 연산으로 조회합니다. 토픽당 메모리는 capacity로 고정됩니다.
+    """
+
+    def __init__(self, channels: list, capacity: int = 36000):
+        self.channels = list(channels)
+        self.capacity = capacity
+        self.rings = {}
+        self._lock = threading.Lock()
+
+    def append(self, topic: str, timestamp: int, data: dict):
+        """센서 메시지 한 건 추가 (채널 값이 없거나 숫자가 아니면 NaN)"""
+        ring = self.rings.get(topic)
+        if ring is None:
+            with self._lock:
+                ring = self.rings.setdefault(topic, TopicRing(self.channels, self.capacity))
+        ring.append(timestamp, [_to_float(data.get(channel)) for channel in self.channels])
+
+    def topics(self) -> list:
+        return list(self.rings)
+
+    def latest(self, topic: str) -> dict:
+        """가장 최근 메시지 {'timestamp': ms, 채널: 값} (없으면 None, 값이 없던 채널은 None)"""
+        ring = self.rings.get(topic)
+        result = ring.latest() if ring is not None else None
+        if result is None:
+            return None
+        timestamp, values = result
+        row = {'timestamp': timestamp}
+        row.update((channel, None if np.isnan(value) else float(value)) for channel, value in zip(self.channels, values))
+        return row
+
+    def window(self, topic: str, start_ms: int = None, end_ms: int = None):
+        """[start_ms, end_ms] 구간의 (timestamps, values) 배열 (values 열 순서는 channels)"""
+        ring = self.rings.get(topic)
+        if ring is None:
+            return np.zeros(0, np.int64), np.zeros((0, len(self.channels)))
+        return ring.window(start_ms, end_ms)
+
+    def aggregate(self, topic: str, start_ms: int = None, end_ms: int = None) -> dict:
+        """구간의 채널별 {'count', 'min', 'max', 'mean'} (값이 없는 채널은 count 0, 나머지 None)"""
+        _, values = self.window(topic, start_ms, end_ms)
+        valid = ~np.isnan(values)
+        counts = valid.sum(axis=0)
+        minimums = np.where(valid, values, np.inf).min(axis=0, initial=np.inf)
+        maximums = np.where(valid, values, -np.inf).max(axis=0, initial=-np.inf)
+        sums = np.where(valid, values, 0.0).sum(axis=0)
+        result = {}
+        for i, channel in enumerate(self.channels):
+            n = int(counts[i])
+            result[channel] = {
+                'count': n,
+                'min': float(minimums[i]) if n else None,
+                'max': float(maximums[i]) if n else None,
+                'mean': float(sums[i] / n) if n else None,
+            }
+        return result
+
+    def downsample(self, topic: str, start_ms: int, end_ms: int, bucket_ms: int):
+        """[start_ms, end_ms] 구간을 bucket_ms 간격으로 나눈 채널별 평균
+
+        Returns:
+            tuple: (버킷 시작 시각 배열, 평균 배열 (버킷 수 x 채널 수, 값이 없는 버킷은 NaN))
+        """
+        times, values = self.window(topic, start_ms, end_ms)
+        buckets = (end_ms - start_ms) // bucket_ms + 1
+        index = (times - start_ms) // bucket_ms
+        valid = ~np.isnan(values)
+        filled = np.where(valid, values, 0.0)
+        sums = np.column_stack([np.bincount(index, filled[:, i], buckets) for i in range(len(self.channels))])
+        counts = np.column_stack([np.bincount(index, valid[:, i], buckets) for i in range(len(self.channels))])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums / counts
+        return start_ms + np.arange(buckets, dtype=np.int64) * bucket_ms, means
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
@@ -0,0 +1,144 @@
+import io
+import csv
+import time
+import logging
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+class CSVTopicWriter:
+    """토픽별 센서 CSV 기록기
+
+    파일을 기록이 끝날 때까지 열어 두고, 행을 메모리에 모았다가 flush_rows개가 쌓이거나 첫 행을
+    받은 뒤 flush_seconds가 지나면 한 번에 기록합니다. 토픽에 새 행이 들어오지 않아도 시간 기준이
+    지켜지도록 소유자가 주기적으로 flush_due()를 호출합니다. 비정상 종료 시 잃는 데이터는 최대 한 묶음입니다.
+    세션 인덱스(SessionTrack)가 주어지면 기록한 행마다 (시각, 바이트 오프셋)을 등록합니다.
+
+    Attributes:
+        path (str): 기록 중인 파일 경로
+        rows_written (int): 파일에 기록한 행 수
+        flushes (int): 파일에 기록한 횟수
+    """
+
+    extension = ".csv"
+
+    def __init__(self, path: str, columns: list, flush_rows: int = 100, flush_seconds: float = 1.0, index=None):
+        self.path = path
+        self.columns = columns
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.rows_written = 0
+        self.flushes = 0
+        self._rows = []
+        self._first_row_at = None
+        self._open()
+        self.index = index
+        self._index_file = index.add_file(path) if index is not None else None
+
+    def _open(self):
+        # 행의 바이트 오프셋을 알 수 있도록 행 단위로 문자열을 만든 뒤 바이너리 파일에 기록
+        self._file = open(self.path, "wb")
+        self._line = io.StringIO()
+        self._writer = csv.writer(self._line)
+        self._offset = 0
+        self._write([self.columns])
+
+    def append(self, row: tuple):
+        """행 추가 (columns 순서의 값, None은 빈 칸)"""
+        if not self._rows:
+            self._first_row_at = time.monotonic()
+        self._rows.append(row)
+        if len(self._rows) >= self.flush_rows or time.monotonic() - self._first_row_at >= self.flush_seconds:
+            self.flush()
+
+    def flush_due(self):
+        """첫 행을 받은 뒤 flush_seconds가 지났으면 모아 둔 행을 기록"""
+        if self._rows and time.monotonic() - self._first_row_at >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        """모아 둔 행을 파일에 기록"""
+        if not self._rows:
+            return
+        rows, self._rows = self._rows, []
+        positions = self._write(rows)
+        if self.index is not None:
+            for row, position in zip(rows, positions):
+                self.index.append(row[0], self._index_file, position)
+        self.rows_written += len(rows)
+        self.flushes += 1
+
+    def _write(self, rows: list) -> list:
+        """행 기록 후 각 행의 파일 내 위치 반환"""
+        self._line.seek(0)
+        self._line.truncate()
+        positions = []
+        for row in rows:
+            positions.append(self._line.tell())
+            self._writer.writerow(row)
+        text = self._line.getvalue()
+        data = text.encode()
+        if len(data) != len(text):
+            # ASCII가 아닌 값이 있으면 문자 위치와 바이트 위치가 다르므로 행별로 다시 계산
+            bounds = positions + [len(text)]
+            positions, offset = [], 0
+            for start, end in zip(bounds, bounds[1:]):
+                positions.append(offset)
+                offset += len(text[start:end].encode())
+        base = self._offset
+        self._file.write(data)
+        self._file.flush()
+        self._offset += len(data)
+        return [base + position for position in positions]
+
+    def close(self):
+        """남은 행을 기록하고 파일 닫기"""
+        if self._file is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self._file.close()
+            self._file = None
+
+class ParquetTopicWriter(CSVTopicWriter):
+    """토픽별 센서 Parquet 기록기 (pyarrow 필요)
+
+    flush마다 모은 행을 하나의 row group으로 기록하고, 세션 인덱스에는 행 번호를 등록합니다.
+    Parquet 파일은 close()에서 footer를 써야 읽을 수 있으므로, 비정상 종료 시 데이터를 보존해야
+    하면 CSV를 사용합니다.
+    timestamp는 int64, 센서 값은 float64(없으면 null)로 저장합니다.
+    """
+
+    extension = ".parquet"
+
+    def _open(self):
+        if pa is None:
+            raise ImportError("pyarrow is required for Parquet sensor output")
+        fields = [pa.field(name, pa.int64() if name == 'timestamp' else pa.float64()) for name in self.columns]
+        self._schema = pa.schema(fields)
+        self._file = pq.ParquetWriter(self.path, self._schema)
+
+    def _write(self, rows: list) -> list:
+        columns = list(zip(*rows))
+        arrays = [pa.array(values, type=field.type) for values, field in zip(columns, self._schema)]
+        self._file.write_table(pa.Table.from_arrays(arrays, schema=self._schema))
+        return list(range(self.rows_written, self.rows_written + len(rows)))
+
+SENSOR_WRITERS = {
+    'csv': CSVTopicWriter,
+    'parquet': ParquetTopicWriter,
+}
+
+def sensor_writer_class(file_format: str):
+    """출력 형식 이름으로 기록기 클래스 반환 (pyarrow가 없으면 CSV로 대체)"""
+    if file_format == 'parquet' and pa is None:
+        logging.warning("[Sensor] pyarrow not installed. Falling back to CSV output")
+        file_format = 'csv'
+    writer_class = SENSOR_WRITERS.get(file_format)
+    if writer_class is None:
+        raise ValueError(f"Unknown sensor file format: {file_format}")
+    return writer_class
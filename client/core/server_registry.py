@@ -0,0 +1,105 @@
+import time
+import logging
+
+class ServerEntry:
+    """레지스트리에 등록된 서버 상태
+
+    Attributes:
+        ip (str): 서버 IP
+        descriptor (dict): 서버가 보낸 서버 정보 (없으면 빈 dict)
+        discovered_at (float): 처음 발견된 시각 (time.time)
+        last_seen (float): 마지막 presence/하트비트/탐색 응답 시각 (time.monotonic)
+        first_frame_at (float): 뷰어가 첫 프레임을 받은 시각 (time.time)
+        heartbeat (bool): presence 하트비트를 보내는 서버인지 여부 (폴링으로만 발견된 서버는 만료되지 않음)
+    """
+
+    def __init__(self, ip: str, descriptor: dict = None):
+        self.ip = ip
+        self.descriptor = descriptor or {}
+        self.heartbeat = False
+        self.discovered_at = time.time()
+        self.last_seen = time.monotonic()
+        self.first_frame_at = None
+
+    @property
+    def discovery_latency(self):
+        """발견부터 첫 프레임까지 걸린 시간 (초, 아직 프레임이 없으면 None)"""
+        if self.first_frame_at is None:
+            return None
+        return self.first_frame_at - self.discovered_at
+
+class ServerRegistry:
+    """presence 메시지로 관리하는 활성 서버 목록
+
+    서버가 발행하는 retained presence/하트비트(및 폴링 탐색 응답)로 서버를 등록하고,
+    offline 메시지(LWT 포함)를 받거나 timeout 동안 소식이 없으면 제거합니다.
+    """
+
+    def __init__(self, timeout: float = 30.0):
+        self.timeout = timeout
+        self.servers = {}  # ip -> ServerEntry
+
+    def __contains__(self, ip: str) -> bool:
+        return ip in self.servers
+
+    def seen(self, ip: str, descriptor: dict = None, heartbeat: bool = False) -> bool:
+        """서버 발견 또는 하트비트 기록
+
+        Args:
+            ip: 서버 IP
+            descriptor: 서버 정보
+            heartbeat: presence 메시지로 받은 경우 True
+
+        Returns:
+            bool: 새로 등록된 서버이면 True
+        """
+        entry = self.servers.get(ip)
+        is_new = entry is None
+        if is_new:
+            entry = self.servers[ip] = ServerEntry(ip, descriptor)
+            logging.info(f"[Registry] Server online: {ip}")
+        entry.last_seen = time.monotonic()
+        entry.heartbeat = entry.heartbeat or heartbeat
+        if descriptor:
+            entry.descriptor = descriptor
+        return is_new
+
+    def remove(self, ip: str) -> bool:
+        """서버 제거
+
+        Returns:
+            bool: 등록되어 있던 서버이면 True
+        """
+        if self.servers.pop(ip, None) is None:
+            return False
+        logging.info(f"[Registry] Server offline: {ip}")
+        return True
+
+    def expire(self) -> list:
+        """timeout 동안 소식이 없는 서버를 제거하고 그 IP 목록 반환"""
+        now = time.monotonic()
+        expired = [ip for ip, entry in self.servers.items()
+                   if entry.heartbeat and now - entry.last_seen > self.timeout]
+        for ip in expired:
+            logging.warning(f"[Registry] No heartbeat from {ip} for {self.timeout:.0f}s")
+            self.remove(ip)
+        return expired
+
+    def first_frame(self, ip: str, at: float):
+        """뷰어의 첫 프레임 수신 기록"""
+        entry = self.servers.get(ip)
+        if entry is None or entry.first_frame_at is not None:
+            return
+        entry.first_frame_at = at
+        logging.info(f"[Registry] {ip}: discovery to first frame {entry.discovery_latency:.2f}s")
+
+    def stats(self) -> list:
+        """서버별 상태 목록 반환"""
+        now = time.monotonic()
+        return [{
+            'ip': entry.ip,
+            'codec': entry.descriptor.get('codec'),
+            'viewers': entry.descriptor.get('viewers'),
+            'last_seen': now - entry.last_seen,
+            'discovery_latency': entry.discovery_latency,
+        } for entry in self.servers.values()]
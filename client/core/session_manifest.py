@@ -0,0 +1,224 @@
+import os
+import csv
+import json
+import bisect
+import threading
+import numpy as np
+from datetime import datetime
+
+SESSION_ROOT = os.path.join("Data", "sessions")
+# 인덱스 레코드: 캡처/수신 시각(ms), 세션 내 파일 번호, 파일 내 위치 (영상: 프레임 번호, CSV: 행의 바이트 오프셋, Parquet: 행 번호)
+INDEX_RECORD = np.dtype({'names': ['timestamp_ms', 'file', 'position'],
+                         'formats': ['<i8', '<u4', '<u8'],
+                         'offsets': [0, 8, 16], 'itemsize': 24})
+
+def new_session_id(timestamp: float = None) -> str:
+    """녹화 세션 ID (시작 시각 기준 YYYYMMDD_HHMMSS.mmm)"""
+    start = datetime.fromtimestamp(timestamp if timestamp is not None else datetime.now().timestamp())
+    return f"{start.strftime('%Y%m%d_%H%M%S')}.{start.microsecond // 1000:03d}"
+
+def _track_filename(kind: str, name: str) -> str:
+    return f"{kind}-{name.replace('/', '_')}"
+
+class SessionTrack:
+    """녹화 세션에 속한 카메라 하나 또는 센서 토픽 하나의 인덱스 (쓰기 측)
+
+    Data/sessions/<세션 ID>/ 아래에 <kind>-<name>.json(파일 목록)과 <kind>-<name>.idx(고정 크기
+    레코드)를 기록합니다. 카메라 프로세스와 센서 로거가 각자 자기 트랙 파일만 쓰므로 프로세스 간
+    조정 없이 같은 세션 ID로 묶입니다. 레코드는 메모리에 모았다가 flush_records개마다 추가합니다.
+
+    Attributes:
+        session_id (str): 세션 ID
+        kind (str): 'cam' 또는 'sensor'
+        name (str): 카메라 IP 또는 센서 토픽
+        files (list): 세션 디렉토리 기준 상대 경로 목록 (레코드의 file 번호 순서)
+    """
+
+    def __init__(self, session_id: str, kind: str, name: str, root: str = SESSION_ROOT, flush_records: int = 256):
+        self.session_id = session_id
+        self.kind = kind
+        self.name = name
+        self.directory = os.path.join(root, session_id)
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, _track_filename(kind, name))
+        self.meta_path = base + ".json"
+        self.index_path = base + ".idx"
+        self.files = []
+        self.flush_records = flush_records
+        self._records = []
+        self._index = open(self.index_path, "ab")
+        self._lock = threading.Lock()
+        self._write_meta()
+
+    def add_file(self, path: str) -> int:
+        """기록을 시작한 파일 등록 (레코드에 쓸 파일 번호 반환)"""
+        with self._lock:
+            self.files.append(os.path.relpath(path, self.directory))
+            self._write_meta()
+            return len(self.files) - 1
+
+    def rename_file(self, old_path: str, new_path: str):
+        """파일 이름 변경 반영 (기록 중 임시 이름 → 시작-종료 시각 이름)"""
+        old = os.path.relpath(old_path, self.directory)
+        with self._lock:
+            if old in self.files:
+                self.files[self.files.index(old)] = os.path.relpath(new_path, self.directory)
+                self._write_meta()
+
+    def append(self, timestamp_ms: int, file: int, position: int):
+        with self._lock:
+            self._records.append((timestamp_ms, file, position))
+            if len(self._records) >= self.flush_records:
+                self._flush()
+
+    def _flush(self):
+        if self._records:
+            np.array(self._records, INDEX_RECORD).tofile(self._index)
+            self._index.flush()
+            self._records = []
+
+    def _write_meta(self):
+        # 다른 프로세스가 읽는 중에도 완전한 파일만 보이도록 임시 파일에 쓴 뒤 교체
+        meta = {'session_id': self.session_id, 'kind': self.kind, 'name': self.name, 'files': self.files}
+        temp_path = self.meta_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(temp_path, self.meta_path)
+
+    def close(self):
+        with self._lock:
+            if self._index is None:
+                return
+            self._flush()
+            self._index.close()
+            self._index = None
+
+class RecordingSession:
+    """녹화 세션 조회 (읽기 측)
+
+    카메라별 프레임 시각 인덱스와 토픽별 센서 행 인덱스를 메모리 매핑하여 이진 탐색하므로,
+    영상/센서 파일 전체를 읽거나 디렉토리를 훑지 않고 프레임에 대응하는 센서 행이나 시간 구간의
+    프레임을 찾습니다. 같은 트랙의 레코드는 시각 순으로 기록됩니다.
+
+    Attributes:
+        session_id (str): 세션 ID
+        cameras (list): 카메라 IP 목록
+        topics (list): 센서 토픽 목록
+    """
+
+    def __init__(self, session_id: str, root: str = SESSION_ROOT):
+        self.session_id = session_id
+        self.directory = os.path.join(root, session_id)
+        if not os.path.isdir(self.directory):
+            raise FileNotFoundError(f"Recording session not found: {session_id}")
+        self._tracks = {}  # (kind, name) -> (파일 목록, 인덱스)
+        for filename in sorted(os.listdir(self.directory)):
+            if not filename.endswith(".json"):
+                continue
+            with open(os.path.join(self.directory, filename)) as f:
+                meta = json.load(f)
+            index_path = os.path.join(self.directory, filename[:-len(".json")] + ".idx")
+            size = os.path.getsize(index_path) if os.path.exists(index_path) else 0
+            count = size // INDEX_RECORD.itemsize  # 기록 중 잘린 마지막 레코드는 제외
+            index = np.memmap(index_path, INDEX_RECORD, 'r', shape=(count,)) if count else np.zeros(0, INDEX_RECORD)
+            files = [os.path.normpath(os.path.join(self.directory, path)) for path in meta['files']]
+            self._tracks[(meta['kind'], meta['name'])] = (files, index)
+        self.cameras = [name for kind, name in self._tracks if kind == 'cam']
+        self.topics = [name for kind, name in self._tracks if kind == 'sensor']
+
+    @staticmethod
+    def list(root: str = SESSION_ROOT) -> list:
+        """세션 ID 목록 (시작 시각 순)"""
+        if not os.path.isdir(root):
+            return []
+        return sorted(name for name in os.listdir(root) if os.path.isdir(os.path.join(root, name)))
+
+    def _track(self, kind: str, name: str):
+        track = self._tracks.get((kind, name))
+        if track is None:
+            raise KeyError(f"No {kind} track '{name}' in session {self.session_id}")
+        return track
+
+    @staticmethod
+    def _range(index, start_ms: int, end_ms: int):
+        # 메모리 매핑한 열을 통째로 읽지 않도록 bisect로 필요한 레코드만 접근
+        timestamps = index['timestamp_ms']
+        return bisect.bisect_left(timestamps, start_ms), bisect.bisect_right(timestamps, end_ms)
+
+    def frames(self, camera: str, start_ms: int, end_ms: int) -> list:
+        """[start_ms, end_ms] 구간에 캡처된 프레임 목록
+
+        Returns:
+            list: (캡처 시각 ms, 영상 파일 경로, 파일 내 프레임 번호) 목록 (시각 순)
+        """
+        files, index = self._track('cam', camera)
+        lo, hi = self._range(index, start_ms, end_ms)
+        return [(int(t), files[f], int(p)) for t, f, p in index[lo:hi].tolist()]
+
+    def frame_at(self, camera: str, timestamp_ms: int):
+        """timestamp_ms 시점에 화면에 있던 프레임 (그 이전 마지막 캡처 프레임, 없으면 None)"""
+        files, index = self._track('cam', camera)
+        i = bisect.bisect_right(index['timestamp_ms'], timestamp_ms)
+        if i == 0:
+            return None
+        t, f, p = index[i - 1].tolist()
+        return int(t), files[f], int(p)
+
+    def sensor_rows(self, topic: str, start_ms: int, end_ms: int) -> list:
+        """[start_ms, end_ms] 구간의 센서 행 목록 (dict, 값은 파일에 기록된 그대로)"""
+        files, index = self._track('sensor', topic)
+        lo, hi = self._range(index, start_ms, end_ms)
+        return self._read_rows(files, index[lo:hi])
+
+    def sensor_at(self, topic: str, timestamp_ms: int):
+        """timestamp_ms 시점의 센서 값 (그 이전 마지막 행, 없으면 None)"""
+        files, index = self._track('sensor', topic)
+        i = bisect.bisect_right(index['timestamp_ms'], timestamp_ms)
+        if i == 0:
+            return None
+        return self._read_rows(files, index[i - 1:i])[0]
+
+    def sensors_for_frame(self, camera: str, timestamp_ms: int) -> dict:
+        """프레임 캡처 시각의 토픽별 센서 행 {topic: 행 또는 None}
+
+        Args:
+            camera: 카메라 IP
+            timestamp_ms: 프레임 캡처 시각 (frames()/frame_at() 결과의 첫 값)
+        """
+        self._track('cam', camera)
+        return {topic: self.sensor_at(topic, timestamp_ms) for topic in self.topics}
+
+    @staticmethod
+    def _read_rows(files: list, records) -> list:
+        """인덱스 레코드가 가리키는 행만 읽기 (CSV는 바이트 오프셋으로 이동하여 해당 행만 읽음)"""
+        rows = []
+        handles = {}
+        try:
+            for _, file, position in records.tolist():
+                path = files[file]
+                if path.endswith(".parquet"):
+                    rows.append(_read_parquet_row(path, position))
+                    continue
+                entry = handles.get(path)
+                if entry is None:
+                    handle = open(path, "rb")
+                    entry = handles[path] = (handle, next(csv.reader([handle.readline().decode()])))
+                handle, columns = entry
+                handle.seek(position)
+                values = next(csv.reader([handle.readline().decode()]))
+                rows.append(dict(zip(columns, values)))
+        finally:
+            for handle, _ in handles.values():
+                handle.close()
+        return rows
+
+def _read_parquet_row(path: str, row: int) -> dict:
+    """Parquet 파일의 row번째 행 (해당 row group만 읽음)"""
+    import pyarrow.parquet as pq
+    parquet = pq.ParquetFile(path)
+    for group in range(parquet.num_row_groups):
+        rows = parquet.metadata.row_group(group).num_rows
+        if row < rows:
+            return parquet.read_row_group(group).slice(row, 1).to_pylist()[0]
+        row -= rows
+    raise IndexError(f"Row out of range in {path}")
@@ -1,11 +1,41 @@
 import cv2
+import json
 import logging
 import socket
-import struct
 import time
 import numpy as np
+from time import perf_counter_ns
 import config as cfg
+from protocol import (PROTOCOL_V1, PROTOCOL_V2, SUPPORTED_VERSIONS, V1_HEADER, V2_HEADER, HELLO_HEADER, HELLO_MAGIC,
+                      FLAG_H264, FLAG_KEYFRAME, FLAG_PREROLL, FLAG_CONTROL, CODEC_MJPEG,
+                      ProtocolError, now_us, pack_hello, try_unpack_hello, unpack_v2_header)
 from .video_recorder import VideoRecorder
+from .frame_bus import FrameBus, bus_name
+from .latency import pipeline_latency
+
+try:
+    import simplejpeg  # 미리 할당한 버퍼에 직접 디코딩 (없으면 cv2.imdecode가 프레임마다 새로 할당)
+except ImportError:
+    simplejpeg = None
+
+# libjpeg DCT 축소 디코딩 배율별 imdecode 플래그 (축소 배율이 클수록 IDCT 연산과 색 변환량이 줄어듦)
+DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+# 녹화 시작/정지 명령 (MQTT 명령 토픽 값 또는 정규화된 명령 이름)
+START_COMMANDS = ("start", "true", "recording_start")
+STOP_COMMANDS = ("stop", "false", "recording_stop")
+
+def reduced_scale(source_width: int, target_width: int) -> int:
+    """target_width 이상의 너비를 유지하는 가장 큰 축소 디코딩 배율 반환 (1, 2, 4, 8)"""
+    for scale in (8, 4, 2):
+        if source_width / scale >= target_width:
+            return scale
+    return 1
 
 class StreamViewer:
     """스트림 뷰어 클래스"""
@@ -14,11 +44,62 @@ class StreamViewer:
         self.server_ip = server_ip
         self.client_socket = None
         self.recorder = VideoRecorder(server_ip)
+        # 단계별 지연 시간 히스토그램 (녹화기와 공유, LATENCY_PROBES가 False면 None)
+        self.latency = pipeline_latency(server_ip, cfg.LATENCY_PROBES, cfg.LATENCY_SUMMARY_INTERVAL)
+        self.frame_bus = None  # 다른 프로세스와 디코딩 프레임을 공유하는 공유 메모리 링
+        if cfg.FRAME_BUS_ENABLED:
+            self.frame_bus = FrameBus(bus_name(server_ip), cfg.FRAME_BUS_SLOTS, cfg.FRAME_BUS_SLOT_BYTES)
         self.frame_count = 0  # 프레임 카운터
-        self.display_interval = 4  # n프레임마다 화면 갱신
+        self.display_interval = cfg.DISPLAY_INTERVAL  # n프레임마다 화면 갱신
+        self.protocol_version = PROTOCOL_V1
+        self.subscription = {'tier': 'full', 'max_fps': None}
+        self.codec = CODEC_MJPEG
+        self.server_preroll_seconds = 0  # 서버가 보관하는 pre-roll 길이 (0: 미지원)
+        self.preroll_pending = False  # pre-roll 버스트 수신 대기 중
+        self.preroll_requested_at = None
+        self.preroll_last_sequence = None  # pre-roll 버스트의 마지막 시퀀스 (이후 라이브 프레임부터 기록)
+        self.clock_offset_us = None  # 클라이언트 단조 시계 - 서버 단조 시계 (마이크로초)
+        self.last_sequence = None
+        self.frames_lost = 0  # 시퀀스 번호 공백으로 감지한 손실 프레임 수
+        self.last_frame_age = None  # 마지막 프레임의 캡처 후 경과 시간 (초)
+        self.first_frame_at = None  # 첫 프레임 수신 시각 (time.time)
+        self._display_due = False  # 현재 프레임을 화면에 표시할 차례인지 여부
+        self._full_decode = False  # 현재 프레임을 녹화용 원본 해상도로 디코딩해야 하는지 여부
+        self._frame_time = None  # 현재 프레임의 캡처 시각 (time.time 기준)
+        self.decode_scale = 1  # 현재 프레임의 디코딩 축소 배율
+        self.display_width = cfg.DISPLAY_WIDTH  # 표시 창 너비 (사용자가 창 크기를 바꾸면 갱신)
+        self.source_width = None  # 스트림 원본 프레임 너비 (첫 디코딩 후 설정)
+        self._window_created = False
+        self.frames_decoded = 0
+        self.frames_skipped = 0  # 표시도 녹화도 하지 않아 디코딩을 생략한 프레임 수
+        self.decode_time_total = 0.0
+        self.frames_allocated = 0  # 풀을 쓰지 않고 새로 할당한 디코딩 결과 수
+        self.bytes_allocated = 0
+        self._stats_marks = (0, 0)  # 통계 구간 시작 시점의 (할당 바이트, 복사 프레임 수)
+        self._header_buffer = bytearray(V2_HEADER.size)  # 프레임 헤더 수신용 재사용 버퍼
+        self._payload_buffer = bytearray(cfg.STREAM_RECV_BUFFER_SIZE)  # 페이로드 수신용 재사용 버퍼
+        self.bytes_received = 0
+        self._stats_start = time.time()
+        self._stats_frames = 0
+        self._stats_lost = 0
+        self._stats_age_sum = 0.0
+        self._stats_decoded = 0
+        self._stats_skipped = 0
+        self._stats_decode_time = 0.0
+
+    def _recv_into(self, view: memoryview) -> bool:
+        """view를 가득 채울 때까지 소켓에서 직접 수신 (중간 복사 없음)"""
+        received = 0
+        count = len(view)
+        while received < count:
+            n = self.client_socket.recv_into(view[received:], count - received)
+            if n == 0:
+                return False
+            received += n
+        return True
 
     def receive_all(self, count: int) -> bytes:
-        """소켓으로부터 지정된 바이트 수만큼 수신
+        """소켓으로부터 지정된 바이트 수만큼 수신 (헤더 등 작은 데이터용)
         
         Args:
             count: 수신할 바이트 수
@@ -26,13 +107,28 @@ class StreamViewer:
         Returns:
             수신된 데이터
         """
-        buf = b''
-        while len(buf) < count:
-            packet = self.client_socket.recv(count - len(buf))
-            if not packet:
-                return None
-            buf += packet
-        return buf
+        buf = bytearray(count)
+        if not self._recv_into(memoryview(buf)):
+            return None
+        return bytes(buf)
+
+    def receive_payload(self, count: int):
+        """프레임 페이로드를 재사용 버퍼로 수신
+
+        버퍼는 더 큰 프레임이 오면 늘어나고 줄어들지 않으므로, 정상 상태에서는 프레임마다
+        메모리 할당이나 복사가 없습니다.
+
+        Returns:
+            memoryview: 수신된 데이터 (다음 receive_payload() 호출 전까지만 유효)
+            None: 연결 종료
+        """
+        if len(self._payload_buffer) < count:
+            self._payload_buffer = bytearray(max(count, len(self._payload_buffer) * 2))
+        view = memoryview(self._payload_buffer)[:count]
+        if not self._recv_into(view):
+            return None
+        self.bytes_received += count
+        return view
 
     def is_connected(self) -> bool:
         """연결 상태 확인"""
@@ -52,87 +148,460 @@ class StreamViewer:
             return True
             
         try:
-            self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.client_socket.connect((self.server_ip, cfg.STREAM_PORT))
-            logging.info(f"[{self.server_ip}] Connected to streaming server")
+            self._open_socket()
+            if cfg.STREAM_PROTOCOL_VERSION >= PROTOCOL_V2 and not self._handshake():
+                # 핸드셰이크를 지원하지 않는 서버: 재연결 후 v1으로 수신
+                self.client_socket.close()
+                self._open_socket()
+                self.protocol_version = PROTOCOL_V1
+            logging.info(f"[{self.server_ip}] Connected to streaming server (protocol v{self.protocol_version})")
             return True
         except Exception as e:
             logging.error(f"[{self.server_ip}] Connection failed: {e}")
             return False
 
+    def _open_socket(self):
+        self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        if cfg.STREAM_SO_RCVBUF:
+            # 큰 프레임이 연속으로 와도 커널 버퍼가 넘치지 않도록 수신 버퍼 확대 (연결 전에 설정해야 함)
+            self.client_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, cfg.STREAM_SO_RCVBUF)
+        self.client_socket.connect((self.server_ip, cfg.STREAM_PORT))
+
+    def hello_message(self) -> dict:
+        """핸드셰이크로 보낼 메시지 생성"""
+        versions = [v for v in SUPPORTED_VERSIONS if v <= cfg.STREAM_PROTOCOL_VERSION]
+        message = {'versions': versions}
+        # 모니터링 전용 뷰어는 서버 측에서 프레임레이트/해상도를 줄여 받음
+        if cfg.STREAM_MAX_FPS:
+            message['max_fps'] = cfg.STREAM_MAX_FPS
+        if cfg.STREAM_TIER != 'full':
+            message['tier'] = cfg.STREAM_TIER
+        return message
+
+    def _handshake(self) -> bool:
+        """프로토콜 버전 협상
+
+        Returns:
+            bool: 협상 성공 여부 (False면 핸드셰이크 미지원 서버)
+        """
+        self.client_socket.settimeout(cfg.HANDSHAKE_TIMEOUT * 4)
+        try:
+            self.client_socket.sendall(pack_hello(self.hello_message()))
+            header = self.receive_all(HELLO_HEADER.size)
+            if header is None:
+                return False
+            magic, length = HELLO_HEADER.unpack(header)
+            if magic != HELLO_MAGIC:
+                raise ProtocolError("Server did not answer handshake")
+            body = self.receive_all(length)
+            if body is None:
+                return False
+            reply, _ = try_unpack_hello(header + body)
+        except (socket.timeout, ProtocolError) as e:
+            logging.warning(f"[{self.server_ip}] Handshake failed ({e}), falling back to v1")
+            return False
+        finally:
+            self.client_socket.settimeout(None)
+
+        self.accept_handshake(reply)
+        return True
+
+    def accept_handshake(self, reply: dict):
+        """핸드셰이크 응답으로 프로토콜 버전과 시계 차이 설정"""
+        self.protocol_version = reply.get('version', PROTOCOL_V1)
+        if 'server_time_us' in reply:
+            self.clock_offset_us = now_us() - reply['server_time_us']
+        self.on_handshake(reply)
+
+    def on_handshake(self, reply: dict):
+        """핸드셰이크 응답 처리 (확장 필드용)"""
+        if reply.get('max_fps'):
+            # 서버가 이미 프레임을 줄여 보내므로 받은 프레임은 모두 표시
+            self.display_interval = 1
+        self.subscription = {'tier': reply.get('tier', 'full'), 'max_fps': reply.get('max_fps')}
+        self.codec = reply.get('codec', CODEC_MJPEG)
+        self.recorder.codec = self.codec
+        self.server_preroll_seconds = reply.get('preroll_seconds', 0) or 0
+        logging.info(f"[{self.server_ip}] Subscription: tier={self.subscription['tier']}, "
+                     f"max_fps={self.subscription['max_fps']}")
+
+    def _receive_header(self):
+        """버전에 맞는 프레임 헤더 수신
+
+        Returns:
+            tuple: (flags, length, sequence, capture_us). v1은 sequence/capture_us가 None
+            None: 연결 종료
+        """
+        header = V2_HEADER if self.protocol_version == PROTOCOL_V2 else V1_HEADER
+        header_data = memoryview(self._header_buffer)[:header.size]
+        if not self._recv_into(header_data):
+            return None
+        if header is V2_HEADER:
+            return unpack_v2_header(header_data)
+        return 0, V1_HEADER.unpack(header_data)[0], None, None
+
+    def _track_sequence(self, sequence, capture_us):
+        """시퀀스 공백과 프레임 지연 시간 기록"""
+        if sequence is not None:
+            if self.last_sequence is not None and sequence > self.last_sequence + 1:
+                gap = sequence - self.last_sequence - 1
+                self.frames_lost += gap
+                self._stats_lost += gap
+                logging.getLogger('frame_processing').debug(
+                    f"[{self.server_ip}] Frame gap: {gap} frames lost "
+                    f"(seq {self.last_sequence} -> {sequence})")
+            self.last_sequence = sequence
+
+        if capture_us is not None and self.clock_offset_us is not None:
+            self.last_frame_age = (now_us() - self.clock_offset_us - capture_us) / 1e6
+            self._stats_age_sum += self.last_frame_age
+
+        self._stats_frames += 1
+        elapsed = time.time() - self._stats_start
+        if elapsed >= cfg.STREAM_STATS_INTERVAL:
+            fps = self._stats_frames / elapsed
+            message = f"[{self.server_ip}] Stream stats: FPS={fps:.1f}, Lost={self._stats_lost}"
+            if self.clock_offset_us is not None and capture_us is not None:
+                message += f", AvgAge={self._stats_age_sum / self._stats_frames * 1000:.1f}ms"
+            if self._stats_decoded:
+                message += (f", Decode={self._stats_decode_time / self._stats_decoded * 1000:.1f}ms/frame"
+                            f" x{self._stats_decoded} (1/{self.decode_scale})")
+            message += f", DecodeSkipped={self._stats_skipped}"
+            allocated = self.bytes_allocated + self.recorder.frame_pool.bytes_allocated
+            copies = self.recorder.frames_copied
+            message += (f", Alloc={(allocated - self._stats_marks[0]) / elapsed / 1e6:.1f}MB/s"
+                        f", Copies={(copies - self._stats_marks[1]) / elapsed:.1f}/s")
+            self._stats_marks = (allocated, copies)
+            logging.info(message)
+            self._stats_start = time.time()
+            self._stats_frames = 0
+            self._stats_lost = 0
+            self._stats_age_sum = 0.0
+            self._stats_decoded = 0
+            self._stats_skipped = 0
+            self._stats_decode_time = 0.0
+
     def process_frame(self):
-        """프레임 처리"""
-        frame_start_time = time.time()
-        
-        # 프레임 크기 수신
-        header_data = self.receive_all(4)
-        if not header_data:
+        """프레임 처리
+
+        단계별 소요 시간은 self.latency에 기록합니다. 계측 코드는 `if __debug__ and ...` 조건 안에
+        있어 python -O로 실행하면 컴파일 단계에서 제거됩니다.
+        """
+        latency = self.latency
+
+        # 프레임 헤더 수신 (다음 프레임을 기다리는 시간이므로 계측하지 않음)
+        try:
+            header = self._receive_header()
+        except ProtocolError as e:
+            logging.error(f"[{self.server_ip}] {e}")
+            return False
+        if header is None:
             logging.warning(f"[{self.server_ip}] Connection lost")
             return False
 
-        msg_size = struct.unpack('>L', header_data)[0]
+        flags, msg_size, sequence, capture_us = header
         if msg_size == 0:
             return True
 
-        # 프레임 데이터 수신
-        jpeg_data = self.receive_all(msg_size)
+        # 프레임 데이터 수신 (재사용 버퍼, 복사 없음)
+        if __debug__ and latency is not None:
+            start = perf_counter_ns()
+        jpeg_data = self.receive_payload(msg_size)
         if jpeg_data is None:
             logging.warning(f"[{self.server_ip}] Frame recv failed")
             return False
+        if __debug__ and latency is not None:
+            received = perf_counter_ns()
+            latency.record('receive', received - start)
+            latency.tick(received)
+        if not self.accept_frame(flags, sequence, capture_us, jpeg_data):
+            return True
 
-        # JPEG 디코딩 시작
-        decode_start = time.time()
-        nparr = np.frombuffer(jpeg_data, np.uint8)
-        frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        decode_time = time.time() - decode_start
-
+        # JPEG 디코딩 (표시 전용 프레임은 축소 디코딩, 소요 시간은 decode()에서 기록)
+        frame = self.decode(jpeg_data, self.decode_scale, self._full_decode)
         if frame is None:
             logging.warning(f"[{self.server_ip}] Frame decode failed")
             return True
 
-        # 프레임 업데이트 시작
-        update_start = time.time()
-        self.recorder.update_frame(frame)
-        update_time = time.time() - update_start
-        
-        # 화면 표시 (일부 프레임만)
-        self.frame_count += 1
-        display_time = 0
-        if self.frame_count % self.display_interval == 0:
-            display_start = time.time()
-            cv2.imshow(f'Stream from {self.server_ip}', frame)
+        # 녹화기/프레임 버스로 전달
+        if __debug__ and latency is not None:
+            start = perf_counter_ns()
+        show = self.deliver(frame)
+        if __debug__ and latency is not None:
+            delivered = perf_counter_ns()
+            latency.record('handoff', delivered - start)
+
+        # 화면 표시 (일부 프레임만). 녹화기로 넘긴 풀 버퍼는 이 스레드의 다음 디코딩 전까지 재사용되지 않음
+        if show:
+            self.show(frame)
             cv2.waitKey(1)
-            display_time = time.time() - display_start
-        
-        # 전체 처리 시간 계산
-        total_time = time.time() - frame_start_time
-        frame_logger = logging.getLogger('frame_processing')
-        if total_time > 0.033:  # 30fps 기준 한 프레임당 33ms
-            frame_logger.debug(f"[{self.server_ip}] Frame processing too slow: "
-                             f"Total={total_time:.3f}s "
-                             f"(Decode={decode_time:.3f}s, "
-                             f"Update={update_time:.3f}s, "
-                             f"Display={display_time:.3f}s)")
-        
+            if __debug__ and latency is not None:
+                latency.record('display', perf_counter_ns() - delivered)
         return True
 
-    def handle_command(self, command: str):
-        """녹화 명령 처리"""
+    @property
+    def window_name(self) -> str:
+        return f'Stream from {self.server_ip}'
+
+    def accept_frame(self, flags: int, sequence, capture_us, data) -> bool:
+        """수신한 메시지를 처리하고 JPEG 디코딩이 필요한지 반환
+
+        제어 메시지와 H.264 액세스 유닛은 여기서 처리가 끝나며, 수신 방식(블로킹 소켓, asyncio)과
+        무관하게 같은 순서 추적/pre-roll/녹화 판단을 적용합니다. 디코딩이 필요하면 배율을
+        decode_scale에 설정합니다 (mp4 녹화용 프레임은 원본, 표시 전용 프레임은 창 크기에 맞춘 축소).
+        프레임 버스가 켜져 있으면 라이브 프레임을 모두 디코딩하여 버스에 게시합니다.
+        """
+        if flags & FLAG_CONTROL:
+            self._on_control(json.loads(bytes(data)))
+            return False
+        if self.first_frame_at is None:
+            self.first_frame_at = time.time()
+        is_preroll = bool(flags & FLAG_PREROLL)
+        if not is_preroll:
+            self._track_sequence(sequence, capture_us)
+        record = self._should_record(is_preroll, sequence)
+
+        if flags & FLAG_H264:
+            # H.264는 디코딩하지 않고 녹화기로 그대로 전달 (화면 표시 없음)
+            if record:
+                self.recorder.write_encoded(data, bool(flags & FLAG_KEYFRAME), self._capture_time(capture_us), sequence)
+            return False
+
+        self._display_due = False
+        if not is_preroll:
+            self.frame_count += 1
+            self._display_due = self.frame_count % self.display_interval == 0
+        self._frame_time = self._capture_time(capture_us)
+        if self.recorder.passthrough:
+            # 수신한 JPEG를 그대로 기록하고, 화면에 표시할 프레임만 디코딩
+            if record and self.recorder.is_recording:
+                self.recorder.write_encoded(data, True, self._frame_time, sequence)
+            self._full_decode = False
+        elif is_preroll:
+            # pre-roll 버스트는 표시하지 않고 JPEG 그대로 녹화기로 전달 (녹화 스레드가 차례로 디코딩)
+            if record and self.recorder.is_recording:
+                self.recorder.add_preroll_jpeg(bytes(data), self._frame_time)
+            return False
+        else:
+            # mp4 녹화 중일 때만 원본 해상도 프레임이 필요
+            self._full_decode = record and self.recorder.is_recording
+        publish = self.frame_bus is not None and not is_preroll
+        if not (self._full_decode or self._display_due or publish):
+            self.frames_skipped += 1
+            self._stats_skipped += 1
+            return False
+        if self._full_decode:
+            self.decode_scale = 1
+        elif not publish:
+            self.decode_scale = self.display_scale()
+        elif self._display_due:
+            self.decode_scale = min(self.display_scale(), self.bus_scale())
+        else:
+            self.decode_scale = self.bus_scale()
+        return True
+
+    def _decode_pooled(self, data):
+        pool = self.recorder.frame_pool
+        try:
+            height, width, _, _ = simplejpeg.decode_jpeg_header(data)
+        except ValueError:
+            return None
+        buffer = pool.acquire((height, width, 3))
+        try:
+            return simplejpeg.decode_jpeg(data, colorspace='BGR', buffer=buffer, strict=False)
+        except ValueError:
+            pool.release(buffer)
+            return None
+
+    def display_copy(self, frame: np.ndarray) -> np.ndarray:
+        """나중에 표시할 프레임의 복사본 (녹화기로 넘긴 풀 버퍼는 재사용되므로 표시 크기로 축소 복사)"""
+        height, width = frame.shape[:2]
+        if not self.display_width or width <= self.display_width:
+            return frame.copy()
+        return cv2.resize(frame, (self.display_width, height * self.display_width // width),
+                          interpolation=cv2.INTER_AREA)
+
+    def display_scale(self) -> int:
+        """표시 창 너비에 맞는 축소 디코딩 배율 (원본 너비를 모르면 1)"""
+        if not self.display_width or not self.source_width:
+            return 1
+        return reduced_scale(self.source_width, self.display_width)
+
+    def bus_scale(self) -> int:
+        """FRAME_BUS_WIDTH에 맞는 프레임 버스용 축소 디코딩 배율 (원본 너비를 모르면 1)"""
+        if not cfg.FRAME_BUS_WIDTH or not self.source_width:
+            return 1
+        return reduced_scale(self.source_width, cfg.FRAME_BUS_WIDTH)
+
+    def _capture_time(self, capture_us) -> float:
+        """서버 캡처 시각을 클라이언트 시계(time.time) 기준으로 변환 (알 수 없으면 수신 시각)"""
+        if capture_us is None or self.clock_offset_us is None:
+            return time.time()
+        return time.time() - (now_us() - self.clock_offset_us - capture_us) / 1e6
+
+    def decode(self, data, scale: int = 1, pooled: bool = False):
+        """JPEG 디코딩 (OpenCV가 GIL을 해제하므로 작업 스레드에서 호출 가능)
+
+        Args:
+            data: JPEG 바이트
+            scale: 축소 배율 (1, 2, 4, 8). libjpeg가 IDCT 단계에서 바로 축소하여 디코딩
+            pooled: 녹화기로 넘길 원본 해상도 프레임이면 True. simplejpeg가 있으면 녹화기의
+                frame_pool 버퍼에 직접 디코딩하여 프레임마다 할당하지 않음
+        """
+        start = perf_counter_ns()
+        if pooled and scale == 1 and simplejpeg is not None:
+            frame = self._decode_pooled(data)
+        else:
+            frame = cv2.imdecode(np.frombuffer(data, np.uint8), DECODE_FLAGS[scale])
+            if frame is not None:
+                self.frames_allocated += 1
+                self.bytes_allocated += frame.nbytes
+        elapsed_ns = perf_counter_ns() - start
+        if __debug__ and self.latency is not None:
+            self.latency.record('decode', elapsed_ns)
+        elapsed = elapsed_ns / 1e9
+        if frame is not None:
+            self.source_width = frame.shape[1] * scale
+        self.frames_decoded += 1
+        self.decode_time_total += elapsed
+        self._stats_decoded += 1
+        self._stats_decode_time += elapsed
+        return frame
+
+    def deliver(self, frame: np.ndarray) -> bool:
+        """디코딩된 라이브 프레임을 녹화기로 전달하고 화면에 표시할 차례인지 반환"""
+        if self.frame_bus is not None:
+            # 녹화기로 소유권을 넘기기 전에 게시 (풀 버퍼는 인코딩 후 재사용됨)
+            self.frame_bus.publish(frame, self._frame_time)
+        if self._full_decode:
+            self.recorder.update_frame(frame, self._frame_time)
+        return self._display_due
+
+    def show(self, frame: np.ndarray):
+        """프레임을 창에 표시
+
+        DISPLAY_WIDTH가 설정되면 크기 조절 가능한 창을 만들고, 사용자가 바꾼 창 너비를 다음
+        프레임의 축소 디코딩 배율 선택에 사용합니다. 창보다 큰 프레임은 창 크기에 맞춰 표시됩니다.
+        """
+        if not self.display_width:
+            cv2.imshow(self.window_name, frame)
+            return
+        if not self._window_created:
+            height, width = frame.shape[:2]
+            cv2.namedWindow(self.window_name, cv2.WINDOW_NORMAL)
+            cv2.resizeWindow(self.window_name, self.display_width, self.display_width * height // width)
+            self._window_created = True
+        else:
+            try:
+                window_width = cv2.getWindowImageRect(self.window_name)[2]
+            except (cv2.error, AttributeError):
+                window_width = 0
+            if window_width > 0:
+                self.display_width = window_width
+        cv2.imshow(self.window_name, frame)
+
+    def handle_command(self, command: str, session_id: str = None):
+        """녹화 명령 처리 (session_id: 녹화 시작 명령과 함께 받은 세션 ID)"""
         normalized = command.lower().strip()
-        if normalized in ("start", "true", "recording_start"):
-            self.recorder.start_recording()
-        elif normalized in ("stop", "false", "recording_stop"):
-            self.recorder.stop_recording()
+        if normalized in START_COMMANDS:
+            self.start_recording(session_id)
+        elif normalized in STOP_COMMANDS:
+            self.stop_recording()
+
+    def start_recording(self, session_id: str = None):
+        """녹화 시작 (서버가 지원하면 트리거 이전 구간도 요청)"""
+        if self.recorder.is_recording:
+            return
+        self._start_preroll()
+        self.recorder.start_recording(session_id)
+
+    def _start_preroll(self):
+        """녹화 시작 시 서버가 지원하면 RECORDING_PREROLL_SECONDS만큼의 이전 구간 요청"""
+        self.preroll_last_sequence = None
+        if (self.protocol_version == PROTOCOL_V2 and self.server_preroll_seconds > 0
+                and cfg.RECORDING_PREROLL_SECONDS > 0):
+            self.request_preroll(min(cfg.RECORDING_PREROLL_SECONDS, self.server_preroll_seconds))
+
+    def stop_recording(self):
+        """녹화 정지"""
+        self._end_preroll()
+        self.recorder.stop_recording()
+
+    def request_preroll(self, seconds: float):
+        """서버에 지정한 시간만큼의 pre-roll 프레임 요청
+
+        Args:
+            seconds: 현재 시각 기준으로 거슬러 올라갈 시간 (초)
+        """
+        message = {'cmd': 'preroll'}
+        if self.clock_offset_us is not None:
+            # 서버 단조 시계 기준 시각으로 변환하여 요청
+            message['since_us'] = now_us() - self.clock_offset_us - int(seconds * 1e6)
+        else:
+            message['seconds'] = seconds
+        try:
+            self.send_control(message)
+        except OSError as e:
+            logging.error(f"[{self.server_ip}] Failed to request pre-roll: {e}")
+            return
+        self.preroll_pending = True
+        self.preroll_requested_at = time.time()
+        logging.info(f"[{self.server_ip}] Requested {seconds:.1f}s pre-roll")
+
+    def send_control(self, message: dict):
+        """서버로 제어 메시지 전송"""
+        self.client_socket.sendall(pack_hello(message))
+
+    def _end_preroll(self):
+        self.preroll_pending = False
+        self.preroll_requested_at = None
+
+    def _on_control(self, message: dict):
+        """서버 제어 메시지 처리"""
+        if message.get('cmd') == 'preroll_end':
+            self.preroll_last_sequence = message.get('last_sequence')
+            self._end_preroll()
+            logging.info(f"[{self.server_ip}] Received {message.get('count', 0)} pre-roll frames")
+        else:
+            logging.warning(f"[{self.server_ip}] Unknown control message: {message}")
+
+    def _should_record(self, is_preroll: bool, sequence) -> bool:
+        """pre-roll 버스트와 라이브 프레임의 중복 없이 기록할지 판단"""
+        if is_preroll:
+            return True
+        if self.preroll_pending:
+            if time.time() - self.preroll_requested_at < cfg.PREROLL_TIMEOUT:
+                # 버스트에 포함될 라이브 프레임은 기록하지 않음
+                return False
+            logging.warning(f"[{self.server_ip}] Pre-roll not received in time. Recording live frames only.")
+            self._end_preroll()
+        if self.preroll_last_sequence is not None and sequence is not None:
+            return sequence > self.preroll_last_sequence
+        return True
+
+    def dump_latency(self):
+        """누적 지연 시간 히스토그램을 LATENCY_DUMP_DIR에 JSON으로 저장 (python -m client.core.latency로 확인)"""
+        if self.latency is None or not cfg.LATENCY_DUMP_DIR:
+            return
+        try:
+            path = self.latency.dump(cfg.LATENCY_DUMP_DIR)
+            logging.info(f"[{self.server_ip}] Latency histograms saved to {path}")
+        except OSError as e:
+            logging.error(f"[{self.server_ip}] Failed to save latency histograms: {e}")
 
     def cleanup(self):
         """리소스 정리"""
         if self.client_socket:
             self.client_socket.close()
+        if self.frame_bus is not None:
+            self.frame_bus.close()
+            self.frame_bus = None
+        self.dump_latency()
         # OpenCV 창을 확실히 닫기
         cv2.destroyAllWindows()
         cv2.waitKey(1)  # 창 닫기를 처리하기 위한 추가 대기
         # 특정 창만 닫기
         try:
-            cv2.destroyWindow(f'Stream from {self.server_ip}')
+            cv2.destroyWindow(self.window_name)
         except:
             pass
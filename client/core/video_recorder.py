@@ -4,23 +4,45 @@ import time
 import logging
 import threading
 import numpy as np
+from time import perf_counter_ns
+from collections import deque
 from datetime import datetime
+from protocol import CODEC_MJPEG, CODEC_H264
+import config as cfg
+from .h264_writer import H264SegmentWriter
+from .mjpeg_writer import MJPEGSegmentWriter
+from .segment_manifest import SegmentManifest
+from .session_manifest import SessionTrack, new_session_id
+from .encoders import EncoderProcess, create_encoder
+from .frame_pool import FramePool
+from .latency import pipeline_latency
 
 class VideoRecorder:
     """비디오 녹화를 담당하는 클래스
     
-    실시간 스트리밍 영상을 MP4로 저장하며, 1분 단위로 분할 저장합니다.
-    각 영상은 Data/<서버IP>/ 디렉토리에 YYYYMMDD_HHMMSS.mp4 형식으로 저장됩니다.
+    실시간 스트리밍 영상을 MP4로 저장하며, RECORDING_SEGMENT_SECONDS(기본 1분) 단위로 분할 저장합니다.
+    각 영상은 Data/cam/<서버IP>/ 디렉토리에 기록 중에는 YYYYMMDD_HHMMSS.mmm.mp4, 파일이 닫히면
+    <시작ms>-<종료ms>.mp4 이름으로 저장되고, 같은 디렉토리의 manifest.csv에 한 줄씩 등록됩니다.
     
     Attributes:
         server_ip (str): 서버 IP 주소
         is_recording (bool): 현재 녹화 상태
         recording_thread (threading.Thread): 녹화 처리 스레드
-        writer (cv2.VideoWriter): 비디오 writer 객체
-        start_time (float): 현재 파일 녹화 시작 시간
-        frame (numpy.ndarray): 최신 프레임 데이터
-        frame_count (int): 현재 파일의 프레임 수
-        last_frame_time (float): 마지막 프레임 처리 시간
+        writer: 인코더 (OpenCVEncoder, FFmpegEncoder 또는 별도 프로세스의 EncoderProcess)
+        start_time (float): 현재 파일 첫 프레임의 캡처 시각
+        video_path (str): 기록 중인 mp4 파일 경로
+        segment_seconds (float): 파일 분할 간격 (초)
+        frame_count (int): 현재 파일의 프레임 수 (중복 기록 포함)
+        last_frame_time (float): 마지막으로 기록한 프레임의 캡처 시각
+        frame_policy (str): 타임스탬프 처리 방식 ('cfr': 목표 fps 슬롯에 맞춰 중복/폐기, 'vfr': 받은 순서대로 모두 기록)
+        segment_stats (dict): 현재 파일의 통계 (received, written, duplicated, dropped, queue_dropped)
+        codec (str): 수신 스트림 코덱 ('h264'이면 디코딩/재인코딩 없이 그대로 저장)
+        backend (str): 녹화 백엔드 ('opencv': mp4v, 'ffmpeg': libx264, 'mjpeg': 수신한 JPEG 그대로)
+        encoder_process (bool): 인코더를 별도 프로세스에서 실행할지 여부
+        frame_pool (FramePool): 뷰어와 주고받는 프레임 버퍼 풀 (기록이 끝난 프레임은 풀로 반환)
+        frames_copied (int): 인코더로 전달하면서 복사한 프레임 수 (별도 프로세스/ffmpeg 파이프)
+        session (SessionTrack): 녹화 세션의 이 카메라 프레임 인덱스 (녹화 중에만 존재)
+        latency (PipelineLatency): 뷰어와 공유하는 단계별 지연 시간 히스토그램 (비활성화 시 None)
     """
     
     _instances = {}
@@ -45,11 +67,42 @@ class VideoRecorder:
         self.recording_thread = None
         self.writer = None
         self.start_time = None
-        self.frame = None
         self.lock = threading.Lock()
+        self._frames = deque()  # 기록 대기 중인 (캡처 시각, 프레임)
+        self._preroll = deque()  # 기록 대기 중인 pre-roll (캡처 시각, JPEG 바이트), 라이브 프레임보다 먼저 기록
+        self._preroll_bytes = 0
+        self.preroll_queue_bytes = cfg.RECORDING_PREROLL_QUEUE_BYTES
+        self._frames_ready = threading.Condition(self.lock)
+        self.queue_size = cfg.RECORDING_QUEUE_SIZE
+        self.fps = cfg.RECORDING_FPS
+        self.frame_policy = cfg.RECORDING_FRAME_POLICY
+        self.segment_stats = self._new_segment_stats()
+        self.last_segment_stats = None
+        self._last_written = None
+        self._timecodes = None
+        self.video_path = None
+        self.segment_seconds = cfg.RECORDING_SEGMENT_SECONDS
+        self.max_gap_seconds = cfg.RECORDING_MAX_GAP_SECONDS
+        self._manifest = None
+        self._manifest_lock = threading.Lock()  # 녹화 스레드와 SegmentClose 스레드가 동시에 처음 사용할 수 있음
+        self._closing = []  # 백그라운드에서 닫는 중인 패스스루 파일 스레드
         self.observers = []
         self.frame_count = 0
         self.last_frame_time = None
+        self.codec = CODEC_MJPEG
+        self.backend = cfg.RECORDING_CAMERA_BACKENDS.get(server_ip, cfg.RECORDING_BACKEND)
+        self.encoder_options = {'preset': cfg.RECORDING_X264_PRESET, 'crf': cfg.RECORDING_X264_CRF,
+                                'threads': cfg.RECORDING_X264_THREADS}
+        self.encoder_process = cfg.RECORDING_ENCODER_PROCESS
+        self._encoder_process = None
+        self.frame_pool = FramePool(cfg.RECORDING_FRAME_POOL_SIZE)
+        self.frames_copied = 0
+        self.bytes_copied = 0
+        self.encoded_writer = None
+        self.session = None
+        self._session_file = None  # 기록 중인 파일의 세션 내 번호
+        # 뷰어와 공유하는 단계별 지연 시간 히스토그램 (인코딩/기록 단계, LATENCY_PROBES가 False면 None)
+        self.latency = pipeline_latency(server_ip, cfg.LATENCY_PROBES, cfg.LATENCY_SUMMARY_INTERVAL)
         self.initialized = True
 
     def add_observer(self, observer):
@@ -78,186 +131,391 @@ class VideoRecorder:
         os.makedirs(recording_dir, exist_ok=True)
         return recording_dir
 
-    def create_writer(self):
-        """새로운 VideoWriter 객체 생성
+    def create_writer(self, frame: np.ndarray, timestamp: float):
+        """새로운 인코더 생성
         
+        Args:
+            frame: 파일의 첫 프레임 (해상도 결정용)
+            timestamp: 첫 프레임의 캡처 시각. 파일 시작 시각으로 사용
+            
         Returns:
-            cv2.VideoWriter: 생성된 writer 객체
-            None: 프레임이 없는 경우
+            backend에 맞는 인코더 (encoder_process이면 인코더 프로세스 프록시)
             
         Note:
-            파일명은 YYYYMMDD_HHMMSS.mp4 형식으로 생성됩니다.
+            파일명은 YYYYMMDD_HHMMSS.mmm.mp4 형식으로 생성됩니다.
+            'vfr' 방식이면 프레임별 시각을 같은 이름의 .timecodes.txt (timecode format v2)에 기록합니다.
         """
-        recording_dir = self.get_recording_directory()
-        now = datetime.now()
-        timestamp = now.strftime("%Y%m%d_%H%M%S")
-        microseconds = now.microsecond // 1000  # 밀리초로 변환
-        video_path = os.path.join(recording_dir, f"{timestamp}.{microseconds:03d}.mp4")
-        
+        path_without_ext = os.path.join(self.get_recording_directory(), self._recording_name(timestamp))
+        height, width = frame.shape[:2]
+        # fps는 컨테이너 명목값 ('vfr'이면 실제 시각은 timecodes 파일)
+        if self.encoder_process:
+            if self._encoder_process is not None and not self._encoder_process.is_alive():
+                # 인코더 프로세스가 죽었으면(메모리 부족, 코덱 오류 등) 정리 후 다시 시작
+                logging.warning(f"[{self.server_ip}] Encoder process exited "
+                                f"(exit code {self._encoder_process.exitcode}), restarting")
+                self._encoder_process.stop()
+                self._encoder_process = None
+            if self._encoder_process is None:
+                self._start_encoder_process()
+            writer = self._encoder_process.open(self.backend, path_without_ext, width, height, self.fps,
+                                                self.encoder_options)
+        else:
+            writer = create_encoder(self.backend, path_without_ext, width, height, self.fps, self.encoder_options)
+        video_path = writer.path
+
+        if self.frame_policy == 'vfr':
+            self._timecodes = open(os.path.splitext(video_path)[0] + ".timecodes.txt", "w")
+            self._timecodes.write("# timecode format v2\n")
+        self.video_path = video_path
+        self._session_file = self.session.add_file(video_path)
+        self.start_time = timestamp
+        self.frame_count = 0
+        self.last_frame_time = timestamp
         with self.lock:
-            frame = self.frame
-
-        if frame is not None:
-            height, width = frame.shape[:2]
-            writer = cv2.VideoWriter(
-                video_path,
-                cv2.VideoWriter_fourcc(*'mp4v'),
-                30.0,  # 목표 fps
-                (width, height)
-            )
-            if not writer.isOpened():
-                raise IOError(f"Failed to create video writer for {video_path}")
-            
-            self.start_time = time.time()
-            self.frame_count = 0
-            self.last_frame_time = self.start_time
-            logging.info(f"[{self.server_ip}] Created new video file: {video_path}")
-            return writer
-        return None
+            self.segment_stats = self._new_segment_stats()
+        logging.info(f"[{self.server_ip}] Created new video file: {video_path}")
+        return writer
+
+    @staticmethod
+    def _recording_name(timestamp: float) -> str:
+        """기록 중인 파일 이름 (첫 프레임 캡처 시각 기준 YYYYMMDD_HHMMSS.mmm, 파일마다 고유)"""
+        start = datetime.fromtimestamp(timestamp)
+        return f"{start.strftime('%Y%m%d_%H%M%S')}.{start.microsecond // 1000:03d}"
+
+    @staticmethod
+    def _new_segment_stats() -> dict:
+        return {'received': 0, 'written': 0, 'duplicated': 0, 'dropped': 0, 'queue_dropped': 0}
+
+    @property
+    def manifest(self) -> SegmentManifest:
+        """카메라별 녹화 파일 목록 (처음 사용할 때 로드, 인스턴스는 하나만 생성)"""
+        with self._manifest_lock:
+            if self._manifest is None:
+                self._manifest = SegmentManifest(self.get_recording_directory())
+            return self._manifest
+
+    def find_segments(self, start_ms: int, end_ms: int) -> list:
+        """[start_ms, end_ms] 구간의 녹화 파일 목록 반환 (manifest 조회, 디렉토리 탐색 없음)"""
+        return self.manifest.find(start_ms, end_ms)
+
+    def _finish_segment(self, rename, path: str, start_time: float, end_time: float, frames: int) -> str:
+        """닫힌 파일 이름을 시작-종료 시각으로 바꾸고 manifest에 등록
+
+        Args:
+            rename: 확장자를 뺀 새 경로를 받아 파일 이름을 바꾸고 새 경로를 반환하는 함수
+            path: 현재 파일 경로
+            start_time: 첫 프레임 캡처 시각
+            end_time: 마지막 프레임 캡처 시각
+            frames: 프레임 수
+
+        Returns:
+            str: 새 파일 경로
+        """
+        start_ms, end_ms = int(start_time * 1000), int(end_time * 1000)
+        new_path = rename(os.path.join(os.path.dirname(path), f"{start_ms}-{end_ms}"))
+        self.manifest.append(start_ms, end_ms, frames, os.path.getsize(new_path), new_path)
+        if self.session is not None:
+            self.session.rename_file(path, new_path)
+        logging.info(f"[{self.server_ip}] Renamed video file to: {os.path.basename(new_path)}")
+        return new_path
+
+    def _start_encoder_process(self):
+        self._encoder_process = EncoderProcess(name=f"Encoder-{self.server_ip}")
+
+    def _rename_video(self, path_without_ext: str) -> str:
+        new_path = path_without_ext + os.path.splitext(self.video_path)[1]
+        os.rename(self.video_path, new_path)
+        if self._timecodes is not None:
+            self._timecodes.close()
+            self._timecodes = None
+            os.rename(os.path.splitext(self.video_path)[0] + ".timecodes.txt", path_without_ext + ".timecodes.txt")
+        return new_path
 
     def _close_writer(self):
         """현재 VideoWriter를 안전하게 종료하고 파일명을 시작-종료 시간으로 변경"""
-        if self.writer is not None:
-            try:
-                # 현재 파일의 실제 fps 계산 및 로깅
-                if self.frame_count > 0:
-                    end_time = time.time()
-                    duration = end_time - self.start_time
-                    fps = self.frame_count / duration
-                    
-                    # 기존 파일명 찾기
-                    recording_dir = self.get_recording_directory()
-                    current_filename = None
-                    for file in os.listdir(recording_dir):
-                        if file.endswith(".mp4"):
-                            file_path = os.path.join(recording_dir, file)
-                            stat = os.stat(file_path)
-                            # 가장 최근에 수정된 파일 찾기
-                            if stat.st_mtime >= self.start_time:
-                                current_filename = file
-                                break
-                    
-                    if current_filename:
-                        # 새 파일명 생성 (Unix 타임스탬프 형식, 밀리초 포함)
-                        start_ms = int(self.start_time * 1000)
-                        end_ms = int(end_time * 1000)
-                        new_filename = f"{start_ms}-{end_ms}.mp4"
-                        old_path = os.path.join(recording_dir, current_filename)
-                        new_path = os.path.join(recording_dir, new_filename)
-                        
-                        # 파일명 변경
-                        self.writer.release()
-                        os.rename(old_path, new_path)
-                        logging.info(f"[{self.server_ip}] Renamed video file to: {new_filename}")
-                        logging.info(f"[{self.server_ip}] Recording statistics - Duration: {duration:.1f}s, "
-                                   f"Frames: {self.frame_count}, FPS: {fps:.1f}")
-                    else:
-                        self.writer.release()
-                        logging.warning(f"[{self.server_ip}] Could not find current recording file to rename")
-                else:
-                    self.writer.release()
-            except Exception as e:
-                logging.error(f"[{self.server_ip}] Error closing video writer: {e}")
-            finally:
-                self.writer = None
-
-    def _process_frame(self):
-        """현재 프레임을 파일에 기록
-        
-        Returns:
-            bool: 프레임 처리 성공 여부
+        if self.writer is None:
+            return
+        try:
+            self.writer.release()
+            if self.frame_count > 0:
+                self._finish_segment(self._rename_video, self.video_path, self.start_time,
+                                     self.last_frame_time, self.frame_count)
+                # 원본 fps는 받은 프레임의 캡처 시각 기준, 출력 fps는 기록한 프레임(중복 포함) 기준
+                stats = self.segment_stats
+                duration = self.last_frame_time + 1.0 / self.fps - self.start_time
+                span = self.last_frame_time - self.start_time
+                source_fps = (stats['received'] - 1) / span if span > 0 else 0.0
+                logging.info(f"[{self.server_ip}] Recording statistics - Duration: {duration:.1f}s, "
+                             f"Frames: {self.frame_count}, SourceFPS: {source_fps:.1f}, "
+                             f"OutputFPS: {self.frame_count / duration:.1f}, "
+                             f"Duplicated: {stats['duplicated']}, Dropped: {stats['dropped']}, "
+                             f"QueueDropped: {stats['queue_dropped']}")
+        except Exception as e:
+            logging.error(f"[{self.server_ip}] Error closing video writer: {e}")
+        finally:
+            self._release_last_written()
+            self.writer = None
+            self.video_path = None
+            self._close_timecodes()
+            self.last_segment_stats = dict(self.segment_stats, frames=self.frame_count)
+
+    def _close_timecodes(self):
+        if self._timecodes is not None:
+            self._timecodes.close()
+            self._timecodes = None
+
+    def _write_frame(self, frame: np.ndarray, timestamp: float):
+        """캡처 시각에 맞춰 프레임 기록
+
+        'cfr' 방식은 파일 시작 시각부터 1/fps 간격의 슬롯에 프레임을 배치합니다. 이미 채워진 슬롯의
+        프레임은 폐기하고(입력이 목표 fps보다 빠름), 빈 슬롯은 직전 프레임을 반복해 채워(입력이 느림)
+        영상 길이가 실제 시간과 같게 유지됩니다. 'vfr' 방식은 모든 프레임을 한 번씩 기록하고
+        시각을 timecodes 파일에 남깁니다.
+        """
+        stats = self.segment_stats
+        stats['received'] += 1
+        if self.frame_policy == 'cfr':
+            slot = int((timestamp - self.start_time) * self.fps + 0.5)
+            if slot < self.frame_count:
+                stats['dropped'] += 1
+                self.frame_pool.release(frame)
+                return
+            while self.frame_count < slot and self._last_written is not None:
+                self._encode(self._last_written)
+                self.frame_count += 1
+                stats['duplicated'] += 1
+        else:
+            self._timecodes.write(f"{(timestamp - self.start_time) * 1000:.3f}\n")
+
+        # 세션 인덱스에는 프레임이 처음 기록된 위치만 등록 ('cfr' 중복 기록은 같은 프레임)
+        self.session.append(int(timestamp * 1000), self._session_file, self.frame_count)
+        # 인코딩 시간 분포는 뷰어와 공유하는 지연 시간 히스토그램에 기록 (느려지면 대기열이 쌓임)
+        if __debug__ and self.latency is not None:
+            start = perf_counter_ns()
+        self._encode(frame)
+        if __debug__ and self.latency is not None:
+            self.latency.record('encode', perf_counter_ns() - start)
+        self.frame_count += 1
+        stats['written'] += 1
+        self._release_last_written()
+        self._last_written = frame  # 'cfr' 빈 슬롯을 채울 때까지 보관
+        self.last_frame_time = max(self.last_frame_time, timestamp)
+
+    def _encode(self, frame: np.ndarray):
+        self.writer.write(frame)
+        if getattr(self.writer, 'copies_frames', False):
+            self.frames_copied += 1
+            self.bytes_copied += frame.nbytes
+
+    def _release_last_written(self):
+        if self._last_written is not None:
+            self.frame_pool.release(self._last_written)
+            self._last_written = None
+
+    def add_preroll_jpeg(self, data: bytes, timestamp: float):
+        """서버에서 받은 pre-roll JPEG를 기록 대기열에 추가 (디코딩은 녹화 스레드에서 수행)
+
+        버스트는 회선 속도로 도착하므로 원본 해상도로 디코딩해 쌓으면 3초 분량만으로 수백 MB가
+        됩니다. JPEG 그대로 preroll_queue_bytes까지만 보관하고, 넘치면 가장 오래된 프레임을 폐기합니다.
         """
         with self.lock:
-            frame = self.frame
-            
-        if frame is not None and self.writer is not None:
-            try:
-                start_time = time.time()
-                self.writer.write(frame)
-                process_time = time.time() - start_time
-                
-                # 프레임 처리 시간이 너무 긴 경우 경고
-                if process_time > 0.033:  # 30fps 기준 한 프레임당 시간 (1/30초)
-                    logging.warning(f"[{self.server_ip}] Frame processing took {process_time:.3f}s")
-                return True
-            except Exception as e:
-                logging.error(f"[{self.server_ip}] Error writing video frame: {e}")
+            if not self.is_recording:
+                return
+            while self._preroll and self._preroll_bytes + len(data) > self.preroll_queue_bytes:
+                self._preroll_bytes -= len(self._preroll.popleft()[1])
+                self.segment_stats['queue_dropped'] += 1
+            self._preroll.append((timestamp, data))
+            self._preroll_bytes += len(data)
+            self._frames_ready.notify()
+
+    def _next_frame(self):
+        """다음 기록할 프레임 대기 (pre-roll은 라이브 프레임보다 이전 구간이므로 먼저 반환)
+
+        Returns:
+            tuple: (캡처 시각, 프레임 또는 pre-roll JPEG 바이트)
+            None: 녹화가 중지되고 대기열이 비었음
+        """
+        with self._frames_ready:
+            while not self._preroll and not self._frames and self.is_recording:
+                self._frames_ready.wait(0.5)
+            if self._preroll:
+                item = self._preroll.popleft()
+                self._preroll_bytes -= len(item[1])
+                return item
+            if self._frames:
+                return self._frames.popleft()
+            return None
+
+    def _starts_new_segment(self, timestamp: float) -> bool:
+        """현재 파일을 닫고 이 프레임부터 새 파일을 시작할지 여부"""
+        if timestamp - self.start_time >= self.segment_seconds:
+            return True
+        gap = timestamp - self.last_frame_time
+        if self.frame_policy == 'cfr' and gap > self.max_gap_seconds:
+            # 스트림 중단/재연결 후 빈 구간을 직전 프레임으로 한꺼번에 채우지 않음
+            logging.info(f"[{self.server_ip}] {gap:.1f}s gap in frames. Starting a new video file")
+            return True
         return False
 
     def recording_thread_function(self):
-        """녹화 스레드 메인 함수"""
-        TARGET_FPS = 30
-        target_frame_time = 1.0 / TARGET_FPS
+        """녹화 스레드 메인 함수
+
+        수신 스레드가 넣은 (캡처 시각, 프레임)을 순서대로 꺼내 인코딩합니다. 녹화가 중지되면
+        대기열에 남은 프레임까지 기록한 뒤 파일을 닫습니다.
+        """
         stats_interval = 5.0  # 통계 출력 간격 (초)
         last_stats_time = time.time()
-        expected_frames = 0
-        next_frame_time = time.time()  # 다음 프레임 처리 시작 시간
-        
+        last_stats = self._new_segment_stats()
+        if self.encoder_process:
+            # 인코더 프로세스는 시작(모듈 로드)에 시간이 걸리므로 첫 프레임을 기다리는 동안 미리 시작
+            self._start_encoder_process()
+
         try:
-            while self.is_recording:
-                current_time = time.time()
-                
+            while True:
+                item = self._next_frame()
+                if item is None:
+                    break
+                timestamp, frame = item
+                if isinstance(frame, bytes):
+                    frame = cv2.imdecode(np.frombuffer(frame, np.uint8), cv2.IMREAD_COLOR)
+                    if frame is None:
+                        logging.warning(f"[{self.server_ip}] Pre-roll frame decode failed")
+                        continue
                 try:
+                    if self.writer is not None and self._starts_new_segment(timestamp):
+                        # 분할 시점: 현재 프레임부터 새 파일에 기록하므로 경계에서 버려지는 프레임 없음
+                        self._close_writer()
                     # 파일이 없는 경우에만 새로 생성
                     if self.writer is None:
-                        self.writer = self.create_writer()
-                        next_frame_time = current_time  # 녹화 시작 시간으로 초기화
-                    
-                    # 정확한 30fps를 위한 타이밍 제어
-                    sleep_time = next_frame_time - current_time
-                    if sleep_time > 0:
-                        time.sleep(sleep_time)
-                    
-                    # 프레임 처리 시작
-                    frame_start = time.time()
-                    if self._process_frame():
-                        self.frame_count += 1
-                        expected_frames += 1
-                        
-                        # 다음 프레임 시간 계산 (드리프트 방지를 위해 이전 시간 기준)
-                        next_frame_time += target_frame_time
-                        
-                        # 만약 처리가 너무 늦어져서 next_frame_time이 현재보다 과거가 되면 리셋
-                        if next_frame_time < time.time():
-                            logging.warning(f"[{self.server_ip}] Frame timing reset due to processing delays")
-                            next_frame_time = time.time() + target_frame_time
-                        
-                        # 주기적으로 성능 통계 출력
-                        if current_time - last_stats_time >= stats_interval:
-                            duration = current_time - last_stats_time
-                            expected = int(duration * TARGET_FPS)
-                            actual = expected_frames
-                            fps = actual / duration
-                            logging.info(f"[{self.server_ip}] Recording stats:"
-                                       f" FPS={fps:.1f},"
-                                       f" Expected={expected},"
-                                       f" Actual={actual},"
-                                       f" Dropped={expected-actual}")
-                            last_stats_time = current_time
-                            expected_frames = 0
-                        
-                        # 프레임 처리 시간 모니터링
-                        frame_process_time = time.time() - frame_start
-                        if frame_process_time > target_frame_time:
-                            logging.warning(f"[{self.server_ip}] Frame processing too slow:"
-                                          f" took {frame_process_time:.3f}s"
-                                          f" (target: {target_frame_time:.3f}s)")
-                        
-                        self.last_frame_time = time.time()
-                    
+                        self.writer = self.create_writer(frame, timestamp)
+                        last_stats = self._new_segment_stats()
+                    self._write_frame(frame, timestamp)
                 except Exception as e:
                     logging.error(f"[{self.server_ip}] Recording error: {e}")
+                    self.frame_pool.release(frame)
                     self._close_writer()
                     time.sleep(0.1)  # 에러 발생 시 잠시 대기
-                
+                    continue
+
+                # 주기적으로 성능 통계 출력
+                now = time.time()
+                if now - last_stats_time >= stats_interval:
+                    duration = now - last_stats_time
+                    stats = dict(self.segment_stats)
+                    delta = {key: stats[key] - last_stats[key] for key in stats}
+                    logging.info(f"[{self.server_ip}] Recording stats:"
+                                 f" FPS={delta['received'] / duration:.1f},"
+                                 f" Written={delta['written']},"
+                                 f" Duplicated={delta['duplicated']},"
+                                 f" Dropped={delta['dropped']},"
+                                 f" QueueDropped={delta['queue_dropped']},"
+                                 f" Queue={len(self._frames)}")
+                    last_stats_time = now
+                    last_stats = stats
         finally:
             self._close_writer()
+            if self._encoder_process is not None:
+                self._encoder_process.stop()
+                self._encoder_process = None
             logging.info(f"[{self.server_ip}] Recording thread terminated")
 
-    def start_recording(self):
-        """녹화 시작"""
+    @property
+    def passthrough(self) -> bool:
+        """수신한 인코딩 프레임을 그대로 저장하는지 여부 (디코딩된 프레임이 필요 없음)"""
+        return self.codec == CODEC_H264 or self.backend == 'mjpeg'
+
+    def write_encoded(self, data: bytes, keyframe: bool = True, timestamp: float = None, sequence: int = None):
+        """H.264 액세스 유닛 또는 JPEG를 재인코딩 없이 기록
+
+        파일은 segment_seconds가 지난 뒤 첫 키프레임에서 분할하며, 이전 파일은 백그라운드에서 닫습니다.
+
+        Args:
+            data: Annex-B 액세스 유닛 또는 JPEG
+            keyframe: IDR(SPS/PPS 포함) 여부. 새 파일은 키프레임부터 시작 (JPEG는 항상 True)
+            timestamp: 캡처 시각 (time.time 기준 초)
+            sequence: 서버 프레임 순번
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        with self.lock:
+            if not self.is_recording:
+                return
+            if (self.encoded_writer is not None and keyframe
+                    and timestamp - self.start_time >= self.segment_seconds):
+                self._close_encoded_writer()
+            if self.encoded_writer is None:
+                if not keyframe:
+                    return
+                writer_class = H264SegmentWriter if self.codec == CODEC_H264 else MJPEGSegmentWriter
+                self.encoded_writer = writer_class(
+                    os.path.join(self.get_recording_directory(), self._recording_name(timestamp)))
+                self.start_time = timestamp
+                self._session_file = self.session.add_file(self.encoded_writer.path)
+                logging.info(f"[{self.server_ip}] Created new video file: {self.encoded_writer.path}")
+            try:
+                position = self.encoded_writer.frame_count
+                if __debug__ and self.latency is not None:
+                    start = perf_counter_ns()
+                self.encoded_writer.write(data, timestamp, sequence)
+                if __debug__ and self.latency is not None:
+                    self.latency.record('encode', perf_counter_ns() - start)
+                self.session.append(int(timestamp * 1000), self._session_file, position)
+                self.last_frame_time = timestamp
+            except (BrokenPipeError, OSError) as e:
+                logging.error(f"[{self.server_ip}] Error writing encoded data: {e}")
+                self._close_encoded_writer()
+
+    def _detach_encoded_writer(self):
+        """재인코딩 없는 writer를 분리하여 _finish_encoded_writer() 인자 반환 (없으면 None, self.lock 보유 상태에서 호출)"""
+        writer = self.encoded_writer
+        if writer is None:
+            return None
+        self.encoded_writer = None
+        return writer, self.start_time, self.last_frame_time
+
+    def _close_encoded_writer(self):
+        """재인코딩 없는 writer를 분리하여 별도 스레드에서 닫기 (ffmpeg 종료 대기로 수신이 멈추지 않도록)"""
+        args = self._detach_encoded_writer()
+        if args is None:
+            return
+        self._closing = [thread for thread in self._closing if thread.is_alive()]
+        thread = threading.Thread(target=self._finish_encoded_writer, args=args,
+                                  name=f"SegmentClose-{self.server_ip}")
+        thread.start()
+        self._closing.append(thread)
+
+    def _finish_encoded_writer(self, writer, start_time: float, end_time: float):
+        """재인코딩 없는 writer를 닫고 파일명을 시작-종료 시간으로 변경"""
+        try:
+            writer.release()
+            if writer.frame_count == 0:
+                return
+            self._finish_segment(writer.rename, writer.path, start_time, end_time, writer.frame_count)
+            duration = end_time - start_time
+            logging.info(f"[{self.server_ip}] Recording statistics - Duration: {duration:.1f}s, "
+                         f"Frames: {writer.frame_count}, FPS: {(writer.frame_count - 1) / max(duration, 1e-6):.1f}")
+        except Exception as e:
+            logging.error(f"[{self.server_ip}] Error closing encoded writer: {e}")
+
+    def start_recording(self, session_id: str = None):
+        """녹화 시작
+
+        Args:
+            session_id: 녹화 세션 ID (없으면 새로 생성). 같은 명령으로 시작한 카메라/센서 기록을 묶음
+        """
         if not self.is_recording:
+            self.session = SessionTrack(session_id or new_session_id(), 'cam', self.server_ip)
+        if not self.is_recording and self.passthrough:
+            # 수신한 H.264 액세스 유닛/JPEG를 write_encoded()에서 바로 기록하므로 녹화 스레드가 필요 없음
             self.is_recording = True
+            logging.info(f"[{self.server_ip}] Started recording ({self.codec} passthrough)")
+            self._notify_observers()
+        elif not self.is_recording:
+            with self.lock:
+                self._frames.clear()
+                self._preroll.clear()
+                self._preroll_bytes = 0
+                self.is_recording = True
             self.recording_thread = threading.Thread(
                 target=self.recording_thread_function,
                 name=f"Recording-{self.server_ip}"
@@ -269,18 +527,42 @@ class VideoRecorder:
     def stop_recording(self):
         """녹화 정지"""
         if self.is_recording:
-            self.is_recording = False
+            with self.lock:
+                self.is_recording = False
+                encoded = self._detach_encoded_writer()
+                self._frames_ready.notify_all()
+            if encoded is not None:
+                # ffmpeg 종료 대기(최대 10초) 동안 수신 스레드가 잠금에서 막히지 않도록 잠금 밖에서 닫음
+                self._finish_encoded_writer(*encoded)
             if self.recording_thread is not None:
+                # 대기열에 남은 프레임을 모두 기록할 때까지 대기
                 self.recording_thread.join()
                 self.recording_thread = None
+            for thread in self._closing:
+                thread.join()
+            self._closing = []
+            self.session.close()
+            self.session = None
             logging.info(f"[{self.server_ip}] Stopped recording")
             self._notify_observers()
 
-    def update_frame(self, frame: np.ndarray):
-        """새로운 프레임 데이터 업데이트
+    def update_frame(self, frame: np.ndarray, timestamp: float = None):
+        """라이브 프레임을 기록 대기열에 추가 (녹화 중이 아니면 무시)
+
+        프레임은 복사하지 않고 소유권을 넘겨받으며, 기록이 끝나면 frame_pool로 반환합니다.
+        호출한 쪽은 넘긴 뒤 프레임을 다시 사용하지 않아야 합니다.
         
         Args:
-            frame (numpy.ndarray): 업데이트할 프레임 데이터
+            frame (numpy.ndarray): 디코딩된 프레임
+            timestamp (float): 캡처 시각 (time.time 기준, 없으면 현재 시각)
         """
         with self.lock:
-            self.frame = frame.copy()  # 프레임 데이터 복사본 저장
\ No newline at end of file
+            if not self.is_recording:
+                self.frame_pool.release(frame)
+                return
+            if len(self._frames) >= self.queue_size:
+                # 인코딩이 밀리면 가장 오래된 프레임을 폐기하고 수신은 계속 진행
+                self.frame_pool.release(self._frames.popleft()[1])
+                self.segment_stats['queue_dropped'] += 1
+            self._frames.append((timestamp if timestamp is not None else time.time(), frame))
+            self._frames_ready.notify()
\ No newline at end of file
@@ -1,10 +1,12 @@
 # client/main.py
 
 import logging
-import json
+import queue
 import multiprocessing
 import config as cfg
-from client.core import MQTTListener, StreamViewer, SensorDataLogger
+from client.core import MQTTListener, StreamViewer, SensorDataLogger, ServerRegistry
+from client.core.async_client import run_async_client
+from client.core.sensor_ingest import queue_depth
 
 def setup_logging(default_level=logging.INFO):
     """로깅 설정"""
@@ -24,72 +26,37 @@ def mqtt_listener_process(ip_queue: multiprocessing.Queue):
     """MQTT 리스너 프로세스
     
     Args:
-        ip_queue: IP 주소를 전달하는 큐
+        ip_queue: IP 주소, 녹화 명령, 센서 묶음을 전달하는 큐
     """
     mqtt_listener = MQTTListener(ip_queue)
-    
-    # 센서 데이터 로거 초기화
-    sensor_logger = SensorDataLogger()
-    
-    # MQTT 콜백에서 센서 데이터도 처리하도록 수정
-    original_on_message = mqtt_listener.on_message
-    
-    def on_message_with_sensor(client, userdata, msg):
-        # 기존 메시지 처리
-        original_on_message(client, userdata, msg)
-        
-        try:
-            topic = msg.topic
-            payload = msg.payload.decode()
-            
-            # 센서 데이터 처리
-            if topic.startswith("sensor/"):
-                try:
-                    data = json.loads(payload)
-                    if 'id' in data:
-                        del data['id']
-                    sensor_logger.save_sensor_data(topic, data)
-                    logging.debug(f"[MQTT] Processed sensor data from {topic}")
-                except json.JSONDecodeError:
-                    logging.error(f"Invalid JSON payload from {topic}: {payload}")
-            # 녹화 명령 처리
-            elif topic == cfg.MQTT_TOPIC_COMMAND:
-                if payload in ("start", "recording_start"):
-                    logging.info(f"[MQTT] Starting sensor recording...")
-                    sensor_logger.start_recording()
-                elif payload in ("stop", "recording_stop"):
-                    logging.info(f"[MQTT] Stopping sensor recording...")
-                    sensor_logger.stop_recording()
-                    
-        except Exception as e:
-            logging.error(f"Error processing sensor message: {e}")
-    
-    # 수정된 콜백 설정
-    mqtt_listener.on_message = on_message_with_sensor
-    
-    # MQTT 리스너 시작
+
+    # MQTT 리스너 시작 (센서 데이터는 묶어서 메인 프로세스의 로거로 전달)
     mqtt_listener.start()
 
-def stream_viewer_process(server_ip: str, cmd_queue: multiprocessing.Queue):
+def stream_viewer_process(server_ip: str, cmd_queue: multiprocessing.Queue, event_queue: multiprocessing.Queue = None):
     """스트리밍 프로세스
     
     Args:
         server_ip: 스트리밍 서버 IP
+        cmd_queue: 녹화/종료 명령 큐
+        event_queue: 첫 프레임 수신 등 뷰어 상태를 메인 프로세스로 알리는 큐
     """
     viewer = StreamViewer(server_ip)
     
     if not viewer.connect():
         return
 
+    first_frame_reported = False
     try:
         while True:
             # non-blocking check for commands
             try:
                 cmd = cmd_queue.get_nowait()
-                if cmd.lower() in ("true", "start", "recording_start"):
-                    viewer.recorder.start_recording()
-                elif cmd.lower() in ("false", "stop", "recording_stop"):
-                    viewer.recorder.stop_recording()
+                if cmd == "shutdown":
+                    logging.info(f"[{server_ip}] Viewer shutdown requested")
+                    break
+                command, session_id = cmd
+                viewer.handle_command(command, session_id)
             except multiprocessing.queues.Empty:
                 pass
             except Exception as e:
@@ -97,11 +64,52 @@ def stream_viewer_process(server_ip: str, cmd_queue: multiprocessing.Queue):
 
             if not viewer.process_frame():
                 break
+            if not first_frame_reported and viewer.first_frame_at is not None and event_queue is not None:
+                event_queue.put(("viewer_first_frame", (server_ip, viewer.first_frame_at)))
+                first_frame_reported = True
     except Exception as e:
         logging.exception(f"[{server_ip}] Stream error")
     finally:
         viewer.cleanup()
 
+def start_viewer(active_viewers: dict, server_ip: str, event_queue: multiprocessing.Queue):
+    """서버 뷰어 프로세스 시작 (이미 실행 중이면 무시, 종료된 프로세스는 정리 후 재시작)"""
+    if server_ip in active_viewers:
+        viewer_info = active_viewers[server_ip]
+        if viewer_info['proc'].is_alive():
+            logging.debug(f"Viewer for {server_ip} is already running")
+            return
+        # 죽은 프로세스 정리
+        logging.warning(f"Cleaning up dead viewer process for {server_ip}")
+        viewer_info['proc'].join()
+        del active_viewers[server_ip]
+
+    # 새로운 뷰어 프로세스 시작
+    cmd_q = multiprocessing.Queue()
+    process = multiprocessing.Process(
+        target=stream_viewer_process,
+        args=(server_ip, cmd_q, event_queue),
+        name=f"Stream-{server_ip}"
+    )
+    process.start()
+    logging.info(f"Started viewer process for {server_ip}")
+    active_viewers[server_ip] = {'proc': process, 'cmd_q': cmd_q}
+
+def stop_viewer(active_viewers: dict, server_ip: str):
+    """서버 뷰어 프로세스 종료 (녹화 파일을 정리할 수 있도록 먼저 종료 명령을 보냄)"""
+    viewer_info = active_viewers.pop(server_ip, None)
+    if viewer_info is None:
+        return
+    proc = viewer_info['proc']
+    if proc.is_alive():
+        viewer_info['cmd_q'].put("shutdown")
+        proc.join(timeout=cfg.VIEWER_SHUTDOWN_TIMEOUT)
+        if proc.is_alive():
+            # 서버가 응답 없이 사라져 수신이 막힌 경우
+            proc.terminate()
+            proc.join()
+    logging.info(f"Stopped viewer process for {server_ip}")
+
 def main():
     """메인 함수"""
     setup_logging(cfg.LOG_LEVEL)
@@ -110,6 +118,7 @@ def main():
     # IP 큐 생성
     ip_queue = multiprocessing.Queue()
     active_viewers = {}  # server_ip -> {'proc': Process, 'cmd_q': Queue}
+    registry = ServerRegistry(timeout=cfg.PRESENCE_TIMEOUT)
     
     # 센서 데이터 로거 초기화
     global sensor_logger
@@ -124,59 +133,65 @@ def main():
         )
         mqtt_process.start()
 
+        if cfg.CLIENT_MODE == 'async':
+            # 모든 스트림을 이 프로세스의 이벤트 루프에서 처리
+            run_async_client(ip_queue, sensor_logger)
+            return
+
         # IP 큐 모니터링
         while True:
             try:
-                data = ip_queue.get()
-                logging.info(f"Received data from queue: {data}")
-                
+                try:
+                    data = ip_queue.get(timeout=1.0)
+                except queue.Empty:
+                    data = None
+
+                # 하트비트가 끊긴 서버의 뷰어 정리
+                for server_ip in registry.expire():
+                    stop_viewer(active_viewers, server_ip)
+                if data is None:
+                    continue
+
                 if isinstance(data, tuple):
-                    # 녹화 명령 또는 센서 데이터 처리
+                    # presence, 녹화 명령 또는 센서 데이터 처리
                     command, payload = data
-                    if command == "sensor_data":
-                        # 센서 데이터 처리
-                        topic, sensor_data = payload
+                    if command == "server_online":
+                        server_ip, presence = payload
+                        registry.seen(server_ip, presence, heartbeat=True)
+                        start_viewer(active_viewers, server_ip, ip_queue)
+                    elif command == "server_offline":
+                        registry.remove(payload)
+                        stop_viewer(active_viewers, payload)
+                    elif command == "viewer_first_frame":
+                        registry.first_frame(*payload)
+                    elif command == "sensor_batch":
+                        # 센서 묶음 처리 (센서 기록은 이 프로세스에서만 수행)
                         try:
-                            sensor_logger.save_sensor_data(topic, sensor_data)
+                            sensor_logger.save_batch(payload, queue_depth(ip_queue))
                         except Exception as e:
                             logging.error(f"Failed to save sensor data: {e}")
                     else:
                         # 녹화 명령 처리
+                        logging.info(f"Received data from queue: {data}")
+                        if command == "recording_start":
+                            sensor_logger.start_recording(payload)
+                        elif command == "recording_stop":
+                            sensor_logger.stop_recording()
                         if active_viewers:  # 서버가 연결되어 있을 때만 명령 전송
                             for viewer_info in active_viewers.values():
                                 try:
-                                    viewer_info['cmd_q'].put(command)
+                                    viewer_info['cmd_q'].put((command, payload))
                                     logging.info(f"Sent command '{command}' to viewer")
                                 except Exception as e:
                                     logging.error(f"Failed to send command to viewer: {e}")
                         else:
                             logging.warning("No active viewers to send command to")
                 else:
-                    # 새로운 서버 IP 처리
+                    # 폴링 탐색 응답으로 받은 서버 IP 처리
                     server_ip = data
-                    
-                    # 기존 뷰어가 있는지 확인하고 상태 체크
-                    if server_ip in active_viewers:
-                        viewer_info = active_viewers[server_ip]
-                        if viewer_info['proc'].is_alive():
-                            logging.info(f"Viewer for {server_ip} is already running")
-                            continue
-                        else:
-                            # 죽은 프로세스 정리
-                            logging.warning(f"Cleaning up dead viewer process for {server_ip}")
-                            viewer_info['proc'].join()
-                            del active_viewers[server_ip]
-                    
-                    # 새로운 뷰어 프로세스 시작
-                    cmd_q = multiprocessing.Queue()
-                    process = multiprocessing.Process(
-                        target=stream_viewer_process,
-                        args=(server_ip, cmd_q),
-                        name=f"Stream-{server_ip}"
-                    )
-                    process.start()
-                    logging.info(f"Started viewer process for {server_ip}")
-                    active_viewers[server_ip] = {'proc': process, 'cmd_q': cmd_q}
+                    logging.info(f"Received data from queue: {data}")
+                    registry.seen(server_ip)
+                    start_viewer(active_viewers, server_ip, ip_queue)
 
             except Exception as e:
                 logging.exception("Error in main loop")
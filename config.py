@@ -3,12 +3,135 @@ MQTT_BROKER_IP = "192.168.0.235"
 MQTT_PORT = 1883
 MQTT_TOPIC_REQUEST = "command/getIP"
 MQTT_TOPIC_COMMAND = "command/rec"  # recording commands
+MQTT_TOPIC_STATS = "status/stats"  # 서버 파이프라인 지표 (뒤에 /<서버 IP>가 붙음)
+STATS_PUBLISH_INTERVAL = 10.0  # 지표 MQTT 발행 간격 (초, 0이면 발행하지 않음)
+MQTT_TOPIC_PRESENCE = "presence/camera"  # 서버 presence (retained, 뒤에 /<서버 IP>가 붙음, 연결 끊김 시 LWT로 offline)
+PRESENCE_HEARTBEAT_INTERVAL = 5.0  # 서버 presence 재발행 간격 (초)
+PRESENCE_TIMEOUT = 20.0  # 클라이언트가 이 시간 동안 presence를 받지 못하면 서버를 offline으로 처리 (초)
+VIEWER_SHUTDOWN_TIMEOUT = 3.0  # 서버 offline 시 뷰어 프로세스 정상 종료 대기 시간 (초)
+DISCOVERY_POLL_INTERVAL = 60.0  # presence를 지원하지 않는 서버를 위한 탐색 요청 간격 (초)
+IP_REFRESH_INTERVAL = 30.0  # 서버 IP 주소 캐시 갱신 간격 (초)
+DISCOVERY_CACHE_SECONDS = 2.0  # 탐색 응답(서버 정보) 재사용 시간 (초)
+DISCOVERY_REPLY_INTERVAL = 1.0  # 같은 응답 토픽에 대한 최소 응답 간격 (초)
 
 # --- 스트리밍 서버 설정 ---
 STREAM_HOST = '0.0.0.0'
 STREAM_PORT = 8000
 # libcamera-vid 명령어 (해상도, 프레임레이트 등 여기서 수정)
 LIBCAMERA_VID_COMMAND = 'libcamera-vid --inline --nopreview -t 0 --codec mjpeg --width 1920 --height 1080 -o -'
+# 스트림 코덱: 'mjpeg' 또는 'h264' (h264는 libcamera 소스에서만 지원, 클라이언트는 재인코딩 없이 녹화)
+STREAM_CODEC = 'mjpeg'
+LIBCAMERA_VID_H264_COMMAND = 'libcamera-vid --inline --nopreview -t 0 --codec h264 --intra 30 --width 1920 --height 1080 -o -'
+# H.264 모드에서 새 시청자에게 보낼 최근 GOP(키프레임 이후 프레임) 최대 캐시 수
+GOP_CACHE_FRAMES = 120
+# 녹화 시작 전 구간(pre-roll)을 위한 서버 링 버퍼 (시간/용량 중 먼저 도달하는 기준으로 제거, 0이면 비활성)
+PREROLL_SECONDS = 5.0
+PREROLL_MAX_BYTES = 64 * 1024 * 1024
+# 클라이언트가 녹화 시작 시 요청할 pre-roll 길이 (초, 0이면 요청하지 않음)
+RECORDING_PREROLL_SECONDS = 3.0
+# pre-roll 응답 대기 시간 (초). 초과 시 라이브 프레임만 기록
+PREROLL_TIMEOUT = 2.0
+# 프레임 소스: 'libcamera' (카메라), 'replay' (파일 재생), 'synthetic' (합성 프레임)
+FRAME_SOURCE = 'libcamera'
+# replay 소스 설정 (MJPEG 파일 또는 JPEG 디렉토리, fps=None이면 원래 간격)
+REPLAY_PATH = 'Data/replay/sample.mjpeg'
+REPLAY_FPS = None
+REPLAY_LOOP = True
+# synthetic 소스 설정
+SYNTHETIC_FRAME_SIZE = 300 * 1024
+SYNTHETIC_FPS = 30.0
+# 캡처 감시: 이 시간(초) 동안 프레임이 없으면 소스를 재시작 (0이면 감시 안 함)
+CAPTURE_STALL_TIMEOUT = 5.0
+# 소스 재시작 대기 시간 (초, 실패가 반복되면 최대값까지 두 배씩 증가)
+CAPTURE_RESTART_BACKOFF = 1.0
+CAPTURE_RESTART_BACKOFF_MAX = 30.0
+# libcamera-vid stdout에서 한 번에 읽을 최대 바이트 수
+CAPTURE_READ_SIZE = 64 * 1024
+# 클라이언트별 전송 대기 프레임 수 (초과 시 가장 오래된 프레임 폐기)
+CLIENT_QUEUE_SIZE = 3
+# 핸드셰이크 대기 시간 (초). 이 시간 안에 HELLO가 없으면 v1 클라이언트로 처리
+HANDSHAKE_TIMEOUT = 0.5
+# 클라이언트가 요청할 프로토콜 버전 (1: 길이 헤더만, 2: 시퀀스/타임스탬프 헤더)
+STREAM_PROTOCOL_VERSION = 2
+# 클라이언트 스트림 통계(FPS, 손실, 지연) 로그 간격 (초)
+STREAM_STATS_INTERVAL = 5.0
+# 클라이언트 구독 설정 (핸드셰이크로 서버에 전달)
+# STREAM_MAX_FPS: 최대 수신 프레임레이트 (None이면 제한 없음)
+# STREAM_TIER: 'full', 'half', 'quarter', 'eighth' (축소 단계는 서버에 OpenCV 필요, 녹화 시에는 'full' 사용)
+STREAM_MAX_FPS = None
+STREAM_TIER = 'full'
+# 서버 지표 HTTP 엔드포인트 (/metrics: Prometheus 텍스트, /stats.json: JSON, 포트 0이면 비활성)
+METRICS_HOST = '0.0.0.0'
+METRICS_PORT = 9100
+# 클라이언트 소켓 수신 버퍼 크기 (SO_RCVBUF, 바이트, None이면 OS 기본값)
+STREAM_SO_RCVBUF = 4 * 1024 * 1024
+# 프레임 페이로드 수신 버퍼 초기 크기 (더 큰 프레임이 오면 자동으로 늘어남)
+STREAM_RECV_BUFFER_SIZE = 1024 * 1024
+# MJPEG 스트림 녹화 백엔드 (H.264 스트림은 항상 재인코딩 없이 저장)
+# 'opencv': 디코딩 후 cv2.VideoWriter(mp4v) 인코딩
+# 'ffmpeg': 디코딩 후 ffmpeg 파이프로 libx264 인코딩 (ffmpeg 필요, 없으면 'opencv'로 대체)
+# 'mjpeg': 수신한 JPEG를 디코딩/재인코딩 없이 그대로 저장 (CPU 사용 최소)
+RECORDING_BACKEND = 'opencv'
+# 카메라별 백엔드 지정 (서버 IP -> 백엔드 이름, 예: {'192.168.0.11': 'ffmpeg'})
+RECORDING_CAMERA_BACKENDS = {}
+# libx264 설정 (preset: ultrafast~veryslow, crf: 낮을수록 고화질/큰 파일, threads: 0이면 자동)
+RECORDING_X264_PRESET = 'veryfast'
+RECORDING_X264_CRF = 23
+RECORDING_X264_THREADS = 0
+# 인코더를 카메라별 별도 프로세스에서 실행 (여러 카메라의 인코딩이 여러 코어를 사용)
+RECORDING_ENCODER_PROCESS = True
+# mp4 녹화 목표 fps와 프레임 시각 처리 방식
+# 'cfr': 캡처 시각 기준 1/fps 슬롯에 배치 (입력이 빠르면 폐기, 느리면 직전 프레임 반복하여 영상 길이 = 실제 시간)
+# 'vfr': 받은 프레임을 모두 한 번씩 기록하고 프레임별 시각을 .timecodes.txt (timecode format v2)에 저장
+RECORDING_FPS = 30.0
+RECORDING_FRAME_POLICY = 'cfr'
+# 녹화 파일 분할 간격 (초). 패스스루 녹화는 이 시간이 지난 뒤 첫 키프레임에서 분할
+RECORDING_SEGMENT_SECONDS = 60.0
+# 인코딩 대기열 최대 프레임 수 (가득 차면 가장 오래된 프레임 폐기, 1080p 기준 프레임당 약 6MB)
+RECORDING_QUEUE_SIZE = 60
+# pre-roll 버스트 대기열 최대 크기 (바이트). 버스트는 JPEG 그대로 보관하고 녹화 스레드에서 디코딩 (초과 시 가장 오래된 프레임 폐기)
+RECORDING_PREROLL_QUEUE_BYTES = 32 * 1024 * 1024
+# 'cfr' 녹화에서 프레임 간격이 이 시간(초)보다 크면 직전 프레임으로 채우지 않고 새 파일 시작 (스트림 중단, 재연결)
+RECORDING_MAX_GAP_SECONDS = 2.0
+# 뷰어와 녹화기가 주고받는 프레임 버퍼 풀 크기 (디코딩 중/대기열/인코딩 중/직전 프레임을 합친 수 이상 권장)
+RECORDING_FRAME_POOL_SIZE = 6
+# 전체 프레임 수신 시 화면 갱신 간격 (n프레임마다 표시)
+DISPLAY_INTERVAL = 4
+# 화면 표시 창 너비 (픽셀). 표시 전용 프레임은 이 너비 이상이 되는 가장 작은 크기로 축소 디코딩 (None이면 원본 크기)
+DISPLAY_WIDTH = 960
+# 디코딩 프레임 공유 메모리 버스 (같은 PC의 다른 프로세스가 FrameBusReader(bus_name(IP))로 읽음)
+# 켜면 표시/녹화와 무관하게 모든 라이브 프레임을 FRAME_BUS_WIDTH 이상으로 축소 디코딩하여 게시
+FRAME_BUS_ENABLED = False
+FRAME_BUS_SLOTS = 8
+FRAME_BUS_WIDTH = 960
+# 슬롯당 최대 프레임 크기 (바이트, 공유 메모리 크기 = 슬롯 수 x 슬롯 크기)
+FRAME_BUS_SLOT_BYTES = 1920 * 1080 * 3
+# 센서 데이터 저장 형식: 'csv' 또는 'parquet' (pyarrow 필요, 없으면 'csv'로 대체)
+SENSOR_FILE_FORMAT = 'csv'
+# 토픽별로 모아 둔 센서 행을 기록하는 기준 (행 수 또는 첫 행 이후 경과 시간(초) 중 먼저 도달한 쪽)
+SENSOR_FLUSH_ROWS = 100
+SENSOR_FLUSH_SECONDS = 1.0
+# 토픽별 센서 메모리 저장소 크기 (행 수, 행당 약 56바이트)
+SENSOR_STORE_CAPACITY = 36000
+# 녹화 시작 시 함께 기록할 이전 구간 (초, 0이면 없음, 기본은 영상 pre-roll과 같은 길이)
+SENSOR_PRETRIGGER_SECONDS = RECORDING_PREROLL_SECONDS
+# MQTT 리스너 프로세스에서 메인 프로세스로 센서 메시지를 묶어 보내는 기준 (행 수 또는 첫 행 이후 경과 시간(초))
+SENSOR_BATCH_ROWS = 50
+SENSOR_BATCH_SECONDS = 0.2
+# 센서 수신 경로 지표(처리량, 지연, 큐 깊이) 로그 간격 (초)
+SENSOR_INGEST_STATS_INTERVAL = 10.0
+# 클라이언트 프레임 처리 단계별(수신/디코딩/전달/표시/인코딩) 지연 시간 히스토그램 (카메라별)
+# False면 계측하지 않음. python -O로 실행하면 계측 코드가 바이트코드에서 제거되어 비용이 전혀 없음
+LATENCY_PROBES = True
+# 단계별 p50/p95/p99 요약 로그 간격 (초)
+LATENCY_SUMMARY_INTERVAL = 10.0
+# 뷰어 종료 시 누적 히스토그램을 JSON으로 저장할 디렉토리 (None이면 저장 안 함)
+LATENCY_DUMP_DIR = 'Data/latency'
+# 클라이언트 실행 방식: 'process' (서버별 프로세스) 또는 'async' (단일 프로세스 asyncio, 카메라가 많을 때)
+CLIENT_MODE = 'process'
+# async 모드 JPEG 디코딩 작업 스레드 수 및 화면 갱신 주기 (fps)
+ASYNC_DECODE_WORKERS = 4
+ASYNC_DISPLAY_FPS = 15.0
 
 # --- 로깅 설정 ---
 import logging
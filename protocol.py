@@ -0,0 +1,140 @@
+# protocol.py
+"""서버/클라이언트 공통 스트리밍 와이어 프로토콜
+
+v1: 4바이트 big-endian 길이(>L) + JPEG 페이로드
+v2: 고정 크기 프레임 헤더(매직, 버전, 플래그, 길이, 시퀀스 번호, 캡처 타임스탬프) + 페이로드
+
+핸드셰이크:
+    클라이언트는 연결 직후 HELLO 메시지(매직 + JSON 길이 + JSON)를 보냅니다.
+    서버는 같은 형식의 응답으로 협상된 버전을 알려 줍니다.
+    HELLO를 보내지 않는 기존(v1) 클라이언트는 서버의 대기 시간이 지나면 v1으로 처리됩니다.
+
+제어 메시지 (v2):
+    클라이언트 -> 서버: HELLO와 같은 형식의 JSON (예: {"cmd": "preroll", "since_us": ...})
+    서버 -> 클라이언트: FLAG_CONTROL 플래그가 설정된 v2 프레임, 페이로드는 JSON
+"""
+
+import json
+import struct
+import time
+
+PROTOCOL_V1 = 1
+PROTOCOL_V2 = 2
+SUPPORTED_VERSIONS = (PROTOCOL_V1, PROTOCOL_V2)
+
+# --- v1 프레임 헤더 ---
+V1_HEADER = struct.Struct(">L")
+
+# --- v2 프레임 헤더 ---
+# magic(2) version(1) flags(1) length(4) sequence(8) capture_us(8)
+FRAME_MAGIC = b'\xca\x5e'
+V2_HEADER = struct.Struct(">2sBBIQQ")
+
+# 페이로드 타입 플래그
+FLAG_JPEG = 0x01
+FLAG_H264 = 0x02      # Annex-B H.264 액세스 유닛
+FLAG_KEYFRAME = 0x04  # SPS/PPS를 포함한 IDR 액세스 유닛
+FLAG_PREROLL = 0x08   # 녹화 요청 시 전송되는 트리거 이전 프레임
+FLAG_CONTROL = 0x10   # JSON 제어 메시지 (프레임 아님)
+
+CODEC_MJPEG = 'mjpeg'
+CODEC_H264 = 'h264'
+
+# --- 핸드셰이크 메시지 ---
+HELLO_MAGIC = b'CAMS'
+HELLO_HEADER = struct.Struct(">4sH")
+
+class ProtocolError(Exception):
+    """프로토콜 형식 오류"""
+
+def now_us() -> int:
+    """캡처 타임스탬프용 단조 시계 (마이크로초)"""
+    return time.monotonic_ns() // 1000
+
+class Frame:
+    """인코딩된 프레임과 메타데이터
+
+    Attributes:
+        data (bytes): 페이로드 (JPEG 등)
+        sequence (int): 서버에서 부여한 프레임 순번
+        capture_us (int): 서버 단조 시계 기준 캡처 시각 (마이크로초)
+        flags (int): 페이로드 타입 플래그
+    """
+
+    __slots__ = ('data', 'sequence', 'capture_us', 'flags')
+
+    def __init__(self, data: bytes, sequence: int = 0, capture_us: int = 0, flags: int = FLAG_JPEG):
+        self.data = data
+        self.sequence = sequence
+        self.capture_us = capture_us
+        self.flags = flags
+
+    def __len__(self):
+        return len(self.data)
+
+def pack_v1_header(frame: Frame) -> bytes:
+    """v1 프레임 헤더 생성"""
+    return V1_HEADER.pack(len(frame.data))
+
+def pack_v2_header(frame: Frame, extra_flags: int = 0) -> bytes:
+    """v2 프레임 헤더 생성"""
+    return V2_HEADER.pack(FRAME_MAGIC, PROTOCOL_V2, frame.flags | extra_flags, len(frame.data),
+                          frame.sequence, frame.capture_us)
+
+def control_frame(message: dict) -> Frame:
+    """서버 -> 클라이언트 제어 메시지 프레임 생성"""
+    return Frame(json.dumps(message, separators=(',', ':')).encode(), 0, now_us(), FLAG_CONTROL)
+
+def unpack_v2_header(data: bytes):
+    """v2 프레임 헤더 해석
+
+    Returns:
+        tuple: (flags, length, sequence, capture_us)
+
+    Raises:
+        ProtocolError: 매직 또는 버전이 맞지 않는 경우
+    """
+    magic, version, flags, length, sequence, capture_us = V2_HEADER.unpack(data)
+    if magic != FRAME_MAGIC or version != PROTOCOL_V2:
+        raise ProtocolError(f"Invalid v2 frame header: magic={magic!r}, version={version}")
+    return flags, length, sequence, capture_us
+
+def pack_hello(message: dict) -> bytes:
+    """핸드셰이크 메시지 직렬화"""
+    body = json.dumps(message, separators=(',', ':')).encode()
+    return HELLO_HEADER.pack(HELLO_MAGIC, len(body)) + body
+
+def try_unpack_hello(buf: bytes):
+    """버퍼에서 핸드셰이크 메시지 해석 시도
+
+    Returns:
+        tuple: (메시지 dict, 소비한 바이트 수)
+        None: 아직 데이터가 부족한 경우
+
+    Raises:
+        ProtocolError: 매직이 맞지 않거나 JSON이 잘못된 경우
+    """
+    if len(buf) < HELLO_HEADER.size:
+        if not HELLO_MAGIC.startswith(bytes(buf[:len(HELLO_MAGIC)])):
+            raise ProtocolError("Invalid handshake magic")
+        return None
+    magic, length = HELLO_HEADER.unpack_from(buf)
+    if magic != HELLO_MAGIC:
+        raise ProtocolError("Invalid handshake magic")
+    end = HELLO_HEADER.size + length
+    if len(buf) < end:
+        return None
+    try:
+        message = json.loads(bytes(buf[HELLO_HEADER.size:end]))
+    except ValueError as e:
+        raise ProtocolError(f"Invalid handshake body: {e}")
+    if not isinstance(message, dict):
+        raise ProtocolError("Handshake body must be a JSON object")
+    return message, end
+
+def negotiate_version(requested) -> int:
+    """클라이언트가 지원하는 버전 목록 중 가장 높은 공통 버전 선택"""
+    if isinstance(requested, int):
+        requested = [requested]
+    common = [v for v in requested or () if v in SUPPORTED_VERSIONS]
+    return max(common) if common else PROTOCOL_V1
@@ -0,0 +1,568 @@
+# server/broadcaster.py
+
+import socket
+import selectors
+import logging
+import threading
+import time
+from collections import deque
+from protocol import (Frame, PROTOCOL_V1, PROTOCOL_V2, FLAG_JPEG, FLAG_H264, FLAG_KEYFRAME, FLAG_PREROLL,
+                      CODEC_MJPEG, CODEC_H264, ProtocolError, now_us, control_frame, pack_v1_header,
+                      pack_v2_header, unpack_v2_header, pack_hello, try_unpack_hello, negotiate_version)
+from server.preview import PreviewEncoder, resolve_tier
+from server.preroll import PrerollBuffer
+
+class ClientConnection:
+    """브로드캐스터에 연결된 개별 클라이언트 상태
+
+    Attributes:
+        sock (socket.socket): 논블로킹 클라이언트 소켓
+        addr (tuple): 클라이언트 주소
+        version (int): 협상된 프로토콜 버전 (None: 핸드셰이크 대기 중)
+        hello (dict): 클라이언트가 보낸 핸드셰이크 메시지
+        tier (str): 구독한 해상도 단계 ('full', 'half', 'quarter', 'eighth')
+        max_fps (float): 구독한 최대 프레임레이트 (None: 제한 없음)
+        queue (deque): 전송 대기 프레임 큐 (가득 차면 가장 오래된 프레임 폐기)
+        frames_sent (int): 전송 완료 프레임 수
+        bytes_sent (int): 전송한 총 바이트 수
+        dropped (int): 큐가 가득 차서 폐기된 프레임 수
+        send_latency_sum (float): 전송 완료한 프레임의 큐 진입부터 전송 완료까지 걸린 시간의 합 (초)
+    """
+
+    def __init__(self, sock: socket.socket, addr, queue_size: int, handshake_deadline: float):
+        self.sock = sock
+        self.addr = addr
+        self.version = None
+        self.hello = {}
+        self.tier = 'full'
+        self.max_fps = None
+        self.skipped = 0  # 프레임레이트 구독으로 건너뛴 프레임 수
+        self.awaiting_keyframe = False  # H.264: 프레임 폐기 후 다음 키프레임까지 대기 중
+        self._next_due_us = None
+        self.handshake_deadline = handshake_deadline
+        self.rx_buffer = bytearray()  # 핸드셰이크/제어 메시지 수신 버퍼
+        self.queue = deque(maxlen=queue_size)
+        self.events = selectors.EVENT_READ
+        self.connected_at = time.time()
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.dropped = 0
+        self.send_latency_sum = 0.0
+        self.control = deque()  # 핸드셰이크 응답 등 폐기되지 않는 제어 메시지
+        self._pending = []  # 전송 중인 프레임의 남은 버퍼 목록
+        self._pending_is_frame = False
+        self._pending_enqueued = 0.0
+
+    @property
+    def has_pending(self) -> bool:
+        """전송할 데이터가 남아 있는지 여부"""
+        return bool(self._pending) or bool(self.control) or bool(self.queue)
+
+    def subscribe(self, max_fps=None, tier=None):
+        """프레임레이트/해상도 구독 설정"""
+        self.max_fps = float(max_fps) if max_fps else None
+        self.tier = resolve_tier(tier)
+        self._next_due_us = None
+
+    def wants(self, frame: Frame) -> bool:
+        """프레임레이트 구독에 따라 이 프레임을 보낼지 판단"""
+        if self.max_fps is None:
+            return True
+        interval = 1e6 / self.max_fps
+        # 캡처 타이밍 흔들림을 허용하기 위해 간격의 10% 여유를 둠
+        if self._next_due_us is not None and frame.capture_us < self._next_due_us - interval * 0.1:
+            self.skipped += 1
+            return False
+        if self._next_due_us is None or frame.capture_us - self._next_due_us > interval:
+            self._next_due_us = frame.capture_us + interval
+        else:
+            self._next_due_us += interval
+        return True
+
+    def decimate(self, frames: list) -> list:
+        """pre-roll 버스트를 구독 프레임레이트에 맞게 줄임 (라이브 프레임의 판단 기준은 유지)"""
+        if self.max_fps is None:
+            return frames
+        next_due_us, self._next_due_us = self._next_due_us, None
+        try:
+            return [frame for frame in frames if self.wants(frame)]
+        finally:
+            self._next_due_us = next_due_us
+
+    def enqueue(self, buffers, flags: int = FLAG_JPEG):
+        """프레임 버퍼 묶음을 큐에 추가 (가득 찬 경우 가장 오래된 프레임 폐기)
+
+        H.264는 참조 프레임이 빠지면 디코딩이 깨지므로, 큐가 넘치면 대기 중인 프레임을
+        모두 버리고 다음 키프레임부터 다시 보냅니다.
+
+        Args:
+            buffers: 한 프레임을 구성하는 버퍼 튜플 (헤더, 페이로드)
+            flags: 페이로드 타입 플래그
+        """
+        entry = (buffers, time.perf_counter())
+        if flags & FLAG_H264:
+            if flags & FLAG_KEYFRAME:
+                self.awaiting_keyframe = False
+            elif self.awaiting_keyframe:
+                self.dropped += 1
+                return
+            if len(self.queue) == self.queue.maxlen:
+                self.dropped += len(self.queue)
+                self.queue.clear()
+                if not flags & FLAG_KEYFRAME:
+                    self.awaiting_keyframe = True
+                    self.dropped += 1
+                    return
+            self.queue.append(entry)
+            return
+
+        if len(self.queue) == self.queue.maxlen:
+            self.dropped += 1
+        self.queue.append(entry)
+
+    def flush(self):
+        """소켓 송신 버퍼가 허용하는 만큼 전송
+
+        Raises:
+            OSError: 연결이 끊긴 경우
+        """
+        while True:
+            if not self._pending:
+                if self.control:
+                    buffers, self._pending_is_frame = self.control.popleft(), False
+                elif self.queue:
+                    buffers, self._pending_enqueued = self.queue.popleft()
+                    self._pending_is_frame = True
+                else:
+                    return
+                self._pending = [memoryview(b) for b in buffers if len(b)]
+
+            try:
+                # 헤더와 페이로드를 한 번의 벡터 전송으로 보냄
+                sent = self.sock.sendmsg(self._pending)
+            except (BlockingIOError, InterruptedError):
+                return
+
+            self.bytes_sent += sent
+            while sent and self._pending:
+                first = self._pending[0]
+                if sent >= len(first):
+                    sent -= len(first)
+                    self._pending.pop(0)
+                else:
+                    self._pending[0] = first[sent:]
+                    sent = 0
+
+            if self._pending:
+                # 송신 버퍼가 가득 참, 쓰기 가능 이벤트를 기다림
+                return
+            if self._pending_is_frame:
+                self.frames_sent += 1
+                self.send_latency_sum += time.perf_counter() - self._pending_enqueued
+
+    def stats(self) -> dict:
+        """클라이언트 통계 반환"""
+        return {
+            'addr': f"{self.addr[0]}:{self.addr[1]}",
+            'version': self.version,
+            'tier': self.tier,
+            'max_fps': self.max_fps,
+            'skipped': self.skipped,
+            'connected_for': time.time() - self.connected_at,
+            'frames_sent': self.frames_sent,
+            'bytes_sent': self.bytes_sent,
+            'dropped': self.dropped,
+            'queue_depth': len(self.queue),
+            'send_latency_sum': self.send_latency_sum,
+        }
+
+class FrameBroadcaster:
+    """단일 스레드 selectors 기반 프레임 팬아웃 엔진
+
+    캡처 스레드가 publish()로 넘긴 프레임을 모든 클라이언트의 전송 큐에 넣고,
+    하나의 이벤트 루프에서 논블로킹으로 전송합니다. 느린 클라이언트는 큐가 가득 차면
+    오래된 프레임을 건너뛰므로 다른 클라이언트나 캡처 스레드를 막지 않습니다.
+    축소 해상도 프레임은 publish()에서 구독 중인 단계만 만들어 두므로, 이벤트 루프는
+    디코딩/인코딩 없이 준비된 바이트만 큐에 넣습니다.
+    """
+
+    def __init__(self, server_socket: socket.socket, queue_size: int = 3, handshake_timeout: float = 0.5,
+                 codec: str = CODEC_MJPEG, gop_cache_frames: int = 120, preroll: PrerollBuffer = None):
+        self.server_socket = server_socket
+        self.queue_size = queue_size
+        self.handshake_timeout = handshake_timeout
+        self.codec = codec
+        self.gop_cache_frames = gop_cache_frames
+        self._gop = []  # H.264: 마지막 키프레임부터 현재까지의 프레임
+        self.preroll = preroll if preroll is not None else PrerollBuffer(0, 0)
+        self.last_sequence = None
+        self.preview = PreviewEncoder()
+        self.tiers = frozenset()  # 핸드셰이크를 마친 클라이언트가 구독 중인 축소 단계 (이벤트 루프에서 교체)
+        self.clients = {}  # fileno -> ClientConnection
+        self.is_running = False
+        self.coalesced = 0  # 이벤트 루프가 밀려 수신함에서 밀려난 프레임 수 (이로 인해 버린 H.264 프레임 포함)
+        self.closed_dropped = 0  # 연결이 끊긴 클라이언트의 누적 폐기 프레임 수
+        self.connections_total = 0
+
+        self.selector = selectors.DefaultSelector()
+        self.server_socket.setblocking(False)
+        self.selector.register(self.server_socket, selectors.EVENT_READ, self._accept)
+
+        # 다른 스레드에서 이벤트 루프를 깨우기 위한 소켓 쌍
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self.selector.register(self._wake_r, selectors.EVENT_READ, self._drain_wakeup)
+
+        # 이벤트 루프가 멈춘 경우에도 메모리가 무한히 늘지 않도록 수신함 크기 제한
+        self._inbox = deque(maxlen=max(16, queue_size * 4))
+        self._inbox_lock = threading.Lock()  # 수신함에서 밀려난 프레임 확인과 H.264 끊김 표시를 함께 처리
+        self._h264_broken = False  # H.264: 수신함에서 액세스 유닛이 밀려나 다음 키프레임까지 대기 중
+        self._bursts = deque()  # 작업 스레드가 축소 프레임을 만든 pre-roll 버스트 (클라이언트, 프레임 목록)
+
+    def publish(self, frame: Frame):
+        """새 프레임 발행 (다른 스레드에서 호출 가능)
+
+        구독 중인 해상도 단계의 축소 프레임을 호출한 스레드에서 만들어 함께 넘깁니다.
+        수신함이 가득 차 H.264 액세스 유닛이 밀려나면 이후 프레임의 참조가 깨지므로,
+        이벤트 루프는 다음 키프레임까지 프레임을 버립니다.
+
+        Args:
+            frame: 시퀀스 번호와 캡처 시각이 포함된 프레임
+        """
+        tier_frames = {'full': frame}
+        if frame.data and not frame.flags & FLAG_H264:
+            for tier in self.tiers:
+                tier_frames[tier] = self.preview.get(frame, tier)
+        with self._inbox_lock:
+            if len(self._inbox) == self._inbox.maxlen:
+                evicted, _ = self._inbox.popleft()
+                self.coalesced += 1
+                if evicted.flags & FLAG_H264:
+                    self._h264_broken = True
+            self._inbox.append((frame, tier_frames))
+        self._wakeup()
+
+    def _wakeup(self):
+        try:
+            self._wake_w.send(b'\0')
+        except (BlockingIOError, InterruptedError):
+            pass  # 이미 깨울 신호가 충분히 쌓여 있음
+
+    def _drain_wakeup(self, sock, mask):
+        try:
+            while sock.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        while self._bursts:
+            client, frames = self._bursts.popleft()
+            if self.clients.get(client.sock.fileno()) is client:
+                self._finish_preroll(client, frames)
+        self._dispatch()
+
+    def _dispatch(self):
+        """수신함의 프레임을 모든 클라이언트 큐에 분배"""
+        while True:
+            with self._inbox_lock:
+                if not self._inbox:
+                    return
+                frame, tier_frames = self._inbox.popleft()
+                if frame.flags & FLAG_H264 and self._h264_broken:
+                    if frame.flags & FLAG_KEYFRAME:
+                        self._h264_broken = False
+                    else:
+                        self.coalesced += 1
+                        frame = None
+            if frame is None:
+                # 참조 프레임이 빠진 GOP는 전송하지 않고, 새 시청자도 다음 키프레임부터 받도록 캐시를 비움
+                self._gop = []
+                continue
+            if not frame.data:
+                continue
+            self.preroll.append(frame, tier_frames)
+            self.last_sequence = frame.sequence
+            if frame.flags & FLAG_H264:
+                self._dispatch_h264(frame)
+                continue
+
+            # 버전/해상도 단계별 헤더는 프레임당 한 번만 생성하여 공유
+            headers = {}
+            for client in list(self.clients.values()):
+                # 발행 이후에 구독한 단계는 축소 프레임이 없으므로 다음 프레임부터 보냄
+                tier_frame = tier_frames.get(client.tier)
+                if client.version is None or tier_frame is None or not client.wants(frame):
+                    continue
+                key = (client.version, client.tier)
+                header = headers.get(key)
+                if header is None:
+                    header = headers[key] = self._pack_header(client.version, tier_frame)
+                client.enqueue((header, tier_frame.data))
+                self._flush(client)
+
+    def _dispatch_h264(self, frame: Frame):
+        """H.264 액세스 유닛 분배 및 GOP 캐시 갱신"""
+        if frame.flags & FLAG_KEYFRAME:
+            self._gop = [frame]
+        elif self._gop:
+            if len(self._gop) < self.gop_cache_frames:
+                self._gop.append(frame)
+            else:
+                # GOP가 너무 길면 캐시를 비우고 새 시청자는 다음 키프레임부터 수신
+                self._gop = []
+
+        header = pack_v2_header(frame)
+        for client in list(self.clients.values()):
+            if client.version is None:
+                continue
+            client.enqueue((header, frame.data), frame.flags)
+            self._flush(client)
+
+    @staticmethod
+    def _pack_header(version: int, frame: Frame) -> bytes:
+        if version == PROTOCOL_V2:
+            return pack_v2_header(frame)
+        return pack_v1_header(frame)
+
+    def _accept(self, sock, mask):
+        try:
+            conn, addr = sock.accept()
+        except (BlockingIOError, InterruptedError):
+            return
+        conn.setblocking(False)
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        client = ClientConnection(conn, addr, self.queue_size,
+                                  time.monotonic() + self.handshake_timeout)
+        self.clients[conn.fileno()] = client
+        self.connections_total += 1
+        self.selector.register(conn, client.events, client)
+        logging.info(f"New connection from {addr}")
+
+    def _flush(self, client: ClientConnection):
+        try:
+            client.flush()
+        except OSError as e:
+            logging.warning(f"Connection lost from {client.addr}: {e}")
+            self._close_client(client)
+            return
+        self._update_interest(client)
+
+    def _update_interest(self, client: ClientConnection):
+        events = selectors.EVENT_READ
+        if client.has_pending:
+            events |= selectors.EVENT_WRITE
+        if events != client.events:
+            client.events = events
+            self.selector.modify(client.sock, events, client)
+
+    def _on_client_event(self, client: ClientConnection, mask):
+        if mask & selectors.EVENT_READ:
+            try:
+                data = client.sock.recv(4096)
+            except (BlockingIOError, InterruptedError):
+                data = None
+            except OSError:
+                data = b''
+            if data == b'':
+                self._close_client(client)
+                return
+            if data and client.version is None:
+                self._on_handshake_data(client, data)
+            elif data and client.version == PROTOCOL_V2:
+                self._on_control_data(client, data)
+        if mask & selectors.EVENT_WRITE:
+            self._flush(client)
+
+    def _on_handshake_data(self, client: ClientConnection, data: bytes):
+        """핸드셰이크 메시지 수신 처리"""
+        client.rx_buffer += data
+        try:
+            result = try_unpack_hello(client.rx_buffer)
+        except ProtocolError as e:
+            logging.warning(f"Invalid handshake from {client.addr}: {e}. Falling back to v1.")
+            self._complete_handshake(client, PROTOCOL_V1)
+            return
+        if result is None:
+            return
+        message, _ = result
+        client.hello = message
+        version = negotiate_version(message.get('versions'))
+        if self.codec == CODEC_H264:
+            # H.264는 디코딩 없이 전달하므로 프레임레이트/해상도 구독은 적용하지 않음
+            client.subscribe()
+        else:
+            client.subscribe(message.get('max_fps'), message.get('tier'))
+        reply = pack_hello({'version': version, 'server_time_us': now_us(), 'codec': self.codec,
+                            'tier': client.tier, 'max_fps': client.max_fps,
+                            'preroll_seconds': self.preroll.max_seconds})
+        client.control.append((reply,))
+        self._complete_handshake(client, version)
+
+    def _complete_handshake(self, client: ClientConnection, version: int):
+        client.version = version
+        client.rx_buffer = bytearray()
+        self._update_tiers()
+        if self.codec == CODEC_H264:
+            if version < PROTOCOL_V2:
+                # v1 프레임에는 페이로드 타입이 없어 H.264를 구분할 수 없음
+                logging.warning(f"Client {client.addr} does not support v2. H.264 stream requires protocol v2.")
+                self._close_client(client)
+                return
+            # 최근 GOP를 먼저 보내 새 시청자가 즉시 디코딩을 시작할 수 있게 함
+            for frame in self._gop:
+                client.control.append((pack_v2_header(frame), frame.data))
+            client.awaiting_keyframe = not self._gop
+        logging.info(f"Client {client.addr} negotiated protocol v{version} "
+                     f"(tier={client.tier}, max_fps={client.max_fps})")
+        self._flush(client)
+
+    def _on_control_data(self, client: ClientConnection, data: bytes):
+        """핸드셰이크 이후 클라이언트가 보낸 제어 메시지 처리"""
+        client.rx_buffer += data
+        while client.rx_buffer:
+            try:
+                result = try_unpack_hello(client.rx_buffer)
+            except ProtocolError as e:
+                logging.warning(f"Invalid control message from {client.addr}: {e}")
+                client.rx_buffer = bytearray()
+                return
+            if result is None:
+                return
+            message, consumed = result
+            del client.rx_buffer[:consumed]
+            if message.get('cmd') == 'preroll':
+                self._send_preroll(client, message)
+            else:
+                logging.warning(f"Unknown control message from {client.addr}: {message}")
+
+    def _send_preroll(self, client: ClientConnection, message: dict):
+        """요청 시각 이후의 보관 프레임을 구독한 해상도 단계/프레임레이트로 라이브 프레임보다 먼저 전송
+
+        클라이언트가 연결되기 전 프레임에는 구독 단계의 축소 프레임이 없으므로, 작업 스레드에서
+        만든 뒤 이벤트 루프로 돌려받아 전송합니다.
+        """
+        since_us = message.get('since_us')
+        if since_us is None:
+            since_us = now_us() - int(float(message.get('seconds', self.preroll.max_seconds)) * 1e6)
+        entries = self.preroll.entries_since(int(since_us))
+        if any(client.tier not in tier_frames for _, tier_frames in entries):
+            threading.Thread(target=self._encode_preroll, args=(client, entries), name="PrerollEncoder",
+                             daemon=True).start()
+            return
+        self._finish_preroll(client, [tier_frames[client.tier] for _, tier_frames in entries])
+
+    def _encode_preroll(self, client: ClientConnection, entries: list):
+        """작업 스레드: 없는 축소 프레임을 만들어 이벤트 루프로 전달"""
+        preview = PreviewEncoder(self.preview.quality)  # 캡처 스레드의 인코더 캐시와 분리
+        frames = [tier_frames.get(client.tier) or preview.get(frame, client.tier) for frame, tier_frames in entries]
+        self._bursts.append((client, frames))
+        self._wakeup()
+
+    def _finish_preroll(self, client: ClientConnection, frames: list):
+        """pre-roll 버스트와 preroll_end를 전송 큐 앞에 추가
+
+        작업 스레드가 축소 프레임을 만드는 동안 들어온 프레임도 버스트에 이어 붙이고, 끝에는
+        마지막 시퀀스 번호를 담은 preroll_end 제어 메시지를 보내 클라이언트가 이미 받은
+        라이브 프레임과의 중복을 걸러낼 수 있게 합니다. 전송 대기 중인 라이브 프레임 중
+        버스트의 마지막 시퀀스 이하인 프레임은 버스트와 중복되므로 큐에서 뺍니다. 버스트가
+        비어 있으면 (보관 프레임이 없거나 요청 시각이 더 최근인 경우) 큐를 그대로 두고,
+        대기 중인 프레임부터 기록하도록 그 직전 시퀀스를 preroll_end에 담습니다.
+        """
+        if frames:
+            for _, tier_frames in self.preroll.entries_since(frames[-1].capture_us + 1):
+                # 발행 이후에 구독한 단계라 축소 프레임이 없는 프레임은 해상도가 섞이지 않도록 제외
+                if client.tier in tier_frames:
+                    frames.append(tier_frames[client.tier])
+        if frames:
+            last_sequence = frames[-1].sequence
+            first_sequence = frames[0].sequence
+            kept = deque(maxlen=client.queue.maxlen)
+            for entry in client.queue:
+                sequence = unpack_v2_header(entry[0][0])[2]
+                if sequence > last_sequence:
+                    kept.append(entry)
+                elif sequence < first_sequence:
+                    # 요청 시각보다 오래된 프레임은 클라이언트가 어차피 기록하지 않으므로 폐기
+                    client.dropped += 1
+            client.queue = kept
+        elif client.queue:
+            last_sequence = unpack_v2_header(client.queue[0][0][0])[2] - 1
+        else:
+            last_sequence = self.last_sequence
+        frames = client.decimate(frames)
+
+        for frame in frames:
+            client.control.append((pack_v2_header(frame, FLAG_PREROLL), frame.data))
+        end = control_frame({'cmd': 'preroll_end', 'count': len(frames), 'last_sequence': last_sequence})
+        client.control.append((pack_v2_header(end), end.data))
+        if frames and frames[-1].flags & FLAG_H264:
+            client.awaiting_keyframe = False
+        logging.info(f"Sending {len(frames)} pre-roll frames "
+                     f"({sum(len(f.data) for f in frames) / 1e6:.1f}MB, tier={client.tier}) to {client.addr}")
+        self._flush(client)
+
+    def _expire_handshakes(self) -> float:
+        """대기 시간이 지난 핸드셰이크를 v1으로 확정하고 다음 만료까지 남은 시간 반환"""
+        now = time.monotonic()
+        next_deadline = None
+        for client in list(self.clients.values()):
+            if client.version is not None:
+                continue
+            if client.handshake_deadline <= now:
+                self._complete_handshake(client, PROTOCOL_V1)
+            elif next_deadline is None or client.handshake_deadline < next_deadline:
+                next_deadline = client.handshake_deadline
+        return None if next_deadline is None else max(0.0, next_deadline - now)
+
+    def _close_client(self, client: ClientConnection):
+        fileno = client.sock.fileno()
+        if self.clients.pop(fileno, None) is None:
+            return
+        try:
+            self.selector.unregister(client.sock)
+        except (KeyError, ValueError):
+            pass
+        client.sock.close()
+        self.closed_dropped += client.dropped
+        self._update_tiers()
+        logging.info(f"Closing connection for {client.addr} "
+                     f"(sent={client.frames_sent}, dropped={client.dropped})")
+
+    def _update_tiers(self):
+        # 캡처 스레드는 참조만 읽으므로 집합을 수정하지 않고 새로 만들어 교체
+        self.tiers = frozenset(client.tier for client in self.clients.values()
+                               if client.version is not None and client.tier != 'full')
+
+    def client_stats(self) -> list:
+        """클라이언트별 전송/폐기 통계 목록 반환"""
+        return [client.stats() for client in list(self.clients.values())]
+
+    @property
+    def dropped_total(self) -> int:
+        """종료된 연결을 포함한 전체 클라이언트 폐기 프레임 수"""
+        return self.closed_dropped + sum(client.dropped for client in list(self.clients.values()))
+
+    def serve_forever(self, poll_interval: float = 1.0):
+        """이벤트 루프 실행 (stop() 호출 시까지 블로킹)"""
+        self.is_running = True
+        while self.is_running:
+            remaining = self._expire_handshakes()
+            timeout = poll_interval if remaining is None else min(poll_interval, remaining)
+            for key, mask in self.selector.select(timeout=timeout):
+                if isinstance(key.data, ClientConnection):
+                    self._on_client_event(key.data, mask)
+                else:
+                    key.data(key.fileobj, mask)
+
+    def stop(self):
+        """이벤트 루프 종료 요청"""
+        self.is_running = False
+        self._wakeup()
+
+    def close(self):
+        """모든 클라이언트 연결과 내부 자원 정리"""
+        for client in list(self.clients.values()):
+            self._close_client(client)
+        self.selector.close()
+        self._wake_r.close()
+        self._wake_w.close()
@@ -0,0 +1,168 @@
+# server/frame_parser.py
+
+import logging
+
+SOI = b'\xff\xd8'
+EOI = b'\xff\xd9'
+# 크기 정보가 있는 SOF 마커 (DHT 0xC4, JPG 0xC8, DAC 0xCC 제외)
+SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+def jpeg_dimensions(data: bytes):
+    """JPEG 헤더의 SOF 세그먼트에서 (너비, 높이) 읽기 (디코딩 없이 마커만 따라감, 없으면 None)"""
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1  # 채움 바이트
+            continue
+        if marker in SOF_MARKERS:
+            if i + 9 > len(data):
+                return None
+            return int.from_bytes(data[i + 7:i + 9], 'big'), int.from_bytes(data[i + 5:i + 7], 'big')
+        if marker == 0xDA:
+            return None  # SOF 없이 스캔 데이터 시작
+        i += 2 + int.from_bytes(data[i + 2:i + 4], 'big')
+    return None
+
+class MJPEGFrameParser:
+    """MJPEG 바이트 스트림을 JPEG 프레임 단위로 분리하는 증분 파서
+
+    재사용 가능한 bytearray 버퍼에 데이터를 누적하고, 이전에 검색을 멈춘 위치부터
+    SOI/EOI 마커 검색을 재개합니다. 한 번의 읽기에 여러 프레임이 들어 있으면
+    모두 반환하며, 읽기 경계에서 나뉜 마커도 처리합니다.
+
+    Attributes:
+        read_size (int): 한 번에 읽을 최대 바이트 수
+        max_buffer (int): 버퍼 최대 크기 (초과 시 부분 프레임을 버리고 재동기화)
+        frames_parsed (int): 파싱된 프레임 수
+        bytes_in (int): 입력된 총 바이트 수
+        resyncs (int): 버퍼 초과로 인한 재동기화 횟수
+    """
+
+    def __init__(self, read_size: int = 64 * 1024, max_buffer: int = 8 * 1024 * 1024):
+        self.read_size = read_size
+        self.max_buffer = max_buffer
+        self._buf = bytearray(max(read_size * 4, 256 * 1024))
+        self._start = 0   # 아직 소비되지 않은 데이터 시작 위치
+        self._end = 0     # 유효 데이터 끝 위치
+        self._scan = 0    # 마커 검색 재개 위치
+        self._soi = -1    # 현재 프레임의 SOI 위치 (-1: 미발견)
+        self.frames_parsed = 0
+        self.bytes_in = 0
+        self.resyncs = 0
+
+    @property
+    def buffered(self) -> int:
+        """버퍼에 남아 있는 미처리 바이트 수"""
+        return self._end - self._start
+
+    @property
+    def capacity(self) -> int:
+        """현재 버퍼 할당 크기"""
+        return len(self._buf)
+
+    def reset(self):
+        """버퍼 상태 초기화 (카메라 재시작 등)"""
+        self._start = self._end = self._scan = 0
+        self._soi = -1
+
+    def _reserve(self, size: int):
+        """버퍼 끝에 size 바이트 이상의 여유 공간 확보"""
+        if len(self._buf) - self._end >= size:
+            return
+
+        # 소비된 앞부분을 버리고 남은 데이터를 버퍼 앞으로 이동
+        if self._start > 0:
+            pending = self._end - self._start
+            self._buf[:pending] = self._buf[self._start:self._end]
+            self._scan -= self._start
+            if self._soi != -1:
+                self._soi -= self._start
+            self._start = 0
+            self._end = pending
+            if len(self._buf) - self._end >= size:
+                return
+
+        # 그래도 부족하면 버퍼 확장 (최대 크기 초과 시 재동기화)
+        needed = self._end + size
+        if needed > self.max_buffer:
+            logging.warning(f"Frame buffer exceeded {self.max_buffer} bytes without EOI. Resyncing.")
+            self.resyncs += 1
+            self.reset()
+            needed = size
+        new_size = len(self._buf)
+        while new_size < needed:
+            new_size *= 2
+        if new_size > len(self._buf):
+            self._buf.extend(bytes(new_size - len(self._buf)))
+
+    def _extract(self) -> list:
+        """버퍼에서 완성된 프레임을 모두 추출"""
+        frames = []
+        buf = self._buf
+        while True:
+            if self._soi == -1:
+                soi = buf.find(SOI, self._scan, self._end)
+                if soi == -1:
+                    # 마지막 바이트가 0xFF이면 다음 읽기에서 마커가 완성될 수 있으므로 남겨 둠
+                    keep = 1 if self._end > self._start and buf[self._end - 1] == 0xFF else 0
+                    self._start = self._scan = self._end - keep
+                    break
+                self._soi = soi
+                self._start = soi
+                self._scan = soi + 2
+
+            eoi = buf.find(EOI, self._scan, self._end)
+            if eoi == -1:
+                # 읽기 경계에 걸친 마커를 위해 한 바이트 앞에서 검색 재개
+                self._scan = max(self._soi + 2, self._end - 1)
+                break
+
+            frames.append(bytes(buf[self._soi:eoi + 2]))
+            self.frames_parsed += 1
+            self._start = self._scan = eoi + 2
+            self._soi = -1
+
+        if self._start == self._end:
+            self._start = self._end = self._scan = 0
+        return frames
+
+    def feed(self, data) -> list:
+        """바이트 데이터를 입력하고 완성된 프레임 목록 반환
+
+        Args:
+            data: 입력 바이트 (bytes, bytearray, memoryview)
+
+        Returns:
+            list[bytes]: 완성된 JPEG 프레임 목록
+        """
+        size = len(data)
+        if size == 0:
+            return []
+        self._reserve(size)
+        self._buf[self._end:self._end + size] = data
+        self._end += size
+        self.bytes_in += size
+        return self._extract()
+
+    def read_from(self, stream) -> list:
+        """스트림에서 직접 버퍼로 읽어 완성된 프레임 목록 반환
+
+        Args:
+            stream: readinto1 또는 readinto를 지원하는 바이너리 스트림
+
+        Returns:
+            list[bytes]: 완성된 JPEG 프레임 목록
+            None: 스트림 종료(EOF)
+        """
+        self._reserve(self.read_size)
+        readinto = getattr(stream, 'readinto1', None) or stream.readinto
+        with memoryview(self._buf)[self._end:self._end + self.read_size] as view:
+            n = readinto(view)
+        if not n:
+            return None
+        self._end += n
+        self.bytes_in += n
+        return self._extract()
@@ -0,0 +1,304 @@
+# server/frame_sources.py
+
+import os
+import re
+import glob
+import time
+import shlex
+import logging
+import threading
+import subprocess
+from abc import ABC, abstractmethod
+from protocol import FLAG_JPEG, FLAG_H264, FLAG_KEYFRAME, CODEC_MJPEG, CODEC_H264
+from server.frame_parser import MJPEGFrameParser, jpeg_dimensions
+from server.h264_parser import H264AccessUnitParser
+
+class FrameSource(ABC):
+    """프레임 소스 추상 기본 클래스
+
+    하위 클래스는 read()를 구현해야 하며, read()는 새로 준비된 프레임(JPEG 또는 H.264 액세스 유닛)
+    목록을 반환하고 소스가 끝나면 None을 반환합니다.
+
+    Attributes:
+        resolution (tuple): 프레임 (너비, 높이) (알 수 없으면 None)
+        target_fps (float): 소스가 내보내도록 설정된 프레임레이트 (알 수 없으면 None)
+    """
+
+    name = 'base'
+    codec = CODEC_MJPEG
+    resolution = None
+    target_fps = None
+
+    def start(self):
+        """소스 시작"""
+        pass
+
+    @abstractmethod
+    def read(self):
+        """다음 프레임 목록 반환
+
+        Returns:
+            list[bytes]: 준비된 JPEG 프레임 목록 (비어 있을 수 있음)
+            None: 소스 종료
+        """
+
+    def stop(self):
+        """소스 정지 및 자원 정리"""
+        pass
+
+    def flags_for(self, data) -> int:
+        """프레임의 페이로드 타입 플래그"""
+        return FLAG_JPEG
+
+    def describe(self) -> str:
+        """로그용 소스 설명"""
+        return self.name
+
+class LibcameraSource(FrameSource):
+    """libcamera-vid 서브프로세스의 MJPEG 또는 H.264 출력을 읽는 소스"""
+
+    name = 'libcamera'
+
+    def __init__(self, command: str, read_size: int = 64 * 1024, codec: str = CODEC_MJPEG):
+        self.command = command
+        self.codec = codec
+        if codec == CODEC_H264:
+            self.parser = H264AccessUnitParser(read_size=read_size)
+        else:
+            self.parser = MJPEGFrameParser(read_size=read_size)
+        self.process = None
+        self.stderr_warnings = 0
+        self.stderr_errors = 0
+        width, height = command_option(command, 'width'), command_option(command, 'height')
+        self.resolution = (int(width), int(height)) if width and height else None
+        self.target_fps = command_option(command, 'framerate')
+
+    def start(self):
+        self.parser.reset()
+        self.process = subprocess.Popen(shlex.split(self.command), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        logging.info(f"Started libcamera-vid process with command: {self.command}")
+        threading.Thread(target=self.monitor_stderr, name="StderrMonitorThread", daemon=True).start()
+
+    def read(self):
+        return self.parser.read_from(self.process.stdout)
+
+    def flags_for(self, data) -> int:
+        if self.codec == CODEC_H264:
+            return FLAG_H264 | (FLAG_KEYFRAME if data.keyframe else 0)
+        return FLAG_JPEG
+
+    def stop(self):
+        process = self.process
+        if process is None:
+            return
+        if process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=5.0)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        # 재시작마다 파이프 fd가 남지 않도록 닫음
+        process.stdout.close()
+        process.stderr.close()
+
+    def monitor_stderr(self):
+        """libcamera-vid의 표준 에러 출력 로깅"""
+        process = self.process
+        while True:
+            try:
+                line_bytes = process.stderr.readline()
+                if not line_bytes:
+                    break
+
+                line = line_bytes.decode().strip()
+
+                if "ERROR" in line:
+                    self.stderr_errors += 1
+                    logging.error(f"[libcamera-vid] {line}")
+                elif "WARN" in line:
+                    self.stderr_warnings += 1
+                    logging.warning(f"[libcamera-vid] {line}")
+                else:
+                    logging.info(f"[libcamera-vid] {line}")
+            except ValueError:
+                break  # stop()에서 파이프를 닫음
+            except Exception as e:
+                logging.error(f"Error reading from stderr: {e}")
+                break
+
+    def describe(self) -> str:
+        return f"{self.name} ({self.command})"
+
+class _PacedSource(FrameSource):
+    """일정 간격으로 프레임을 내보내는 소스의 공통 타이밍 처리"""
+
+    def __init__(self, fps: float):
+        self.fps = fps
+        self._next_time = None
+
+    @property
+    def target_fps(self):
+        return self.fps
+
+    def _wait(self, interval: float):
+        """드리프트 없이 다음 프레임 시각까지 대기"""
+        now = time.monotonic()
+        if self._next_time is None or self._next_time < now - 1.0:
+            # 시작 또는 1초 이상 뒤처진 경우 기준 시각 재설정
+            self._next_time = now
+        sleep_time = self._next_time - now
+        if sleep_time > 0:
+            time.sleep(sleep_time)
+        self._next_time += interval
+
+class FileReplaySource(_PacedSource):
+    """MJPEG 파일 또는 JPEG 디렉토리를 재생하는 소스
+
+    디렉토리의 파일명이 밀리초 타임스탬프(예: 1700000000000.jpg)이면 fps=None일 때
+    원래 간격으로 재생하고, 그 외에는 지정된 fps(기본 30)로 재생합니다.
+    """
+
+    name = 'replay'
+    DEFAULT_FPS = 30.0
+
+    def __init__(self, path: str, fps: float = None, loop: bool = True):
+        super().__init__(fps)
+        self.path = path
+        self.loop = loop
+        self._frames = []
+        self._intervals = []
+        self._index = 0
+
+    def start(self):
+        if os.path.isdir(self.path):
+            files = sorted(glob.glob(os.path.join(self.path, "*.jpg")) + glob.glob(os.path.join(self.path, "*.jpeg")))
+            self._frames = []
+            for file in files:
+                with open(file, "rb") as f:
+                    self._frames.append(f.read())
+            stamps = [re.match(r"(\d+)", os.path.basename(file)) for file in files]
+            if self.fps is None and stamps and all(stamps):
+                times = [int(m.group(1)) / 1000.0 for m in stamps]
+                self._intervals = [max(0.0, b - a) for a, b in zip(times, times[1:])]
+        else:
+            # 파일 전체를 한 번에 넣으면 파서 버퍼 한도를 넘으므로 나누어 읽음
+            parser = MJPEGFrameParser()
+            self._frames = []
+            with open(self.path, "rb") as f:
+                while True:
+                    frames = parser.read_from(f)
+                    if frames is None:
+                        break
+                    self._frames.extend(frames)
+
+        if not self._frames:
+            raise ValueError(f"No JPEG frames found in {self.path}")
+        if not self._intervals:
+            interval = 1.0 / (self.fps or self.DEFAULT_FPS)
+            self._intervals = [interval] * (len(self._frames) - 1)
+        # 반복 재생 시 마지막 프레임 이후 간격
+        self._intervals.append(sum(self._intervals) / len(self._intervals) if self._intervals
+                               else 1.0 / (self.fps or self.DEFAULT_FPS))
+        self._index = 0
+        self._next_time = None
+        self.resolution = jpeg_dimensions(self._frames[0])
+        logging.info(f"Loaded {len(self._frames)} frames for replay from {self.path}")
+
+    def read(self):
+        if self._index >= len(self._frames):
+            if not self.loop:
+                return None
+            self._index = 0
+        # 현재 프레임 시각까지 대기하고, 다음 프레임까지의 간격을 예약
+        self._wait(self._intervals[self._index])
+        frame = self._frames[self._index]
+        self._index += 1
+        return [frame]
+
+    def describe(self) -> str:
+        rate = f"{self.fps}fps" if self.fps else "original rate"
+        return f"{self.name} ({self.path}, {rate})"
+
+# 8x8 회색 JPEG (합성 프레임의 기본 이미지)
+_BASE_JPEG = bytes.fromhex(
+    'ffd8ffe000104a46494600010100000100010000ffdb004300100b0c0e0c0a100e0d0e1211101318281a181616183123'
+    '251d283a333d3c3933383740485c4e404457453738506d51575f626768673e4d71797064785c656763ffdb0043011112'
+    '121815182f1a1a2f63423842636363636363636363636363636363636363636363636363636363636363636363636363'
+    '6363636363636363636363636363ffc00011080008000803012200021101031101ffc4001f0000010501010101010100'
+    '000000000000000102030405060708090a0bffc400b5100002010303020403050504040000017d010203000411051221'
+    '31410613516107227114328191a1082342b1c11552d1f02433627282090a161718191a25262728292a3435363738393a'
+    '434445464748494a535455565758595a636465666768696a737475767778797a838485868788898a9293949596979899'
+    '9aa2a3a4a5a6a7a8a9aab2b3b4b5b6b7b8b9bac2c3c4c5c6c7c8c9cad2d3d4d5d6d7d8d9dae1e2e3e4e5e6e7e8e9eaf1'
+    'f2f3f4f5f6f7f8f9faffc4001f0100030101010101010101010000000000000102030405060708090a0bffc400b51100'
+    '020102040403040705040400010277000102031104052131061241510761711322328108144291a1b1c109233352f015'
+    '6272d10a162434e125f11718191a262728292a35363738393a434445464748494a535455565758595a63646566676869'
+    '6a737475767778797a82838485868788898a92939495969798999aa2a3a4a5a6a7a8a9aab2b3b4b5b6b7b8b9bac2c3c4'
+    'c5c6c7c8c9cad2d3d4d5d6d7d8d9dae2e3e4e5e6e7e8e9eaf2f3f4f5f6f7f8f9faffda000c03010002110311003f0028'
+    'a28a00ffd9'
+)
+
+class SyntheticSource(_PacedSource):
+    """지정한 크기와 속도로 디코딩 가능한 JPEG를 생성하는 소스
+
+    기본 JPEG에 COM 세그먼트로 프레임 번호와 패딩을 넣어 원하는 크기를 맞춥니다.
+    """
+
+    name = 'synthetic'
+    MAX_SEGMENT = 65533  # COM 세그먼트 최대 데이터 길이
+    resolution = jpeg_dimensions(_BASE_JPEG)
+
+    def __init__(self, frame_size: int = 300 * 1024, fps: float = 30.0):
+        super().__init__(fps)
+        self.frame_size = max(frame_size, len(_BASE_JPEG) + 32)
+        self._counter = 0
+        self._padding = b""
+
+    @staticmethod
+    def _comment(data: bytes) -> bytes:
+        return b'\xff\xfe' + (len(data) + 2).to_bytes(2, 'big') + data
+
+    def start(self):
+        self._counter = 0
+        self._next_time = None
+        # 패딩 세그먼트는 한 번만 생성하여 모든 프레임이 공유
+        remaining = self.frame_size - len(_BASE_JPEG) - 32
+        segments = []
+        while remaining > 4:
+            size = min(self.MAX_SEGMENT, remaining - 4)
+            segments.append(self._comment(bytes(size)))
+            remaining -= size + 4
+        self._padding = b"".join(segments)
+
+    def read(self):
+        self._wait(1.0 / self.fps)
+        label = self._comment(f"frame={self._counter:020d}".ljust(26).encode())
+        self._counter += 1
+        return [_BASE_JPEG[:2] + label + self._padding + _BASE_JPEG[2:]]
+
+    def describe(self) -> str:
+        return f"{self.name} ({self.frame_size} bytes, {self.fps}fps)"
+
+def command_option(command: str, name: str):
+    """libcamera-vid 명령어의 --name 숫자 옵션 값 (없으면 None)"""
+    match = re.search(rf"--{name}\s+([\d.]+)", command)
+    return float(match.group(1)) if match else None
+
+def create_frame_source(kind: str, **options) -> FrameSource:
+    """설정값으로 프레임 소스 생성
+
+    Args:
+        kind: 'libcamera', 'replay', 'synthetic' 중 하나
+        options: 각 소스 생성자 인자
+
+    Raises:
+        ValueError: 알 수 없는 소스 종류
+    """
+    sources = {
+        LibcameraSource.name: LibcameraSource,
+        FileReplaySource.name: FileReplaySource,
+        SyntheticSource.name: SyntheticSource,
+    }
+    if kind not in sources:
+        raise ValueError(f"Unknown frame source: {kind}")
+    return sources[kind](**options)
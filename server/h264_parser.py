@@ -0,0 +1,141 @@
+# server/h264_parser.py
+
+START_CODE = b'\x00\x00\x01'
+AU_START_CODE = b'\x00\x00\x00\x01'
+
+# NAL 유닛 타입
+NAL_SLICE = 1
+NAL_IDR = 5
+NAL_SEI = 6
+NAL_SPS = 7
+NAL_PPS = 8
+NAL_AUD = 9
+
+class AccessUnit(bytes):
+    """Annex-B 형식의 H.264 액세스 유닛 (한 프레임)
+
+    Attributes:
+        keyframe (bool): IDR 슬라이스 포함 여부
+    """
+    keyframe = False
+
+class H264AccessUnitParser:
+    """H.264 엘리멘터리 스트림을 액세스 유닛 단위로 분리하는 증분 파서
+
+    시작 코드로 NAL 유닛을 나누고 AUD/SPS/PPS/SEI 또는 first_mb_in_slice == 0인
+    새 슬라이스가 나타나면 이전 액세스 유닛을 완성합니다. 최신 SPS/PPS를 보관하여
+    SPS/PPS가 없는 IDR 앞에 붙여 주므로 키프레임만으로 디코딩을 시작할 수 있습니다.
+
+    Attributes:
+        sps (bytes): 마지막으로 받은 SPS NAL
+        pps (bytes): 마지막으로 받은 PPS NAL
+        units_parsed (int): 파싱된 액세스 유닛 수
+        bytes_in (int): 입력된 총 바이트 수
+    """
+
+    def __init__(self, read_size: int = 64 * 1024):
+        self.read_size = read_size
+        self._buf = bytearray()
+        self._scan = 0
+        self._nal_start = -1  # 현재 NAL의 시작 위치 (시작 코드 다음)
+        self._au = []
+        self._au_types = set()
+        self.sps = None
+        self.pps = None
+        self.units_parsed = 0
+        self.bytes_in = 0
+
+    @property
+    def buffered(self) -> int:
+        """버퍼에 남아 있는 미처리 바이트 수"""
+        return len(self._buf) + sum(len(nal) for nal in self._au)
+
+    def reset(self):
+        """파서 상태 초기화 (SPS/PPS 캐시는 유지)"""
+        self._buf = bytearray()
+        self._scan = 0
+        self._nal_start = -1
+        self._au = []
+        self._au_types = set()
+
+    def feed(self, data) -> list:
+        """바이트 데이터를 입력하고 완성된 액세스 유닛 목록 반환"""
+        self._buf += data
+        self.bytes_in += len(data)
+        units = []
+        pos = self._scan
+        while True:
+            sc = self._buf.find(START_CODE, pos)
+            if sc == -1:
+                break
+            if self._nal_start != -1:
+                # 4바이트 시작 코드의 앞 0x00과 trailing zero 제거
+                nal = bytes(self._buf[self._nal_start:sc]).rstrip(b'\x00')
+                if nal:
+                    units.extend(self._push_nal(nal))
+            self._nal_start = sc + 3
+            pos = sc + 3
+
+        # 처리한 NAL을 버퍼에서 제거하고, 경계에 걸친 시작 코드를 위해 2바이트 앞에서 검색 재개
+        if self._nal_start > 0:
+            del self._buf[:self._nal_start]
+            self._nal_start = 0
+        elif self._nal_start == -1 and len(self._buf) > 2:
+            del self._buf[:-2]
+        self._scan = max(self._nal_start if self._nal_start != -1 else 0, len(self._buf) - 2)
+        return units
+
+    def read_from(self, stream) -> list:
+        """스트림에서 읽어 완성된 액세스 유닛 목록 반환 (EOF면 None)"""
+        read = getattr(stream, 'read1', None) or stream.read
+        data = read(self.read_size)
+        if not data:
+            return None
+        return self.feed(data)
+
+    def flush(self) -> list:
+        """스트림 종료 시 남은 데이터를 마지막 액세스 유닛으로 반환"""
+        units = []
+        if self._nal_start != -1:
+            nal = bytes(self._buf[self._nal_start:]).rstrip(b'\x00')
+            if nal:
+                units.extend(self._push_nal(nal))
+        self._buf = bytearray()
+        self._nal_start = -1
+        self._scan = 0
+        if self._au:
+            units.append(self._finish_au())
+        return units
+
+    def _push_nal(self, nal: bytes) -> list:
+        nal_type = nal[0] & 0x1F
+        has_vcl = bool(self._au_types & {NAL_SLICE, NAL_IDR})
+        units = []
+        if has_vcl:
+            new_picture = nal_type in (NAL_SLICE, NAL_IDR) and len(nal) > 1 and nal[1] & 0x80
+            if nal_type in (NAL_AUD, NAL_SPS, NAL_PPS, NAL_SEI) or new_picture:
+                units.append(self._finish_au())
+
+        if nal_type == NAL_SPS:
+            self.sps = nal
+        elif nal_type == NAL_PPS:
+            self.pps = nal
+        self._au.append(nal)
+        self._au_types.add(nal_type)
+        return units
+
+    def _finish_au(self) -> AccessUnit:
+        nals = self._au
+        keyframe = NAL_IDR in self._au_types
+        if keyframe:
+            # 새 시청자가 바로 디코딩할 수 있도록 IDR 앞에 SPS/PPS 보장
+            if NAL_PPS not in self._au_types and self.pps:
+                nals = [self.pps] + nals
+            if NAL_SPS not in self._au_types and self.sps:
+                nals = [self.sps] + nals
+        unit = AccessUnit(b"".join(AU_START_CODE + nal for nal in nals))
+        unit.keyframe = keyframe
+        self._au = []
+        self._au_types = set()
+        self.units_parsed += 1
+        return unit
@@ -0,0 +1,142 @@
+# server/metrics.py
+
+import json
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class PipelineStats:
+    """캡처 스레드가 프레임마다 갱신하는 카운터
+
+    프레임마다 정수 덧셈만 하고, FPS는 1초에 한 번만 계산하여 캡처 스레드 부하를 최소화합니다.
+    """
+
+    def __init__(self):
+        self.frames_in = 0
+        self.bytes_in = 0
+        self.fps = 0.0
+        self.last_frame_at = None  # 마지막 프레임 수신 시각 (time.monotonic)
+        self.first_frame_at = None  # mark_restart() 이후 첫 프레임 수신 시각
+        self._window_start = time.monotonic()
+        self._window_frames = 0
+
+    def mark_restart(self):
+        """소스 재시작 시점 표시 (다음 프레임을 첫 프레임으로 기록)"""
+        self.first_frame_at = None
+        self.fps = 0.0
+        self._window_start = time.monotonic()
+        self._window_frames = 0
+
+    def record(self, frames: int, size: int):
+        """읽기 한 번의 결과 기록"""
+        self.frames_in += frames
+        self.bytes_in += size
+        self._window_frames += frames
+        now = time.monotonic()
+        if frames:
+            self.last_frame_at = now
+            if self.first_frame_at is None:
+                self.first_frame_at = now
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.fps = self._window_frames / elapsed
+            self._window_start = now
+            self._window_frames = 0
+
+class MetricsRegistry:
+    """지표 수집기 모음
+
+    각 수집기는 호출될 때 (이름, 타입, 설명, 라벨 dict, 값) 튜플 목록을 반환하는 함수입니다.
+    타입이 'summary'이면 값은 (합, 개수)이며 <이름>_sum, <이름>_count로 내보냅니다.
+    값은 스크레이프 시점에만 읽으므로 프레임 경로에는 추가 비용이 없습니다.
+    """
+
+    def __init__(self, prefix: str = "camstream"):
+        self.prefix = prefix
+        self._collectors = []
+
+    def register(self, collector):
+        """수집기 등록"""
+        self._collectors.append(collector)
+
+    def collect(self) -> list:
+        """모든 수집기의 현재 값 수집"""
+        samples = []
+        for collector in self._collectors:
+            try:
+                samples.extend(collector())
+            except Exception as e:
+                logging.error(f"Metrics collector failed: {e}")
+        return samples
+
+    def render_prometheus(self) -> str:
+        """Prometheus 텍스트 형식으로 변환"""
+        lines = []
+        described = set()
+        for name, kind, help_text, labels, value in self.collect():
+            full_name = f"{self.prefix}_{name}"
+            if full_name not in described:
+                lines.append(f"# HELP {full_name} {help_text}")
+                lines.append(f"# TYPE {full_name} {kind}")
+                described.add(full_name)
+            label_text = "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}" if labels else ""
+            if kind == 'summary':
+                total, count = value
+                lines.append(f"{full_name}_sum{label_text} {total}")
+                lines.append(f"{full_name}_count{label_text} {count}")
+            else:
+                lines.append(f"{full_name}{label_text} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """JSON/MQTT 발행용 dict로 변환 (라벨이 있는 지표는 라벨 값별 dict)"""
+        result = {'timestamp': time.time()}
+        for name, kind, _, labels, value in self.collect():
+            if kind == 'summary':
+                value = {'sum': value[0], 'count': value[1]}
+            if labels:
+                key = ",".join(str(v) for v in labels.values())
+                result.setdefault(name, {})[key] = value
+            else:
+                result[name] = value
+        return result
+
+class MetricsServer:
+    """지표를 HTTP로 제공하는 서버 (/metrics: Prometheus, /stats.json: JSON)"""
+
+    def __init__(self, registry: MetricsRegistry, host: str, port: int):
+        self.registry = registry
+        registry_ref = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body = registry_ref.render_prometheus().encode()
+                    content_type = 'text/plain; version=0.0.4'
+                elif self.path == '/stats.json':
+                    body = json.dumps(registry_ref.snapshot()).encode()
+                    content_type = 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # 스크레이프 요청마다 로그를 남기지 않음
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+    def start(self):
+        """백그라운드 스레드에서 HTTP 서버 시작"""
+        threading.Thread(target=self.httpd.serve_forever, name="MetricsThread", daemon=True).start()
+        logging.info(f"Metrics available at http://{self.httpd.server_address[0]}:{self.httpd.server_address[1]}/metrics")
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -1,7 +1,13 @@
 import paho.mqtt.client as mqtt
+import os
+import json
+import time
 import socket
 import logging
+import threading
+import urllib.request
 import config as cfg
+from protocol import SUPPORTED_VERSIONS
 
 def setup_logging():
     """기본 로깅 설정"""
@@ -11,7 +17,7 @@ def setup_logging():
         datefmt='%Y-%m-%d %H:%M:%S'
     )
 
-def get_ip_address():
+def find_ip_address():
     """서버의 로컬 IP 주소 찾기"""
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
     try:
@@ -24,12 +30,86 @@ def get_ip_address():
         s.close()
     return IP
 
+_ip_cache = {'ip': None, 'checked_at': 0.0}
+
+def get_ip_address():
+    """캐시된 로컬 IP 주소 반환 (IP_REFRESH_INTERVAL마다 다시 확인하여 인터페이스 변경 반영)"""
+    now = time.monotonic()
+    if _ip_cache['ip'] is None or now - _ip_cache['checked_at'] >= cfg.IP_REFRESH_INTERVAL:
+        ip = find_ip_address()
+        if ip != _ip_cache['ip']:
+            logging.info(f"Local IP address: {ip}")
+        _ip_cache['ip'], _ip_cache['checked_at'] = ip, now
+    return _ip_cache['ip']
+
+class DiscoveryResponder:
+    """탐색 요청에 보낼 서버 정보(JSON)를 만들고 응답 빈도를 제한
+
+    서버 정보는 DISCOVERY_CACHE_SECONDS 동안 재사용하여 요청이 몰려도 한 번만 생성하고,
+    같은 응답 토픽에는 DISCOVERY_REPLY_INTERVAL 안에 한 번만 응답합니다.
+    """
+
+    def __init__(self):
+        self._descriptor = None
+        self._built_at = 0.0
+        self._last_reply = {}  # 응답 토픽 -> 마지막 응답 시각
+        self.suppressed = 0
+
+    def descriptor(self) -> dict:
+        """서버 정보 반환 (캐시 만료 또는 IP 변경 시 갱신)"""
+        now = time.monotonic()
+        if (self._descriptor is None or now - self._built_at >= cfg.DISCOVERY_CACHE_SECONDS
+                or self._descriptor['ip'] != get_ip_address()):
+            self._descriptor = build_descriptor()
+            self._built_at = now
+        return self._descriptor
+
+    def should_reply(self, response_topic: str) -> bool:
+        """이 응답 토픽에 지금 응답할지 판단"""
+        now = time.monotonic()
+        last = self._last_reply.get(response_topic)
+        if last is not None and now - last < cfg.DISCOVERY_REPLY_INTERVAL:
+            self.suppressed += 1
+            return False
+        self._last_reply[response_topic] = now
+        if len(self._last_reply) > 1024:
+            # 오래된 응답 기록 정리
+            self._last_reply = {t: at for t, at in self._last_reply.items()
+                                if now - at < cfg.DISCOVERY_REPLY_INTERVAL}
+        return True
+
+_stats_cache = {'stats': None}  # StatsPoller 스레드가 마지막으로 조회한 스트리밍 서버 통계
+
+def build_descriptor() -> dict:
+    """탐색 응답용 서버 정보 생성
+
+    해상도, FPS, 시청자 수는 StatsPoller 스레드가 스트리밍 서버의 지표 엔드포인트에서 마지막으로
+    조회한 값(실행 중인 프레임 소스 기준)을 사용하며, MQTT 콜백에서 네트워크를 조회하지 않습니다.
+    아직 조회하지 못했으면 None으로 둡니다.
+    """
+    stats = _stats_cache['stats'] or {}
+    width, height = stats.get('camera_width_pixels'), stats.get('camera_height_pixels')
+    return {
+        'ip': get_ip_address(),
+        'port': cfg.STREAM_PORT,
+        'versions': list(SUPPORTED_VERSIONS),
+        'codec': cfg.STREAM_CODEC,
+        'resolution': [width, height] if width and height else None,
+        'fps': stats.get('camera_fps') or stats.get('camera_target_fps'),
+        'viewers': stats.get('clients'),
+        'load': round(os.getloadavg()[0], 2) if hasattr(os, 'getloadavg') else None,
+    }
+
+responder = DiscoveryResponder()
+
 def on_connect(client, userdata, flags, rc):
     """브로커 연결 콜백 함수"""
     if rc == 0:
         logging.info("Successfully connected to MQTT broker.")
         client.subscribe(cfg.MQTT_TOPIC_REQUEST)
         logging.info(f"Subscribed to topic: '{cfg.MQTT_TOPIC_REQUEST}'")
+        # (재)연결마다 온라인 상태를 즉시 알림
+        publish_presence(client)
     else:
         logging.error(f"Failed to connect to broker with result code: {rc}")
 
@@ -37,16 +117,90 @@ def on_message(client, userdata, msg):
     """메시지 수신 콜백 함수"""
     try:
         response_topic = msg.payload.decode()
+        if not responder.should_reply(response_topic):
+            logging.debug(f"Suppressed repeated discovery request from '{response_topic}'")
+            return
         logging.info(f"Received IP address request. Response topic: {response_topic}")
-        
-        server_ip = get_ip_address()
-        logging.info(f"Server IP identified: {server_ip}. Publishing to '{response_topic}'.")
-        
-        # 추출한 응답 토픽으로 서버 IP 주소를 발행
-        client.publish(response_topic, server_ip)
+
+        descriptor = responder.descriptor()
+        logging.info(f"Server IP identified: {descriptor['ip']}. Publishing to '{response_topic}'.")
+
+        # 추출한 응답 토픽으로 서버 정보(JSON)를 발행
+        client.publish(response_topic, json.dumps(descriptor, separators=(',', ':')))
     except Exception as e:
         logging.error(f"Error processing message: {e}")
 
+def presence_topic() -> str:
+    """현재 IP 기준 이 서버의 presence 토픽"""
+    return f"{cfg.MQTT_TOPIC_PRESENCE}/{get_ip_address()}"
+
+def offline_payload() -> str:
+    return json.dumps({'ip': get_ip_address(), 'status': 'offline'}, separators=(',', ':'))
+
+# LWT가 등록된 presence 토픽, 비워야 할 이전 IP의 토픽, IP 변경으로 다시 연결해야 하는지 여부
+_presence = {'topic': None, 'stale': set(), 'reconnect': False}
+
+def set_last_will(client):
+    """현재 IP의 presence 토픽에 LWT(offline) 등록 (다음 연결부터 적용)"""
+    _presence['topic'] = presence_topic()
+    client.will_set(_presence['topic'], offline_payload(), qos=1, retain=True)
+
+def publish_presence(client):
+    """LWT가 등록된 토픽에 retained 온라인 presence 발행 (서버 정보 포함, 하트비트로도 사용)
+
+    IP 변경 전 토픽에 남은 retained presence는 빈 retained 메시지로 지워, 클라이언트가
+    이전 IP의 서버를 offline으로 처리하게 합니다.
+    """
+    for topic in list(_presence['stale']):
+        client.publish(topic, b'', qos=1, retain=True)
+        _presence['stale'].discard(topic)
+    presence = dict(responder.descriptor(), status='online', ts=time.time())
+    client.publish(_presence['topic'], json.dumps(presence, separators=(',', ':')), qos=1, retain=True)
+
+def refresh_presence(client):
+    """하트비트 발행. IP가 바뀌었으면 LWT를 새 토픽으로 옮기고 연결을 끊어 다시 연결하게 함
+
+    LWT는 연결할 때 브로커에 등록되므로, 새 토픽의 LWT를 적용하려면 다시 연결해야 합니다.
+    재연결 후 on_connect에서 이전 토픽을 지우고 새 토픽에 presence를 발행합니다.
+    """
+    if presence_topic() == _presence['topic']:
+        publish_presence(client)
+        return
+    _presence['stale'].add(_presence['topic'])
+    set_last_will(client)
+    logging.warning(f"Local IP address changed. Moving presence to '{_presence['topic']}'.")
+    _presence['reconnect'] = True
+    client.disconnect()
+
+def publish_heartbeat(client, stop_event: threading.Event):
+    """presence를 주기적으로 다시 발행하여 클라이언트가 멈춘 서버를 감지할 수 있게 함"""
+    while not stop_event.wait(cfg.PRESENCE_HEARTBEAT_INTERVAL):
+        if client.is_connected():
+            refresh_presence(client)
+
+def fetch_stats() -> bytes:
+    """스트리밍 서버의 지표 엔드포인트에서 JSON 통계 조회"""
+    url = f"http://127.0.0.1:{cfg.METRICS_PORT}/stats.json"
+    with urllib.request.urlopen(url, timeout=1.0) as response:
+        return response.read()
+
+def poll_stats(client, stop_event: threading.Event):
+    """스트리밍 서버 지표를 DISCOVERY_CACHE_SECONDS마다 조회하여 탐색 응답용으로 보관하고,
+    STATS_PUBLISH_INTERVAL마다 MQTT로 발행"""
+    topic = f"{cfg.MQTT_TOPIC_STATS}/{get_ip_address()}"
+    next_publish = time.monotonic() + cfg.STATS_PUBLISH_INTERVAL
+    while True:
+        try:
+            body = fetch_stats()
+            _stats_cache['stats'] = json.loads(body)
+            if cfg.STATS_PUBLISH_INTERVAL > 0 and time.monotonic() >= next_publish:
+                next_publish = time.monotonic() + cfg.STATS_PUBLISH_INTERVAL
+                client.publish(topic, body)
+        except (OSError, ValueError) as e:
+            logging.debug(f"Stream server stats unavailable: {e}")
+        if stop_event.wait(cfg.DISCOVERY_CACHE_SECONDS):
+            return
+
 def start_mqtt_manager():
     """MQTT 관리자 프로세스를 시작"""
     setup_logging()
@@ -54,6 +208,15 @@ def start_mqtt_manager():
     client = mqtt.Client()
     client.on_connect = on_connect
     client.on_message = on_message
+    # 연결이 비정상적으로 끊기면 브로커가 retained offline 메시지를 대신 발행
+    set_last_will(client)
+
+    stop_event = threading.Event()
+    threading.Thread(target=publish_heartbeat, args=(client, stop_event), name="PresenceHeartbeat",
+                     daemon=True).start()
+    if cfg.METRICS_PORT:
+        threading.Thread(target=poll_stats, args=(client, stop_event), name="StatsPoller",
+                         daemon=True).start()
 
     try:
         logging.info(f"Attempting to connect to MQTT broker at {cfg.MQTT_BROKER_IP}:{cfg.MQTT_PORT}...")
@@ -61,6 +224,11 @@ def start_mqtt_manager():
         
         # 네트워크 트래픽을 처리하고, 재연결 등을 관리하는 블로킹 루프
         client.loop_forever()
+        while _presence['reconnect']:
+            # IP 변경으로 LWT를 새 토픽에 등록하기 위해 끊은 경우 다시 연결
+            _presence['reconnect'] = False
+            client.connect_async(cfg.MQTT_BROKER_IP, cfg.MQTT_PORT, 60)
+            client.loop_forever(retry_first_connection=True)
 
     except ConnectionRefusedError:
         logging.error("Broker connection refused. Check if the broker is running and the IP/port are correct.")
@@ -72,6 +240,13 @@ def start_mqtt_manager():
         logging.error(f"An unexpected error occurred: {e}")
     finally:
         logging.info("Disconnecting MQTT client.")
+        stop_event.set()
+        if client.is_connected():
+            # 정상 종료 시에는 LWT가 발행되지 않으므로 직접 offline 발행
+            info = client.publish(_presence['topic'], offline_payload(), qos=1, retain=True)
+            deadline = time.monotonic() + 2.0
+            while not info.is_published() and time.monotonic() < deadline:
+                client.loop(timeout=0.1)
         client.disconnect()
 
 if __name__ == '__main__':
@@ -0,0 +1,87 @@
+# server/preroll.py
+
+from collections import deque
+from protocol import Frame, FLAG_H264, FLAG_KEYFRAME
+
+class PrerollBuffer:
+    """최근 인코딩 프레임을 보관하는 메모리 제한 링 버퍼
+
+    녹화를 시작한 클라이언트가 트리거 이전 구간을 요청하면 보관 중인 프레임을
+    라이브 프레임보다 먼저 전송할 수 있도록 합니다. 가장 최근 프레임의 캡처 시각을 기준으로
+    max_seconds보다 오래된 프레임과, 총 크기가 max_bytes를 넘는 만큼의 오래된 프레임을 제거합니다.
+    발행 시 만든 해상도 단계별 축소 프레임도 함께 보관하며 크기에 포함합니다.
+
+    Attributes:
+        max_seconds (float): 보관 시간
+        max_bytes (int): 보관 최대 바이트 수
+        total_bytes (int): 현재 보관 중인 바이트 수
+        evicted (int): 제거된 프레임 수
+    """
+
+    def __init__(self, max_seconds: float = 5.0, max_bytes: int = 64 * 1024 * 1024):
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.evicted = 0
+        self._frames = deque()  # (원본 프레임, {단계: 프레임})
+
+    def __len__(self):
+        return len(self._frames)
+
+    @property
+    def duration(self) -> float:
+        """보관 중인 구간 길이 (초)"""
+        if not self._frames:
+            return 0.0
+        return (self._frames[-1][0].capture_us - self._frames[0][0].capture_us) / 1e6
+
+    @staticmethod
+    def _size(tier_frames: dict) -> int:
+        return sum(len(f.data) for f in tier_frames.values())
+
+    def append(self, frame: Frame, tier_frames: dict = None):
+        """새 프레임 추가 후 시간/용량 기준으로 오래된 프레임 제거
+
+        Args:
+            frame: 원본 프레임
+            tier_frames: 해상도 단계별 프레임 ('full'은 원본, 없으면 원본만 보관)
+        """
+        if self.max_seconds <= 0 or self.max_bytes <= 0:
+            return
+        tier_frames = tier_frames or {'full': frame}
+        self._frames.append((frame, tier_frames))
+        self.total_bytes += self._size(tier_frames)
+
+        oldest_allowed = frame.capture_us - int(self.max_seconds * 1e6)
+        frames = self._frames
+        while len(frames) > 1 and (frames[0][0].capture_us < oldest_allowed or self.total_bytes > self.max_bytes):
+            self.total_bytes -= self._size(frames.popleft()[1])
+            self.evicted += 1
+
+    def entries_since(self, since_us: int) -> list:
+        """since_us 이후에 캡처된 (원본 프레임, {단계: 프레임}) 목록 반환
+
+        H.264 프레임은 키프레임부터 디코딩할 수 있으므로, since_us 직전의 키프레임까지 시작점을
+        당기고, 보관 중인 키프레임이 없으면 since_us 이후 첫 키프레임부터 반환합니다.
+        """
+        entries = list(self._frames)
+        start = next((i for i, (f, _) in enumerate(entries) if f.capture_us >= since_us), len(entries))
+        if start == len(entries):
+            return []
+
+        if entries[0][0].flags & FLAG_H264:
+            keyframe = next((i for i in range(start, -1, -1) if entries[i][0].flags & FLAG_KEYFRAME), None)
+            if keyframe is None:
+                keyframe = next((i for i in range(start, len(entries)) if entries[i][0].flags & FLAG_KEYFRAME),
+                                len(entries))
+            start = keyframe
+        return entries[start:]
+
+    def frames_since(self, since_us: int) -> list:
+        """since_us 이후에 캡처된 원본 프레임 목록 반환 (entries_since()와 같은 시작점)"""
+        return [frame for frame, _ in self.entries_since(since_us)]
+
+    def clear(self):
+        """보관 중인 프레임 모두 제거"""
+        self._frames.clear()
+        self.total_bytes = 0
@@ -0,0 +1,76 @@
+# server/preview.py
+
+import logging
+from protocol import Frame
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:  # 서버에 OpenCV가 없으면 모든 구독을 원본 해상도로 처리
+    cv2 = None
+    np = None
+
+# 구독 단계별 축소 비율
+TIER_SCALES = {
+    'full': 1,
+    'half': 2,
+    'quarter': 4,
+    'eighth': 8,
+}
+
+def available_tiers() -> list:
+    """이 서버에서 제공 가능한 구독 단계 목록"""
+    if cv2 is None:
+        return ['full']
+    return list(TIER_SCALES)
+
+def resolve_tier(requested) -> str:
+    """요청된 구독 단계를 제공 가능한 단계로 변환"""
+    if requested in TIER_SCALES and requested in available_tiers():
+        return requested
+    if requested not in (None, 'full'):
+        logging.warning(f"Preview tier '{requested}' is not available. Using full resolution.")
+    return 'full'
+
+class PreviewEncoder:
+    """축소 해상도 JPEG 생성기
+
+    libjpeg DCT 스케일링(IMREAD_REDUCED_COLOR_n)으로 원본을 축소 디코딩한 뒤 다시 인코딩합니다.
+    한 프레임에 대해 단계별로 한 번만 인코딩하고, 같은 단계의 모든 구독자가 결과를 공유합니다.
+    """
+
+    _REDUCED_FLAGS = {
+        2: 'IMREAD_REDUCED_COLOR_2',
+        4: 'IMREAD_REDUCED_COLOR_4',
+        8: 'IMREAD_REDUCED_COLOR_8',
+    }
+
+    def __init__(self, quality: int = 70):
+        self.quality = quality
+        self._sequence = None
+        self._cache = {}  # tier -> Frame (현재 시퀀스에 대해서만 유지)
+        self.encoded = 0
+
+    def get(self, frame: Frame, tier: str) -> Frame:
+        """프레임의 지정 단계 버전 반환 (원본 단계면 원본 그대로)"""
+        scale = TIER_SCALES.get(tier, 1)
+        if scale == 1 or cv2 is None:
+            return frame
+
+        if frame.sequence != self._sequence:
+            self._sequence = frame.sequence
+            self._cache = {}
+        cached = self._cache.get(tier)
+        if cached is not None:
+            return cached
+
+        image = cv2.imdecode(np.frombuffer(frame.data, np.uint8), getattr(cv2, self._REDUCED_FLAGS[scale]))
+        if image is None:
+            logging.warning(f"Failed to decode frame {frame.sequence} for preview tier '{tier}'")
+            reduced = frame
+        else:
+            ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+            reduced = Frame(encoded.tobytes(), frame.sequence, frame.capture_us, frame.flags) if ok else frame
+            self.encoded += 1
+        self._cache[tier] = reduced
+        return reduced
@@ -2,15 +2,15 @@
 
 import socket
 import threading
-import subprocess
-import shlex
-import struct
+import argparse
 import logging
 import config as cfg
-
-# --- 전역 변수 ---
-LATEST_FRAME = None
-LOCK = threading.Condition()
+from protocol import CODEC_H264
+from server.broadcaster import FrameBroadcaster
+from server.frame_sources import create_frame_source
+from server.preroll import PrerollBuffer
+from server.metrics import PipelineStats, MetricsRegistry, MetricsServer
+from server.supervisor import CaptureSupervisor
 
 def setup_logging():
     """기본 로깅 설정"""
@@ -20,107 +20,148 @@ def setup_logging():
         datefmt='%Y-%m-%d %H:%M:%S'
     )
 
-def capture_frames(process):
-    """libcamera-vid 출력을 읽어 JPEG 프레임 파싱하고 공유 변수에 저장"""
-    global LATEST_FRAME
-    buffer = b""
-    while True:
-        try:
-            chunk = process.stdout.read(4096)
-            if not chunk:
-                logging.warning("stdout stream ended. Terminating capture thread.")
-                break
-            buffer += chunk
-            
-            a = buffer.find(b'\xff\xd8')
-            b = buffer.find(b'\xff\xd9')
-
-            if a != -1 and b != -1:
-                jpg = buffer[a:b+2]
-                buffer = buffer[b+2:]
-
-                with LOCK:
-                    LATEST_FRAME = jpg
-                    LOCK.notify_all()
-        except Exception as e:
-            logging.error(f"Error reading from stdout: {e}")
-            break
-
-def monitor_stderr(process):
-    """libcamera-vid의 표준 에러 출력 로깅"""
-    while True:
-        try:
-            line_bytes = process.stderr.readline()
-            if not line_bytes:
-                break
-            
-            line = line_bytes.decode().strip()
-
-            if "ERROR" in line:
-                logging.error(f"[libcamera-vid] {line}")
-            elif "WARN" in line:
-                logging.warning(f"[libcamera-vid] {line}")
-            else:
-                logging.info(f"[libcamera-vid] {line}")
-        except Exception as e:
-            logging.error(f"Error reading from stderr: {e}")
-            break
-
-def handle_client(conn, addr):
-    """연결된 클라이언트에게 프레임 전송"""
-    logging.info(f"New connection from {addr}")
-    try:
-        while True:
-            with LOCK:
-                LOCK.wait()
-                frame = LATEST_FRAME
-            
-            if frame is None or len(frame) == 0:
-                continue
-
-            try:
-                size = len(frame)
-                packed_size = struct.pack(">L", size)
-                conn.sendall(packed_size)
-                conn.sendall(frame)
-            except (ConnectionResetError, ConnectionAbortedError, BrokenPipeError):
-                logging.warning(f"Connection lost from {addr}")
-                break
-            except Exception as e:
-                logging.error(f"Send error to {addr}: {e}")
-                break
-    finally:
-        logging.info(f"Closing connection for {addr}")
-        conn.close()
+def create_source_from_config(kind: str = None, path: str = None, fps: float = None, frame_size: int = None):
+    """config.py 설정(또는 지정한 값)에 맞는 프레임 소스 생성"""
+    kind = kind or cfg.FRAME_SOURCE
+    if kind == 'replay':
+        return create_frame_source('replay', path=path or cfg.REPLAY_PATH,
+                                   fps=fps or cfg.REPLAY_FPS, loop=cfg.REPLAY_LOOP)
+    if kind == 'synthetic':
+        return create_frame_source('synthetic', frame_size=frame_size or cfg.SYNTHETIC_FRAME_SIZE,
+                                   fps=fps or cfg.SYNTHETIC_FPS)
+    if cfg.STREAM_CODEC == CODEC_H264:
+        return create_frame_source(kind, command=cfg.LIBCAMERA_VID_H264_COMMAND,
+                                   read_size=cfg.CAPTURE_READ_SIZE, codec=CODEC_H264)
+    return create_frame_source(kind, command=cfg.LIBCAMERA_VID_COMMAND, read_size=cfg.CAPTURE_READ_SIZE)
+
+def register_stream_metrics(registry: MetricsRegistry, supervisor: CaptureSupervisor, broadcaster: FrameBroadcaster):
+    """캡처/팬아웃 파이프라인 지표 수집기 등록
+
+    모든 값은 각 구성 요소가 이미 유지하는 카운터를 스크레이프 시점에 읽기만 합니다.
+    """
+    source, stats = supervisor.source, supervisor.stats
+
+    def capture():
+        samples = [
+            ('camera_up', 'gauge', "Whether the frame source is running", {}, int(supervisor.is_capturing)),
+            ('camera_restarts_total', 'counter', "Frame source restarts", {}, supervisor.restarts),
+            ('camera_stalls_total', 'counter', "Frame source stalls detected by the watchdog", {},
+             supervisor.stalls),
+            ('camera_frames_total', 'counter', "Frames read from the frame source", {}, stats.frames_in),
+            ('camera_bytes_total', 'counter', "Encoded bytes read from the frame source", {}, stats.bytes_in),
+            ('camera_fps', 'gauge', "Frames per second read from the frame source", {}, round(stats.fps, 2)),
+        ]
+        if source.resolution is not None:
+            samples.append(('camera_width_pixels', 'gauge', "Frame width of the running source", {},
+                            source.resolution[0]))
+            samples.append(('camera_height_pixels', 'gauge', "Frame height of the running source", {},
+                            source.resolution[1]))
+        if source.target_fps:
+            samples.append(('camera_target_fps', 'gauge', "Frame rate the source is configured for", {},
+                            source.target_fps))
+        parser = getattr(source, 'parser', None)
+        if parser is not None:
+            samples.append(('parser_buffer_bytes', 'gauge', "Bytes buffered in the stream parser", {},
+                            parser.buffered))
+        if hasattr(source, 'stderr_warnings'):
+            samples.append(('libcamera_stderr_lines_total', 'counter', "libcamera-vid stderr lines by level",
+                            {'level': 'warning'}, source.stderr_warnings))
+            samples.append(('libcamera_stderr_lines_total', 'counter', "libcamera-vid stderr lines by level",
+                            {'level': 'error'}, source.stderr_errors))
+        if supervisor.time_to_first_frame is not None:
+            samples.append(('camera_time_to_first_frame_seconds', 'gauge',
+                            "Time from the last source (re)start to its first frame", {},
+                            round(supervisor.time_to_first_frame, 3)))
+        return samples
 
-def start_stream_server():
-    """스트리밍 서버의 모든 기능 시작 및 관리"""
+    def fanout():
+        samples = [
+            ('clients', 'gauge', "Connected clients", {}, len(broadcaster.clients)),
+            ('connections_total', 'counter', "Accepted client connections", {}, broadcaster.connections_total),
+            ('frames_coalesced_total', 'counter', "Frames skipped because the send loop fell behind", {},
+             broadcaster.coalesced),
+            ('frames_dropped_total', 'counter', "Frames dropped from client send queues", {},
+             broadcaster.dropped_total),
+            ('preroll_bytes', 'gauge', "Bytes held in the pre-roll buffer", {}, broadcaster.preroll.total_bytes),
+        ]
+        for client in broadcaster.client_stats():
+            labels = {'client': client['addr']}
+            samples += [
+                ('client_frames_sent_total', 'counter', "Frames sent per client", labels, client['frames_sent']),
+                ('client_bytes_sent_total', 'counter', "Bytes sent per client", labels, client['bytes_sent']),
+                ('client_frames_dropped_total', 'counter', "Frames dropped per client", labels, client['dropped']),
+                ('client_queue_depth', 'gauge', "Frames waiting in the client send queue", labels,
+                 client['queue_depth']),
+                ('client_send_latency_seconds', 'summary', "Queue-to-socket latency of sent frames", labels,
+                 (round(client['send_latency_sum'], 6), client['frames_sent'])),
+            ]
+        return samples
+
+    registry.register(capture)
+    registry.register(fanout)
+
+def start_stream_server(source=None):
+    """스트리밍 서버의 모든 기능 시작 및 관리
+
+    Args:
+        source: 사용할 프레임 소스 (None이면 config.py 설정에 따라 생성)
+    """
     setup_logging()
-    
-    process = subprocess.Popen(shlex.split(cfg.LIBCAMERA_VID_COMMAND), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    logging.info(f"Started libcamera-vid process with command: {cfg.LIBCAMERA_VID_COMMAND}")
 
-    # 캡처 및 에러 모니터링을 위한 백그라운드 스레드 시작
-    threading.Thread(target=capture_frames, args=(process,), name="CaptureThread", daemon=True).start()
-    threading.Thread(target=monitor_stderr, args=(process,), name="StderrMonitorThread", daemon=True).start()
+    if source is None:
+        source = create_source_from_config()
 
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     # 소켓 재사용 옵션 설정
     server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
     server_socket.bind((cfg.STREAM_HOST, cfg.STREAM_PORT))
     server_socket.listen()
+    broadcaster = FrameBroadcaster(server_socket, queue_size=cfg.CLIENT_QUEUE_SIZE,
+                                   handshake_timeout=cfg.HANDSHAKE_TIMEOUT, codec=source.codec,
+                                   gop_cache_frames=cfg.GOP_CACHE_FRAMES,
+                                   preroll=PrerollBuffer(cfg.PREROLL_SECONDS, cfg.PREROLL_MAX_BYTES))
     logging.info(f"Server is listening on {cfg.STREAM_HOST}:{cfg.STREAM_PORT}")
 
+    # 소스가 종료되거나 멈추면 클라이언트 연결을 유지한 채 백오프 후 재시작
+    supervisor = CaptureSupervisor(source, broadcaster, PipelineStats(), stall_timeout=cfg.CAPTURE_STALL_TIMEOUT,
+                                   backoff_initial=cfg.CAPTURE_RESTART_BACKOFF,
+                                   backoff_max=cfg.CAPTURE_RESTART_BACKOFF_MAX)
+    metrics_server = None
+    if cfg.METRICS_PORT:
+        registry = MetricsRegistry()
+        register_stream_metrics(registry, supervisor, broadcaster)
+        try:
+            metrics_server = MetricsServer(registry, cfg.METRICS_HOST, cfg.METRICS_PORT)
+            metrics_server.start()
+        except OSError as e:
+            logging.error(f"Failed to start metrics endpoint on port {cfg.METRICS_PORT}: {e}")
+
+    # 캡처를 위한 백그라운드 스레드 시작
+    threading.Thread(target=supervisor.run, name="CaptureThread", daemon=True).start()
+
     try:
-        while True:
-            conn, addr = server_socket.accept()
-            threading.Thread(target=handle_client, args=(conn, addr), name=f"Client-{addr[0]}", daemon=True).start()
+        # 모든 클라이언트 전송은 단일 이벤트 루프에서 처리
+        broadcaster.serve_forever()
     except KeyboardInterrupt:
         logging.info("Keyboard interrupt received, shutting down.")
     finally:
         logging.info("Stopping server and processes...")
-        process.terminate()
+        supervisor.stop()
+        if metrics_server is not None:
+            metrics_server.stop()
+        broadcaster.close()
         server_socket.close()
 
+def parse_args():
+    """단독 실행 인자 파싱 (카메라가 없는 환경에서 벤치마크할 때 사용)"""
+    parser = argparse.ArgumentParser(description="Camera streaming server")
+    parser.add_argument('--source', choices=['libcamera', 'replay', 'synthetic'], default=None,
+                        help="프레임 소스 (기본값: config.FRAME_SOURCE)")
+    parser.add_argument('--path', default=None, help="replay 소스의 MJPEG 파일 또는 JPEG 디렉토리")
+    parser.add_argument('--fps', type=float, default=None, help="replay/synthetic 프레임레이트")
+    parser.add_argument('--frame-size', type=int, default=None, help="synthetic 프레임 크기 (바이트)")
+    return parser.parse_args()
+
 if __name__ == '__main__':
-    start_stream_server()
\ No newline at end of file
+    args = parse_args()
+    start_stream_server(create_source_from_config(args.source, args.path, args.fps, args.frame_size))
@@ -0,0 +1,118 @@
+# server/supervisor.py
+
+import time
+import logging
+import threading
+from protocol import Frame, now_us
+from server.metrics import PipelineStats
+
+class CaptureSupervisor:
+    """프레임 소스를 감시하고 종료/정지 시 재시작하는 캡처 루프
+
+    소스가 끝나거나(read()가 None 반환, 예외) stall_timeout 동안 프레임이 없으면 소스를 정지하고
+    지수 백오프 후 다시 시작합니다. 브로드캐스터와 클라이언트 연결은 그대로 유지되며,
+    시퀀스 번호도 재시작 전후로 이어지므로 클라이언트는 재연결 없이 수신을 계속합니다.
+
+    Attributes:
+        restarts (int): 소스 재시작 횟수
+        stalls (int): 프레임 정지로 감지된 횟수
+        time_to_first_frame (float): 마지막 (재)시작부터 첫 프레임까지 걸린 시간 (초)
+        is_capturing (bool): 소스가 실행 중이며 프레임을 받고 있는지 여부
+    """
+
+    def __init__(self, source, broadcaster, stats: PipelineStats = None, stall_timeout: float = 5.0,
+                 backoff_initial: float = 1.0, backoff_max: float = 30.0):
+        self.source = source
+        self.broadcaster = broadcaster
+        self.stats = stats if stats is not None else PipelineStats()
+        self.stall_timeout = stall_timeout
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.restarts = 0
+        self.stalls = 0
+        self.time_to_first_frame = None
+        self.is_capturing = False
+        self.sequence = 0
+        self._started_at = None
+        self._backoff = backoff_initial
+        self._stop_event = threading.Event()
+
+    def run(self):
+        """캡처 루프 실행 (stop() 호출 시까지 블로킹)"""
+        if self.stall_timeout:
+            threading.Thread(target=self._watchdog, name="CaptureWatchdog", daemon=True).start()
+
+        first = True
+        while not self._stop_event.is_set():
+            if not first:
+                logging.warning(f"Restarting frame source in {self._backoff:.1f}s")
+                if self._stop_event.wait(self._backoff):
+                    break
+                self._backoff = min(self._backoff * 2, self.backoff_max)
+                self.restarts += 1
+            first = False
+
+            try:
+                self.stats.mark_restart()
+                self._started_at = time.monotonic()
+                self.source.start()
+                logging.info(f"Frame source started: {self.source.describe()}")
+            except Exception as e:
+                logging.error(f"Failed to start frame source: {e}")
+                continue
+
+            self.is_capturing = True
+            self._capture()
+            self.is_capturing = False
+            self.source.stop()
+
+    def _capture(self):
+        """소스가 끝날 때까지 프레임을 읽어 브로드캐스터로 전달"""
+        source, broadcaster, stats = self.source, self.broadcaster, self.stats
+        while not self._stop_event.is_set():
+            try:
+                frames = source.read()
+            except Exception as e:
+                logging.error(f"Error reading from frame source: {e}")
+                return
+            if frames is None:
+                if not self._stop_event.is_set():
+                    logging.warning("Frame source ended.")
+                return
+            if not frames:
+                continue
+            capture_us = now_us()
+            stats.record(len(frames), sum(len(data) for data in frames))
+            if self._started_at is not None:
+                self._on_first_frame()
+
+            # 한 번의 읽기에 여러 프레임이 포함된 경우 모두 순서대로 전달
+            for data in frames:
+                broadcaster.publish(Frame(data, self.sequence, capture_us, source.flags_for(data)))
+                self.sequence += 1
+
+    def _on_first_frame(self):
+        """(재)시작 후 첫 프레임 수신 처리"""
+        self.time_to_first_frame = self.stats.first_frame_at - self._started_at
+        self._started_at = None
+        self._backoff = self.backoff_initial
+        logging.info(f"First frame received {self.time_to_first_frame:.2f}s after source start")
+
+    def _watchdog(self):
+        """stall_timeout 동안 프레임이 없으면 소스를 정지시켜 캡처 루프가 재시작하게 함"""
+        interval = max(0.1, self.stall_timeout / 4)
+        while not self._stop_event.wait(interval):
+            if not self.is_capturing:
+                continue
+            # 첫 프레임 전에는 시작 시각부터, 이후에는 마지막 프레임부터 경과 시간 측정
+            last = self._started_at if self._started_at is not None else self.stats.last_frame_at
+            if last is not None and time.monotonic() - last > self.stall_timeout:
+                self.stalls += 1
+                logging.error(f"No frame from source for {self.stall_timeout:.1f}s. Stopping it for restart.")
+                self.is_capturing = False
+                self.source.stop()
+
+    def stop(self):
+        """캡처 루프 종료 요청"""
+        self._stop_event.set()
+        self.source.stop()
@@ -0,0 +1,74 @@
+"""Fan-out throughput/latency benchmark for the stream server
+Usage:
+    PYTHONPATH=. python -m server.stream_server --source synthetic --fps 30 &
+    PYTHONPATH=. python tests/bench_fanout.py [host] [clients] [seconds]
+
+N개의 v2 클라이언트를 동시에 연결하여 클라이언트별 FPS, 처리량, 손실 프레임,
+캡처 후 수신까지의 지연(같은 호스트에서 실행 시 정확)을 출력합니다.
+"""
+import sys
+import socket
+import threading
+import time
+import config as cfg
+from protocol import V2_HEADER, HELLO_HEADER, now_us, pack_hello, try_unpack_hello, unpack_v2_header
+
+
+def recv_exact(f, count):
+    data = f.read(count)
+    if len(data) < count:
+        raise ConnectionError("connection closed")
+    return data
+
+
+def run_client(host, seconds, results, index):
+    sock = socket.create_connection((host, cfg.STREAM_PORT))
+    sock.sendall(pack_hello({'versions': [2]}))
+    f = sock.makefile('rb')
+    header = recv_exact(f, HELLO_HEADER.size)
+    _, length = HELLO_HEADER.unpack(header)
+    reply, _ = try_unpack_hello(header + recv_exact(f, length))
+    offset = now_us() - reply['server_time_us']
+
+    frames = lost = total_bytes = 0
+    ages = []
+    last_seq = None
+    start = time.time()
+    while time.time() - start < seconds:
+        _, size, seq, capture_us = unpack_v2_header(recv_exact(f, V2_HEADER.size))
+        recv_exact(f, size)
+        ages.append((now_us() - offset - capture_us) / 1000.0)
+        if last_seq is not None and seq > last_seq + 1:
+            lost += seq - last_seq - 1
+        last_seq = seq
+        frames += 1
+        total_bytes += size
+    elapsed = time.time() - start
+    sock.close()
+    ages.sort()
+    results[index] = (frames / elapsed, total_bytes / elapsed / 1e6, lost,
+                      ages[len(ages) // 2] if ages else 0.0, ages[int(len(ages) * 0.99)] if ages else 0.0)
+
+
+def main():
+    host = sys.argv[1] if len(sys.argv) > 1 else '127.0.0.1'
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    seconds = float(sys.argv[3]) if len(sys.argv) > 3 else 10.0
+
+    results = [None] * clients
+    threads = [threading.Thread(target=run_client, args=(host, seconds, results, i)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    print(f"{'client':>6} {'fps':>7} {'MB/s':>7} {'lost':>6} {'p50 ms':>8} {'p99 ms':>8}")
+    for i, r in enumerate(results):
+        if r is None:
+            print(f"{i:>6} failed")
+            continue
+        fps, mbps, lost, p50, p99 = r
+        print(f"{i:>6} {fps:7.1f} {mbps:7.2f} {lost:6d} {p50:8.2f} {p99:8.2f}")
+
+if __name__ == '__main__':
+    main()
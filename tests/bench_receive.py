@@ -0,0 +1,84 @@
+"""Client receive path benchmark (bytes += packet vs recv_into)
+Usage:
+    PYTHONPATH=. python tests/bench_receive.py [frame_kb] [frames]
+
+별도 프로세스가 로컬 TCP로 v1 프레임(길이 헤더 + 페이로드)을 최대 속도로 보내고,
+기존 문자열 연결 방식과 재사용 버퍼 recv_into 방식으로 각각 수신하여
+프레임당 사용자 공간 복사량과 수신 측 CPU 시간을 비교합니다.
+"""
+import sys
+import time
+import socket
+import multiprocessing
+from protocol import V1_HEADER
+
+
+def sender(port, frame_size, frames):
+    payload = bytes(frame_size)
+    header = V1_HEADER.pack(frame_size)
+    with socket.create_connection(('127.0.0.1', port)) as sock:
+        for _ in range(frames):
+            sock.sendall(header)
+            sock.sendall(payload)
+
+
+def receive_concat(sock, count, stats):
+    """기존 StreamViewer.receive_all 방식"""
+    buf = b''
+    while len(buf) < count:
+        packet = sock.recv(count - len(buf))
+        if not packet:
+            return None
+        buf += packet
+        stats['copied'] += len(buf)  # 연결할 때마다 지금까지의 데이터 전체가 새 객체로 복사됨
+    return buf
+
+
+def receive_into(sock, count, stats, buffer):
+    """재사용 버퍼에 직접 수신"""
+    view = memoryview(buffer)[:count]
+    received = 0
+    while received < count:
+        n = sock.recv_into(view[received:], count - received)
+        if n == 0:
+            return None
+        received += n
+    return view
+
+
+def run(mode, frame_size, frames):
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+    proc = multiprocessing.Process(target=sender, args=(server.getsockname()[1], frame_size, frames))
+    proc.start()
+    conn, _ = server.accept()
+    conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4 * 1024 * 1024)
+
+    stats = {'copied': 0}
+    buffer = bytearray(frame_size)
+    header = bytearray(V1_HEADER.size)
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    for _ in range(frames):
+        if mode == 'concat':
+            size = V1_HEADER.unpack(receive_concat(conn, V1_HEADER.size, stats))[0]
+            data = receive_concat(conn, size, stats)
+        else:
+            size = V1_HEADER.unpack(receive_into(conn, V1_HEADER.size, stats, header))[0]
+            data = receive_into(conn, size, stats, buffer)
+        if data is None:
+            break
+    cpu, wall = time.process_time() - cpu_start, time.perf_counter() - wall_start
+    proc.join()
+    conn.close()
+    server.close()
+    return stats['copied'] / frames, cpu / frames * 1e6, frames / wall
+
+
+if __name__ == '__main__':
+    frame_kb = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    frames = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    print(f"frame={frame_kb}KB, frames={frames}")
+    for mode in ('concat', 'recv_into'):
+        copied, cpu_us, fps = run(mode, frame_kb * 1024, frames)
+        print(f"{mode:>10}: copied/frame={copied / 1024:8.0f}KB  cpu/frame={cpu_us:7.0f}us  throughput={fps:7.0f}fps")
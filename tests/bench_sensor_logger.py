@@ -0,0 +1,64 @@
+"""Sensor logger throughput benchmark (per-message pandas append vs buffered topic writer)
+Usage:
+    PYTHONPATH=. python tests/bench_sensor_logger.py [messages] [topics]
+
+임시 디렉토리에서 센서 메시지를 토픽에 번갈아 저장하며 초당 처리 메시지 수를 비교합니다.
+기존 방식은 메시지마다 한 행짜리 DataFrame을 만들어 to_csv(mode='a')로 파일을 열고 닫습니다.
+"""
+import os
+import sys
+import time
+import tempfile
+import config as cfg
+from client.core.sensor_logger import SensorDataLogger
+
+
+def save_with_pandas(logger, topic, data, paths):
+    """기존 SensorDataLogger.save_sensor_data 방식"""
+    import pandas as pd
+    row = {'timestamp': int(time.time() * 1000)}
+    row.update({column: data.get(column) for column in logger.columns[1:]})
+    df = pd.DataFrame([row])
+    path = paths.get(topic)
+    if path is None:
+        path = paths[topic] = logger.get_temp_path(topic)
+        df.to_csv(path, index=False, columns=logger.columns)
+    else:
+        df.to_csv(path, mode='a', header=False, index=False, columns=logger.columns)
+
+
+def run(mode, messages, topics):
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            if mode != 'pandas':
+                cfg.SENSOR_FILE_FORMAT = mode
+            logger = SensorDataLogger()
+            logger.start_recording()
+            paths = {}
+            data = {'mp905': 1.5, 'mp901': 2.5, 'mp801': 3.5, 'sgp30': 400, 'fermion': 0.1, 'ens160': 42}
+            start = time.perf_counter()
+            for i in range(messages):
+                topic = f"sensor/bench{i % topics}"
+                if mode == 'pandas':
+                    save_with_pandas(logger, topic, data, paths)
+                else:
+                    logger.save_sensor_data(topic, data)
+            logger.stop_recording()
+            elapsed = time.perf_counter() - start
+        finally:
+            os.chdir(cwd)
+    return messages / elapsed
+
+
+if __name__ == '__main__':
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    topics = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    for mode in ('pandas', 'csv', 'parquet'):
+        try:
+            rate = run(mode, messages, topics)
+        except ImportError as e:
+            print(f"{mode:8s} skipped ({e})")
+            continue
+        print(f"{mode:8s} {rate:10.0f} msg/s")
@@ -0,0 +1,108 @@
+import queue
+import socket
+import asyncio
+import threading
+import cv2
+import numpy as np
+import pytest
+import config as cfg
+from protocol import Frame, PROTOCOL_V2, now_us
+from server.broadcaster import FrameBroadcaster
+from client.core.async_client import AsyncStreamViewer, MultiStreamClient
+from client.core.frame_bus import FrameBusReader, bus_name
+
+class _SensorLogger:
+    """명령과 센서 묶음을 처리한 스레드를 기록하는 센서 기록기"""
+
+    def __init__(self):
+        self.calls = []
+
+    def start_recording(self, session_id):
+        self.calls.append(('start', session_id, threading.current_thread().name))
+
+    def stop_recording(self):
+        self.calls.append(('stop', None, threading.current_thread().name))
+
+    def save_batch(self, batch, depth):
+        self.calls.append(('batch', batch, threading.current_thread().name))
+
+async def wait_for(condition, timeout=10.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.01)
+
+def test_loopback_stream_and_commands(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    server_socket = socket.socket()
+    server_socket.bind(('127.0.0.1', 0))
+    server_socket.listen()
+    broadcaster = FrameBroadcaster(server_socket)
+    threading.Thread(target=broadcaster.serve_forever, args=(0.05,), daemon=True).start()
+    monkeypatch.setattr(cfg, 'STREAM_PORT', server_socket.getsockname()[1])
+    shown = []
+    monkeypatch.setattr(AsyncStreamViewer, 'show', lambda self, frame: shown.append(frame.shape))
+    monkeypatch.setattr(cv2, 'waitKey', lambda delay: -1)  # 화면 없는 환경
+
+    publishing = threading.Event()
+    def publish():
+        ok, jpeg = cv2.imencode('.jpg', np.zeros((48, 64, 3), np.uint8))
+        sequence = 0
+        while not publishing.wait(0.01):
+            sequence += 1
+            broadcaster.publish(Frame(jpeg.tobytes(), sequence, now_us()))
+
+    events = queue.Queue()
+    sensor_logger = _SensorLogger()
+    client = MultiStreamClient(events, sensor_logger, decode_workers=1, display_fps=100)
+
+    async def scenario():
+        task = asyncio.create_task(client.run())
+        events.put(("server_online", ("127.0.0.1", {})))
+        await wait_for(lambda: "127.0.0.1" in client.viewers)
+        viewer = client.viewers["127.0.0.1"]
+        assert viewer.protocol_version == PROTOCOL_V2
+        await wait_for(lambda: shown and viewer.frame_count >= 5)
+
+        events.put(("sensor_batch", ("sensor/air", [])))
+        events.put(("recording_start", "loopback-session"))
+        await wait_for(lambda: viewer.recorder.is_recording)
+        session = viewer.recorder.session.session_id
+        recorded = viewer.frame_count
+        await wait_for(lambda: viewer.frame_count >= recorded + 10)
+        events.put(("recording_stop", None))
+        await wait_for(lambda: len(sensor_logger.calls) == 3 and viewer.recorder.session is None)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        return session
+
+    threading.Thread(target=publish, daemon=True).start()
+    try:
+        session = asyncio.run(scenario())
+    finally:
+        publishing.set()
+        broadcaster.stop()
+    assert session == "loopback-session"
+    # 센서 기록과 녹화 명령은 받은 순서대로, 이벤트 루프가 아닌 I/O 스레드에서 처리
+    assert [call[:2] for call in sensor_logger.calls] == [('batch', ("sensor/air", [])),
+                                                          ('start', "loopback-session"), ('stop', None)]
+    assert all(call[2].startswith("ClientIO") for call in sensor_logger.calls)
+    assert list((tmp_path / "Data" / "cam" / "127.0.0.1").glob("*.mp4"))
+
+def test_failed_connect_releases_viewer_resources(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    closed = socket.socket()
+    closed.bind(('127.0.0.1', 0))
+    monkeypatch.setattr(cfg, 'STREAM_PORT', closed.getsockname()[1])  # 수신 대기하지 않는 포트
+    monkeypatch.setattr(cfg, 'FRAME_BUS_ENABLED', True)
+    monkeypatch.setattr(cfg, 'FRAME_BUS_SLOT_BYTES', 1024)
+    monkeypatch.setattr(cv2, 'waitKey', lambda delay: -1)  # 화면 없는 환경
+    client = MultiStreamClient(queue.Queue(), _SensorLogger(), decode_workers=1)
+    try:
+        asyncio.run(client._run_viewer("127.0.0.3"))
+    finally:
+        closed.close()
+    assert not client.viewers
+    # 연결에 실패한 뷰어의 공유 메모리도 삭제됨
+    with pytest.raises(FileNotFoundError):
+        FrameBusReader(bus_name("127.0.0.3"))
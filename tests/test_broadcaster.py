@@ -0,0 +1,301 @@
+import json
+import time
+import socket
+import selectors
+import cv2
+import numpy as np
+import pytest
+from protocol import (Frame, PROTOCOL_V2, V2_HEADER, FLAG_JPEG, FLAG_PREROLL, FLAG_CONTROL, FLAG_H264,
+                      FLAG_KEYFRAME, CODEC_H264, now_us, unpack_v2_header)
+from server.broadcaster import ClientConnection, FrameBroadcaster
+from server.preroll import PrerollBuffer
+
+@pytest.fixture
+def broadcaster():
+    server_socket = socket.socket()
+    server_socket.bind(('127.0.0.1', 0))
+    server_socket.listen()
+    broadcaster = FrameBroadcaster(server_socket, preroll=PrerollBuffer(10.0, 1 << 24))
+    yield broadcaster
+    broadcaster.close()
+    server_socket.close()
+
+def connect(broadcaster, tier='full', max_fps=None):
+    """소켓 쌍의 한쪽을 핸드셰이크를 마친 v2 클라이언트로 등록하고 (클라이언트, 수신 소켓) 반환"""
+    server_side, client_side = socket.socketpair()
+    server_side.setblocking(False)
+    client = ClientConnection(server_side, ('test', server_side.fileno()), broadcaster.queue_size, 0.0)
+    broadcaster.clients[server_side.fileno()] = client
+    broadcaster.selector.register(server_side, client.events, client)
+    client.subscribe(max_fps, tier)
+    broadcaster._complete_handshake(client, PROTOCOL_V2)
+    client_side.settimeout(1.0)
+    return client, client_side
+
+def recv_exact(sock, count):
+    data = b''
+    while len(data) < count:
+        chunk = sock.recv(count - len(data))
+        assert chunk
+        data += chunk
+    return data
+
+def recv_frame(sock):
+    """(플래그, 순번, 페이로드)"""
+    flags, length, sequence, capture_us = unpack_v2_header(recv_exact(sock, V2_HEADER.size))
+    return flags, sequence, recv_exact(sock, length)
+
+def width(data):
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR).shape[1]
+
+def publish(broadcaster, sequences):
+    for sequence in sequences:
+        broadcaster.publish(jpeg_frame(sequence))
+        broadcaster._dispatch()
+
+def recv_preroll(sock):
+    """preroll_end까지 받은 pre-roll 프레임 [(순번, 너비)]와 preroll_end 메시지"""
+    frames = []
+    while True:
+        flags, sequence, data = recv_frame(sock)
+        if flags & FLAG_CONTROL:
+            return frames, json.loads(data)
+        assert flags & FLAG_PREROLL
+        frames.append((sequence, width(data)))
+
+def jpeg_frame(sequence, width=320, height=240):
+    ok, encoded = cv2.imencode('.jpg', np.full((height, width, 3), 128, np.uint8))
+    return Frame(encoded.tobytes(), sequence, sequence * 33_333)
+
+def test_wants_decimates_to_max_fps():
+    client = ClientConnection(None, ('test', 0), 3, 0.0)
+    client.subscribe(max_fps=10)
+    # 30fps 캡처에 1ms 이내의 흔들림이 있어도 세 프레임에 한 번만 보냄
+    sent = [i for i in range(30) if client.wants(Frame(b'x', i, i * 33_333 + (i % 2) * 1000))]
+    assert sent == list(range(0, 30, 3))
+    assert client.skipped == 20
+
+def test_wants_resets_after_gap():
+    client = ClientConnection(None, ('test', 0), 3, 0.0)
+    client.subscribe(max_fps=10)
+    assert client.wants(Frame(b'x', 0, 0))
+    assert not client.wants(Frame(b'x', 1, 50_000))
+    # 캡처가 끊겼다가 재개되면 밀린 간격을 따라잡지 않고 새 기준으로 보냄
+    assert client.wants(Frame(b'x', 2, 5_000_000))
+    assert not client.wants(Frame(b'x', 3, 5_050_000))
+    assert client.wants(Frame(b'x', 4, 5_100_000))
+
+def test_wants_without_limit_sends_every_frame():
+    client = ClientConnection(None, ('test', 0), 3, 0.0)
+    client.subscribe(tier='unknown')
+    assert client.tier == 'full'
+    assert all(client.wants(Frame(b'x', i, i)) for i in range(10))
+
+def test_tier_frames_are_built_at_publish(broadcaster):
+    full, full_sock = connect(broadcaster)
+    half, half_sock = connect(broadcaster, tier='half')
+    assert broadcaster.tiers == {'half'}
+    frame = jpeg_frame(1)
+    broadcaster.publish(frame)
+    encoded = broadcaster.preview.encoded
+    assert encoded == 1  # 축소 프레임은 발행한 스레드에서 생성
+    broadcaster._dispatch()
+    assert broadcaster.preview.encoded == encoded  # 이벤트 루프는 인코딩하지 않음
+    assert recv_frame(full_sock)[1:] == (1, frame.data)
+    _, sequence, data = recv_frame(half_sock)
+    assert sequence == 1
+    assert cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR).shape == (120, 160, 3)
+
+def test_tier_subscribed_after_publish_starts_at_next_frame(broadcaster):
+    broadcaster.publish(jpeg_frame(1))
+    client, sock = connect(broadcaster, tier='quarter')
+    broadcaster.publish(jpeg_frame(2))
+    broadcaster._dispatch()
+    _, sequence, data = recv_frame(sock)
+    assert sequence == 2
+    assert cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR).shape == (60, 80, 3)
+    broadcaster._close_client(client)
+    assert broadcaster.tiers == frozenset()
+
+def test_preroll_burst_uses_client_tier_and_max_fps(broadcaster):
+    client, sock = connect(broadcaster, tier='half', max_fps=10)
+    publish(broadcaster, range(1, 31))  # 30fps 1초
+    live = [recv_frame(sock) for _ in range(10)]
+    assert [sequence for _, sequence, _ in live] == list(range(1, 31, 3))
+    broadcaster._send_preroll(client, {'cmd': 'preroll', 'since_us': 0})
+    frames, end = recv_preroll(sock)
+    # 라이브 프레임과 같이 축소 단계와 프레임레이트 구독을 적용
+    assert frames == [(sequence, 160) for sequence in range(1, 31, 3)]
+    assert end['cmd'] == 'preroll_end' and end['count'] == 10 and end['last_sequence'] == 30
+    publish(broadcaster, [31, 32, 33, 34])
+    # 라이브 프레임 간격은 버스트와 무관하게 이어짐 (28번 다음은 31번)
+    assert [recv_frame(sock)[1] for _ in range(2)] == [31, 34]
+
+def test_preroll_before_connection_is_encoded_off_the_event_loop(broadcaster):
+    publish(broadcaster, range(1, 6))
+    client, sock = connect(broadcaster, tier='quarter')
+    publish(broadcaster, [6])
+    assert recv_frame(sock)[1] == 6
+    broadcaster._send_preroll(client, {'cmd': 'preroll', 'since_us': 0})
+    assert not client.control  # 연결 이전 프레임의 축소본은 작업 스레드에서 생성
+    publish(broadcaster, [7])
+    assert recv_frame(sock)[1] == 7  # 인코딩하는 동안에도 라이브 프레임은 계속 전송
+    deadline = time.monotonic() + 5.0
+    while not broadcaster._bursts:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    broadcaster._drain_wakeup(broadcaster._wake_r, None)
+    frames, end = recv_preroll(sock)
+    # 작업 스레드가 인코딩하는 동안 발행된 7번도 버스트에 이어 붙임
+    assert frames == [(sequence, 80) for sequence in range(1, 8)]
+    assert end['last_sequence'] == 7
+
+def drain(broadcaster, client, sock):
+    """클라이언트 큐가 빌 때까지 수신하면서 전송을 재개하고 받은 바이트 반환"""
+    received = bytearray()
+    sock.setblocking(False)
+    deadline = time.monotonic() + 5.0
+    while client.has_pending:
+        assert time.monotonic() < deadline
+        try:
+            received += sock.recv(1 << 16)
+        except BlockingIOError:
+            pass
+        broadcaster._flush(client)
+    while True:
+        try:
+            chunk = sock.recv(1 << 16)
+        except BlockingIOError:
+            break
+        received += chunk
+    sock.settimeout(1.0)
+    return bytes(received)
+
+def split_frames(data, with_flags=False):
+    """수신한 바이트를 [(순번, 페이로드)] 또는 [(플래그, 순번, 페이로드)]로 분리"""
+    frames = []
+    while data:
+        flags, length, sequence, capture_us = unpack_v2_header(data[:V2_HEADER.size])
+        payload = data[V2_HEADER.size:V2_HEADER.size + length]
+        frames.append((flags, sequence, payload) if with_flags else (sequence, payload))
+        data = data[V2_HEADER.size + length:]
+    return frames
+
+def test_partial_send_resumes_where_it_stopped(broadcaster):
+    client, sock = connect(broadcaster)
+    payload = bytes(range(256)) * 4096  # 1MB, 소켓 버퍼보다 큼
+    broadcaster.publish(Frame(payload, 1, 33_333))
+    broadcaster._dispatch()
+    assert client.has_pending and client.frames_sent == 0
+    assert client.events & selectors.EVENT_WRITE  # 남은 바이트는 쓰기 가능 이벤트에서 이어서 전송
+    frames = split_frames(drain(broadcaster, client, sock))
+    assert frames == [(1, payload)]
+    assert client.frames_sent == 1
+    assert client.bytes_sent == V2_HEADER.size + len(payload)
+    assert client.events == selectors.EVENT_READ
+
+def test_slow_client_drops_oldest_queued_frames(broadcaster):
+    client, sock = connect(broadcaster)
+    payloads = {sequence: bytes([sequence]) * (1 << 20) for sequence in range(1, 11)}
+    for sequence, payload in payloads.items():
+        broadcaster.publish(Frame(payload, sequence, sequence * 33_333))
+        broadcaster._dispatch()
+    # 1번은 전송 중이고, 큐(3개)에는 가장 최근 프레임만 남음
+    assert client.dropped == 6
+    assert broadcaster.dropped_total == 6
+    frames = split_frames(drain(broadcaster, client, sock))
+    assert [sequence for sequence, _ in frames] == [1, 8, 9, 10]
+    assert all(data == payloads[sequence] for sequence, data in frames)
+
+def test_client_closed_by_peer_is_removed(broadcaster):
+    client, sock = connect(broadcaster, tier='half')
+    assert broadcaster.tiers == {'half'}
+    client.dropped = 2
+    sock.close()
+    broadcaster._on_client_event(client, selectors.EVENT_READ)
+    assert not broadcaster.clients
+    assert broadcaster.tiers == frozenset()
+    assert broadcaster.closed_dropped == 2
+    assert client.sock.fileno() == -1
+    assert not any(isinstance(key.data, ClientConnection) for key in broadcaster.selector.get_map().values())
+
+def test_send_failure_removes_only_that_client(broadcaster):
+    gone, gone_sock = connect(broadcaster)
+    alive, alive_sock = connect(broadcaster)
+    gone_sock.close()
+    frame = jpeg_frame(1)
+    broadcaster.publish(frame)
+    broadcaster._dispatch()
+    assert list(broadcaster.clients.values()) == [alive]
+    assert recv_frame(alive_sock)[1:] == (1, frame.data)
+
+def request_empty_preroll(broadcaster, client, sock, flags):
+    """큰 프레임 3개로 큐를 채운 뒤 보관 프레임이 없는 구간의 pre-roll을 요청하고 받은 프레임 반환"""
+    payloads = {sequence: bytes([sequence]) * (1 << 20) for sequence in (1, 2, 3)}
+    for sequence, payload in payloads.items():
+        frame_flags = flags | (FLAG_KEYFRAME if sequence == 1 and flags & FLAG_H264 else 0)
+        broadcaster.publish(Frame(payload, sequence, sequence * 33_333, frame_flags))
+        broadcaster._dispatch()
+    assert len(client.queue) == 2  # 1번은 전송 중
+    broadcaster._send_preroll(client, {'cmd': 'preroll', 'since_us': now_us() + 10**9})
+    assert len(client.queue) == 2 and client.dropped == 0
+    return payloads, split_frames(drain(broadcaster, client, sock), with_flags=True)
+
+def test_empty_preroll_keeps_queued_jpeg_frames(broadcaster):
+    client, sock = connect(broadcaster)
+    payloads, frames = request_empty_preroll(broadcaster, client, sock, FLAG_JPEG)
+    assert [(sequence, data) for flags, sequence, data in frames if not flags & FLAG_CONTROL] == \
+        list(payloads.items())
+    end = next(json.loads(data) for flags, _, data in frames if flags & FLAG_CONTROL)
+    # 대기 중이던 2번부터 라이브 프레임으로 기록
+    assert end['count'] == 0 and end['last_sequence'] == 1
+
+def test_empty_preroll_keeps_h264_references():
+    server_socket = socket.socket()
+    server_socket.bind(('127.0.0.1', 0))
+    server_socket.listen()
+    broadcaster = FrameBroadcaster(server_socket, codec=CODEC_H264)  # pre-roll 보관 안 함
+    try:
+        client, sock = connect(broadcaster)
+        payloads, frames = request_empty_preroll(broadcaster, client, sock, FLAG_H264)
+        assert not client.awaiting_keyframe
+        # 키프레임과 이를 참조하는 P 프레임이 빠짐없이 순서대로 도착
+        assert [(sequence, data) for flags, sequence, data in frames if not flags & FLAG_CONTROL] == \
+            list(payloads.items())
+        assert frames[0][0] & FLAG_KEYFRAME
+    finally:
+        broadcaster.close()
+        server_socket.close()
+
+def test_coalesced_h264_frame_drops_until_next_keyframe():
+    server_socket = socket.socket()
+    server_socket.bind(('127.0.0.1', 0))
+    server_socket.listen()
+    broadcaster = FrameBroadcaster(server_socket, codec=CODEC_H264)
+    try:
+        client, sock = connect(broadcaster)
+        maxlen = broadcaster._inbox.maxlen
+        # 이벤트 루프가 밀린 동안 키프레임이 수신함에서 밀려남
+        for sequence in range(1, maxlen + 3):
+            flags = FLAG_H264 | (FLAG_KEYFRAME if sequence in (1, maxlen + 2) else 0)
+            broadcaster.publish(Frame(b'au%d' % sequence, sequence, sequence * 33_333, flags))
+        broadcaster.publish(Frame(b'next', maxlen + 3, 0, FLAG_H264))
+        broadcaster._dispatch()
+        assert [recv_frame(sock)[1] for _ in range(2)] == [maxlen + 2, maxlen + 3]
+        assert [frame.sequence for frame in broadcaster._gop] == [maxlen + 2, maxlen + 3]
+        assert broadcaster.coalesced == maxlen + 1  # 밀려난 3개 (키프레임 포함) + 참조가 깨진 P 프레임
+        sock.setblocking(False)
+        with pytest.raises(BlockingIOError):
+            sock.recv(1)
+    finally:
+        broadcaster.close()
+        server_socket.close()
+
+def test_coalesced_jpeg_frame_does_not_stop_stream(broadcaster):
+    client, sock = connect(broadcaster)
+    maxlen = broadcaster._inbox.maxlen
+    for sequence in range(1, maxlen + 2):
+        broadcaster.publish(Frame(b'jpeg%d' % sequence, sequence, sequence * 33_333))
+    broadcaster._dispatch()
+    assert broadcaster.coalesced == 1
+    assert recv_frame(sock)[1] == 2
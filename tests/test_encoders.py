@@ -0,0 +1,42 @@
+import shutil
+import cv2
+import numpy as np
+import pytest
+from client.core.encoders import EncoderProcess, OpenCVEncoder, create_encoder, x264_command
+
+def test_x264_command_options():
+    command = x264_command('ffmpeg', 'out.mp4', 1920, 1080, 30.0, preset='fast', crf=20, threads=2)
+    assert command[command.index('-s') + 1] == '1920x1080'
+    assert command[command.index('-preset') + 1] == 'fast'
+    assert command[command.index('-crf') + 1] == '20'
+    assert command[command.index('-threads') + 1] == '2'
+    assert command[-1] == 'out.mp4'
+
+def test_missing_ffmpeg_falls_back_to_opencv(monkeypatch, tmp_path):
+    monkeypatch.setattr(shutil, 'which', lambda name: None)
+    encoder = create_encoder('ffmpeg', str(tmp_path / "seg"), 64, 48, 30.0, {'crf': 20})
+    assert isinstance(encoder, OpenCVEncoder)
+    encoder.release()
+
+def test_encoder_process_writes_segments(tmp_path):
+    process = EncoderProcess()
+    try:
+        for name in ("a", "b"):  # 파일을 나눠도 같은 프로세스 재사용
+            writer = process.open('opencv', str(tmp_path / name), 64, 48, 30.0)
+            for i in range(10):
+                writer.write(np.full((48, 64, 3), i * 20, np.uint8))
+            writer.release()
+    finally:
+        process.stop()
+    for name in ("a", "b"):
+        capture = cv2.VideoCapture(str(tmp_path / f"{name}.mp4"))
+        assert capture.get(cv2.CAP_PROP_FRAME_COUNT) == 10
+        capture.release()
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None, reason="ffmpeg not installed")
+def test_ffmpeg_encoder(tmp_path):
+    encoder = create_encoder('ffmpeg', str(tmp_path / "seg"), 64, 48, 30.0, {'preset': 'ultrafast'})
+    for _ in range(10):
+        encoder.write(np.zeros((48, 64, 3), np.uint8))
+    encoder.release()
+    assert cv2.VideoCapture(encoder.path).get(cv2.CAP_PROP_FRAME_COUNT) == 10
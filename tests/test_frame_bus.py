@@ -0,0 +1,89 @@
+import multiprocessing
+import uuid
+import numpy as np
+import pytest
+import config as cfg
+from client.core.frame_bus import FrameBus, FrameBusReader
+
+@pytest.fixture
+def bus():
+    bus = FrameBus(f"test_bus_{uuid.uuid4().hex[:8]}", slots=4, slot_bytes=48 * 64 * 3)
+    yield bus
+    bus.close()
+
+def frame(value, shape=(48, 64, 3)):
+    return np.full(shape, value % 256, np.uint8)
+
+def test_reader_receives_frames_in_order(bus):
+    reader = FrameBusReader(bus.name)
+    assert reader.read() is None
+    for i in range(1, 4):
+        bus.publish(frame(i), 100.0 + i)
+    for i in range(1, 4):
+        sequence, timestamp, received = reader.read()
+        assert sequence == i and timestamp == 100.0 + i
+        assert received.shape == (48, 64, 3) and (received == i).all()
+    assert reader.read() is None
+    reader.close()
+
+def test_slow_reader_skips_ahead(bus):
+    reader = FrameBusReader(bus.name)
+    for i in range(1, 11):
+        bus.publish(frame(i))
+    sequence, _, received = reader.read()
+    assert sequence == 8 and (received == 8).all()  # 슬롯 4개 중 다음에 덮어쓸 슬롯을 제외한 가장 오래된 프레임
+    assert reader.skipped == 7
+    assert reader.read(latest=True)[0] == 10
+    reader.close()
+
+def test_readers_have_independent_cursors(bus):
+    first, second = FrameBusReader(bus.name), FrameBusReader(bus.name)
+    bus.publish(frame(1))
+    bus.publish(frame(2, (24, 32, 3)))  # 슬롯보다 작은 프레임은 크기와 함께 게시
+    assert first.read()[0] == 1
+    assert second.read(latest=True)[2].shape == (24, 32, 3)
+    assert first.read()[0] == 2 and second.read() is None
+    assert bus.publish(frame(3, (96, 128, 3))) == 0 and bus.oversized == 1
+    first.close()
+    second.close()
+
+def _consume(name, count, results):
+    reader = FrameBusReader(name)
+    values = []
+    while len(values) < count:
+        result = reader.wait(timeout=5.0)
+        if result is None:
+            break
+        values.append(int(result[2][0, 0, 0]))
+    reader.close()
+    results.put(values)
+
+def test_reader_in_another_process(bus):
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_consume, args=(bus.name, 3, results))
+    process.start()
+    # 읽기 측이 연결한 뒤 게시된 프레임만 받으므로 연결될 때까지 계속 게시
+    sequence = 0
+    while process.is_alive() and sequence < 100000:
+        sequence = bus.publish(frame(sequence + 1))
+        process.join(timeout=0.01)
+    values = results.get(timeout=5.0)
+    process.join()
+    assert len(values) == 3 and values == sorted(values)
+
+def test_viewer_publishes_live_frames(monkeypatch):
+    monkeypatch.setattr(cfg, 'FRAME_BUS_ENABLED', True)
+    monkeypatch.setattr(cfg, 'FRAME_BUS_SLOT_BYTES', 48 * 64 * 3)
+    from client.core.stream_viewer import StreamViewer
+    viewer = StreamViewer(f"bus-{uuid.uuid4().hex[:8]}")
+    try:
+        reader = FrameBusReader(viewer.frame_bus.name)
+        viewer.source_width = 64
+        assert viewer.accept_frame(0, 1, None, b'')  # 표시 차례가 아니어도 버스용으로 디코딩
+        viewer.deliver(frame(7))
+        sequence, _, received = reader.read()
+        assert sequence == 1 and (received == 7).all()
+        reader.close()
+    finally:
+        viewer.frame_bus.close()
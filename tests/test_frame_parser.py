@@ -0,0 +1,123 @@
+"""MJPEGFrameParser test harness
+Usage:
+    python -m pytest tests/test_frame_parser.py
+
+녹화된 MJPEG 스트림(libcamera-vid -o sample.mjpeg)으로 검증하려면
+MJPEG_SAMPLE 환경 변수에 파일 경로를 지정합니다.
+"""
+import io
+import os
+import random
+import pytest
+from server.frame_parser import MJPEGFrameParser, SOI, EOI, jpeg_dimensions
+
+
+def make_frame(size: int, rng: random.Random) -> bytes:
+    """SOI/EOI 사이에 마커가 없는 임의 페이로드를 가진 가짜 JPEG 프레임 생성"""
+    body = bytes(rng.randrange(0, 0xFF) for _ in range(size))
+    return SOI + body + EOI
+
+
+def make_stream(count: int, seed: int = 0, garbage: bool = True):
+    """프레임 목록과 이를 이어 붙인 MJPEG 스트림 반환"""
+    rng = random.Random(seed)
+    frames = [make_frame(rng.randrange(10, 5000), rng) for _ in range(count)]
+    parts = []
+    for frame in frames:
+        if garbage:
+            # 프레임 사이에 0xFF 등 잡음 바이트 삽입
+            parts.append(bytes([0xFF]) * rng.randrange(0, 3))
+        parts.append(frame)
+    return frames, b"".join(parts)
+
+
+def feed_in_chunks(parser, stream: bytes, chunk_size: int):
+    out = []
+    for i in range(0, len(stream), chunk_size):
+        out.extend(parser.feed(stream[i:i + chunk_size]))
+    return out
+
+
+def read_all(parser, raw):
+    out = []
+    while True:
+        frames = parser.read_from(raw)
+        if frames is None:
+            return out
+        out.extend(frames)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 4096, 1 << 20])
+def test_frames_across_chunk_boundaries(chunk_size):
+    frames, stream = make_stream(50)
+    parser = MJPEGFrameParser()
+    assert feed_in_chunks(parser, stream, chunk_size) == frames
+    assert parser.buffered == 0
+
+
+def test_multiple_frames_in_single_read():
+    frames, stream = make_stream(20, seed=1, garbage=False)
+    parser = MJPEGFrameParser()
+    assert parser.feed(stream) == frames
+
+
+def test_partial_frame_is_kept_until_eoi():
+    frame = make_frame(100, random.Random(2))
+    parser = MJPEGFrameParser()
+    assert parser.feed(frame[:-1]) == []
+    assert parser.buffered == len(frame) - 1
+    assert parser.feed(frame[-1:]) == [frame]
+
+
+def test_leading_garbage_and_stray_eoi_are_skipped():
+    frame = make_frame(100, random.Random(3))
+    parser = MJPEGFrameParser()
+    assert parser.feed(b"\x00\x01" + EOI + b"\xff" + frame) == [frame]
+
+
+def test_buffer_grows_for_large_frames():
+    frame = make_frame(2 * 1024 * 1024, random.Random(4))
+    parser = MJPEGFrameParser(read_size=4096)
+    assert feed_in_chunks(parser, frame * 2, 65536) == [frame, frame]
+    assert parser.capacity >= len(frame)
+
+
+def test_resync_when_buffer_limit_exceeded():
+    rng = random.Random(5)
+    parser = MJPEGFrameParser(read_size=1024, max_buffer=512 * 1024)
+    unterminated = SOI + bytes(rng.randrange(0, 0xFF) for _ in range(600 * 1024))
+    frame = make_frame(100, rng)
+    out = feed_in_chunks(parser, unterminated + frame, 1024)
+    assert parser.resyncs >= 1
+    assert out == [frame]
+
+
+@pytest.mark.parametrize("read_size", [1, 5, 4096, 65536])
+def test_read_from_stream(read_size):
+    frames, stream = make_stream(30, seed=6)
+    parser = MJPEGFrameParser(read_size=read_size)
+    assert read_all(parser, io.BufferedReader(io.BytesIO(stream))) == frames
+    assert parser.bytes_in == len(stream)
+
+
+@pytest.mark.skipif(not os.environ.get("MJPEG_SAMPLE"), reason="MJPEG_SAMPLE not set")
+def test_recorded_sample():
+    with open(os.environ["MJPEG_SAMPLE"], "rb") as f:
+        stream = f.read()
+    expected = MJPEGFrameParser().feed(stream)
+    assert expected, "no frames found in sample"
+    for frame in expected:
+        assert frame.startswith(SOI) and frame.endswith(EOI)
+    for chunk_size in (1000, 4096, 65536):
+        assert feed_in_chunks(MJPEGFrameParser(), stream, chunk_size) == expected
+    with open(os.environ["MJPEG_SAMPLE"], "rb") as f:
+        assert read_all(MJPEGFrameParser(), f) == expected
+
+
+def test_jpeg_dimensions_from_sof():
+    cv2 = pytest.importorskip("cv2")
+    np = pytest.importorskip("numpy")
+    ok, jpeg = cv2.imencode('.jpg', np.zeros((48, 64, 3), np.uint8))
+    assert jpeg_dimensions(jpeg.tobytes()) == (64, 48)
+    assert jpeg_dimensions(SOI + b'\xff\xfe\x00\x04ab' + EOI) is None  # SOF 없음
+    assert jpeg_dimensions(jpeg.tobytes()[:20]) is None  # 잘린 헤더
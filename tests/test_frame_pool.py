@@ -0,0 +1,71 @@
+import cv2
+import numpy as np
+import pytest
+from client.core.frame_pool import FramePool
+from client.core.video_recorder import VideoRecorder
+from client.core import stream_viewer
+from client.core.stream_viewer import StreamViewer
+
+def test_released_buffers_are_reused():
+    pool = FramePool(size=2)
+    a = pool.acquire((4, 4, 3))
+    b = pool.acquire((4, 4, 3))
+    c = pool.acquire((4, 4, 3))
+    pool.release(a)
+    pool.release(b)
+    pool.release(c)  # 풀이 가득 차면 버림
+    assert pool.acquire((4, 4, 3)) is b
+    assert pool.acquire((4, 4, 3)) is a
+    assert pool.allocations == 3 and pool.reused == 2
+    pool.release(a)
+    assert pool.acquire((8, 8, 3)).shape == (8, 8, 3)  # 해상도 변경 시 새로 할당
+    assert pool.allocations == 4
+
+def test_only_pool_buffers_are_kept():
+    pool = FramePool(size=2)
+    pool.release(np.empty((4, 4, 3), np.uint8))  # cv2.imdecode 결과처럼 풀 밖에서 만든 프레임
+    assert pool.free == 0
+    buffer = pool.acquire((4, 4, 3))
+    pool.release(buffer.reshape(4, 4, 3)[:])  # 디코더가 돌려준 뷰도 원래 버퍼로 반환
+    assert pool.free == 1 and pool.acquire((4, 4, 3)) is buffer
+
+def test_double_release_keeps_one_copy():
+    pool = FramePool(size=4)
+    a = pool.acquire((4, 4, 3))
+    pool.release(a)
+    pool.release(a[1:])  # 같은 버퍼의 뷰로 다시 반환해도 무시
+    pool.release(a)
+    assert pool.free == 1
+    # 두 번째 acquire는 같은 버퍼를 다시 내주지 않음
+    assert pool.acquire((4, 4, 3)) is a
+    assert pool.acquire((4, 4, 3)) is not a
+    pool.release(a)
+    assert pool.free == 1
+
+def test_recorder_returns_frames_to_pool(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    recorder = VideoRecorder("test-pool")
+    recorder.encoder_process = False
+    recorder.queue_size = 1000
+    recorder.start_recording()
+    for i in range(100):
+        frame = recorder.frame_pool.acquire((48, 64, 3))
+        frame[:] = i
+        recorder.update_frame(frame, 1000.0 + i / 30)
+    recorder.stop_recording()
+    assert recorder.frame_pool.allocations + recorder.frame_pool.reused == 100
+    assert recorder.frames_copied == 0  # 같은 프로세스 인코더는 복사 없이 기록
+    recorder.update_frame(recorder.frame_pool.acquire((48, 64, 3)))  # 녹화 중이 아니면 바로 반환
+    assert recorder.frame_pool.free >= 1
+
+@pytest.mark.skipif(stream_viewer.simplejpeg is None, reason="simplejpeg not installed")
+def test_pooled_decode_reuses_buffer():
+    viewer = StreamViewer("test-pooled-decode")
+    ok, jpeg = cv2.imencode('.jpg', np.full((48, 64, 3), 128, np.uint8))
+    frame = viewer.decode(jpeg.tobytes(), 1, pooled=True)
+    assert frame.shape == (48, 64, 3)
+    viewer.recorder.frame_pool.release(frame)
+    again = viewer.decode(memoryview(jpeg.tobytes()), 1, pooled=True)
+    assert np.shares_memory(frame, again)
+    assert viewer.recorder.frame_pool.allocations == 1
+    assert viewer.frames_allocated == 0
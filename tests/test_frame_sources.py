@@ -0,0 +1,91 @@
+import sys
+import logging
+import cv2
+import numpy as np
+import pytest
+from server.frame_parser import MJPEGFrameParser, jpeg_dimensions
+from server.frame_sources import (FrameSource, FileReplaySource, LibcameraSource, SyntheticSource,
+                                  create_frame_source)
+
+def jpeg(width, height, value=128):
+    ok, encoded = cv2.imencode('.jpg', np.full((height, width, 3), value, np.uint8))
+    return encoded.tobytes()
+
+def test_frame_source_requires_read():
+    with pytest.raises(TypeError):
+        FrameSource()
+
+    class _Incomplete(FrameSource):
+        def start(self):
+            pass
+
+    with pytest.raises(TypeError):
+        _Incomplete()
+
+def test_replay_mjpeg_file(tmp_path):
+    frames = [jpeg(64, 48, value) for value in (0, 100, 200)]
+    path = tmp_path / "clip.mjpeg"
+    path.write_bytes(b"".join(frames))
+    source = FileReplaySource(str(path), fps=1000, loop=False)
+    source.start()
+    assert source.resolution == (64, 48)
+    assert source.target_fps == 1000
+    assert [source.read() for _ in range(3)] == [[frame] for frame in frames]
+    assert source.read() is None
+
+def test_replay_large_mjpeg_file_without_resync(tmp_path, caplog):
+    synthetic = SyntheticSource(frame_size=1024 * 1024, fps=1000)
+    synthetic.start()
+    frames = [synthetic.read()[0] for _ in range(9)]
+    path = tmp_path / "large.mjpeg"
+    path.write_bytes(b"".join(frames))  # 파서 버퍼 한도(8MB)보다 큰 파일
+    source = FileReplaySource(str(path), fps=1000, loop=False)
+    with caplog.at_level(logging.WARNING):
+        source.start()
+    assert source._frames == frames
+    assert not caplog.records
+
+def test_libcamera_stop_closes_pipes():
+    source = LibcameraSource(f'{sys.executable} -c "import time; time.sleep(30)"')
+    source.start()
+    process = source.process
+    source.stop()
+    assert process.returncode is not None
+    assert process.stdout.closed and process.stderr.closed
+    source.stop()  # 이미 정지한 소스는 그대로 둠
+
+def test_replay_directory_loops_at_timestamp_intervals(tmp_path):
+    frames = [jpeg(32, 24, value) for value in (0, 100, 200)]
+    for stamp, frame in zip((1700000000000, 1700000000040, 1700000000100), frames):
+        (tmp_path / f"{stamp}.jpg").write_bytes(frame)
+    source = FileReplaySource(str(tmp_path))
+    source.start()
+    # 파일명의 밀리초 타임스탬프 간격, 마지막 프레임 뒤에는 평균 간격
+    assert source._intervals == pytest.approx([0.04, 0.06, 0.05])
+    source._intervals = [0.0] * 3
+    assert [source.read()[0] for _ in range(4)] == frames + frames[:1]
+
+def test_replay_without_frames_fails(tmp_path):
+    with pytest.raises(ValueError):
+        FileReplaySource(str(tmp_path)).start()
+
+def test_synthetic_frames_are_decodable_and_sized():
+    source = SyntheticSource(frame_size=200 * 1024, fps=1000)
+    source.start()
+    first, second = source.read()[0], source.read()[0]
+    assert abs(len(first) - 200 * 1024) <= 64
+    assert first != second  # 프레임 번호가 COM 세그먼트에 들어감
+    assert MJPEGFrameParser().feed(first + second) == [first, second]
+    assert cv2.imdecode(np.frombuffer(first, np.uint8), cv2.IMREAD_COLOR).shape == (8, 8, 3)
+    assert source.resolution == jpeg_dimensions(first) == (8, 8)
+    assert source.target_fps == 1000
+
+def test_create_frame_source():
+    source = create_frame_source('synthetic', frame_size=1024, fps=5)
+    assert isinstance(source, SyntheticSource) and source.fps == 5
+    assert isinstance(create_frame_source('replay', path='clip.mjpeg'), FileReplaySource)
+    libcamera = create_frame_source('libcamera', command='libcamera-vid --width 1280 --height 720 --framerate 30')
+    assert isinstance(libcamera, LibcameraSource)
+    assert libcamera.resolution == (1280, 720) and libcamera.target_fps == 30
+    with pytest.raises(ValueError):
+        create_frame_source('webcam')
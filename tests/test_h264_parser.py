@@ -0,0 +1,64 @@
+"""H264AccessUnitParser tests
+Usage:
+    python -m pytest tests/test_h264_parser.py
+"""
+import pytest
+from server.h264_parser import H264AccessUnitParser, AU_START_CODE
+
+SPS = b'\x67\x42\xc0\x28\xda\x01\xe0'
+PPS = b'\x68\xce\x3c\x80'
+AUD = b'\x09\xf0'
+
+
+def idr(n: int) -> bytes:
+    return b'\x65\x88' + bytes([n % 200 + 1]) * 300
+
+
+def p_slice(n: int) -> bytes:
+    return b'\x41\x9a' + bytes([n % 200 + 1]) * 100
+
+
+def annexb(nals, long_start=True) -> bytes:
+    start = AU_START_CODE if long_start else b'\x00\x00\x01'
+    return b"".join(start + nal for nal in nals)
+
+
+def make_gop(index: int, with_config: bool = True):
+    """[SPS, PPS,] IDR + P 슬라이스 4개로 이루어진 GOP의 액세스 유닛 목록"""
+    units = [([SPS, PPS] if with_config else []) + [idr(index)]]
+    units += [[p_slice(index * 10 + i)] for i in range(4)]
+    return units
+
+
+def parse(stream: bytes, chunk_size: int):
+    parser = H264AccessUnitParser()
+    out = []
+    for i in range(0, len(stream), chunk_size):
+        out.extend(parser.feed(stream[i:i + chunk_size]))
+    out.extend(parser.flush())
+    return parser, out
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 64, 1 << 16])
+def test_access_units_across_chunk_boundaries(chunk_size):
+    units = make_gop(0) + make_gop(1)
+    stream = b"".join(annexb(u) for u in units)
+    parser, out = parse(stream, chunk_size)
+    assert out == [annexb(u) for u in units]
+    assert [u.keyframe for u in out] == [True, False, False, False, False] * 2
+    assert parser.sps == SPS and parser.pps == PPS
+
+
+def test_short_start_codes_and_aud():
+    units = [[AUD, SPS, PPS, idr(0)], [AUD, p_slice(1)]]
+    stream = b"".join(annexb(u, long_start=False) for u in units)
+    _, out = parse(stream, 7)
+    assert out == [annexb(u) for u in units]
+
+
+def test_cached_config_is_prepended_to_idr_without_sps():
+    units = make_gop(0) + make_gop(1, with_config=False)
+    stream = b"".join(annexb(u) for u in units)
+    _, out = parse(stream, 4096)
+    assert out[5] == annexb([SPS, PPS, idr(1)])
+    assert out[5].keyframe
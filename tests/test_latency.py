@@ -0,0 +1,63 @@
+import dis
+import json
+import inspect
+import textwrap
+import cv2
+import numpy as np
+from client.core.latency import (LatencyHistogram, PipelineLatency, bucket_bounds, bucket_index,
+                                 format_export, pipeline_latency)
+from client.core.stream_viewer import StreamViewer
+
+def test_buckets_contain_values():
+    for ns in list(range(100)) + [999, 1000, 65535, 65536, 33_000_000, 10**12]:
+        low, high = bucket_bounds(bucket_index(ns))
+        assert low <= ns < high
+        assert (high - low) <= max(1, low // 8)  # 상대 오차 1/8 이내
+
+def test_percentiles_within_bucket_error():
+    histogram = LatencyHistogram()
+    values = [i * 10_000 for i in range(1, 1001)]  # 10us ~ 10ms
+    for ns in values:
+        histogram.record(ns)
+    p50, p95, p99 = LatencyHistogram.percentiles(histogram.counts)
+    for estimate, exact in ((p50, values[499]), (p95, values[949]), (p99, values[989])):
+        assert abs(estimate - exact) <= exact / 8
+    assert histogram.max == values[-1] and histogram.count == 1000
+
+def test_interval_summary_covers_only_new_values():
+    latency = PipelineLatency("test-interval")
+    for _ in range(10):
+        latency.record('decode', 2_000_000)
+    assert latency.interval_summary()['decode']['count'] == 10
+    latency.record('decode', 8_000_000)
+    summary = latency.interval_summary()
+    assert summary['decode']['count'] == 1 and 7.0 < summary['decode']['p50_ms'] < 9.0
+    assert summary['encode'] == {'count': 0}
+    assert latency.summary()['decode']['count'] == 11
+
+def test_dump_and_format(tmp_path):
+    latency = PipelineLatency("test-dump")
+    latency.record('receive', 500_000)
+    latency.record('receive', 1_500_000)
+    with open(latency.dump(str(tmp_path))) as f:
+        data = json.load(f)
+    receive = data['stages']['receive']
+    assert receive['count'] == 2 and sum(bucket[2] for bucket in receive['buckets']) == 2
+    assert receive['max_ms'] == 1.5
+    assert "receive" in format_export(data) and "display" not in format_export(data)
+
+def test_viewer_decode_is_recorded():
+    viewer = StreamViewer("test-latency")
+    assert viewer.latency is pipeline_latency("test-latency") is viewer.recorder.latency
+    ok, jpeg = cv2.imencode('.jpg', np.zeros((64, 64, 3), np.uint8))
+    viewer.decode(jpeg.tobytes())
+    assert viewer.latency.stages['decode'].count == 1
+    assert pipeline_latency("test-latency", enabled=False) is None
+
+def test_probes_are_compiled_out_with_optimize():
+    source = textwrap.dedent(inspect.getsource(StreamViewer.process_frame))
+    def names(optimize):
+        code = compile(source, "<process_frame>", "exec", optimize=optimize).co_consts[0]
+        return {instruction.argval for instruction in dis.get_instructions(code)}
+    assert 'perf_counter_ns' in names(0)
+    assert 'perf_counter_ns' not in names(1) and 'record' not in names(1)  # python -O: 계측 코드 제거
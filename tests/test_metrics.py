@@ -0,0 +1,44 @@
+import json
+from server.metrics import MetricsRegistry, PipelineStats
+
+def _registry():
+    registry = MetricsRegistry(prefix="test")
+    registry.register(lambda: [
+        ('frames_total', 'counter', "Frames", {}, 10),
+        ('client_queue_depth', 'gauge', "Queue depth", {'client': 'a:1'}, 2),
+        ('client_queue_depth', 'gauge', "Queue depth", {'client': 'b:2'}, 0),
+    ])
+    return registry
+
+def test_prometheus_text_has_single_help_per_metric():
+    text = _registry().render_prometheus()
+    assert text.count("# HELP test_client_queue_depth") == 1
+    assert "test_frames_total 10" in text
+    assert 'test_client_queue_depth{client="b:2"} 0' in text
+
+def test_snapshot_groups_labelled_values():
+    snapshot = json.loads(json.dumps(_registry().snapshot()))
+    assert snapshot['frames_total'] == 10
+    assert snapshot['client_queue_depth'] == {'a:1': 2, 'b:2': 0}
+
+def test_failing_collector_does_not_break_others():
+    registry = _registry()
+    registry.register(lambda: 1 / 0)
+    assert "test_frames_total 10" in registry.render_prometheus()
+
+def test_pipeline_stats_counts_frames_and_bytes():
+    stats = PipelineStats()
+    stats.record(2, 300)
+    stats.record(1, 100)
+    assert (stats.frames_in, stats.bytes_in) == (3, 400)
+
+def test_summary_exports_sum_and_count():
+    registry = MetricsRegistry(prefix="test")
+    registry.register(lambda: [
+        ('send_latency_seconds', 'summary', "Latency", {'client': 'a:1'}, (0.25, 10)),
+    ])
+    text = registry.render_prometheus()
+    assert "# TYPE test_send_latency_seconds summary" in text
+    assert 'test_send_latency_seconds_sum{client="a:1"} 0.25' in text
+    assert 'test_send_latency_seconds_count{client="a:1"} 10' in text
+    assert registry.snapshot()['send_latency_seconds'] == {'a:1': {'sum': 0.25, 'count': 10}}
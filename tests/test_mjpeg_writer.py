@@ -0,0 +1,24 @@
+import os
+from client.core.mjpeg_writer import MJPEGSegmentWriter, read_mjpeg_segment
+
+JPEG = b'\xff\xd8' + b'\x00' * 100 + b'\xff\xd9'
+
+def test_round_trip_with_index(tmp_path):
+    writer = MJPEGSegmentWriter(str(tmp_path / "seg"))
+    writer.write(JPEG, timestamp=1.5, sequence=7)
+    writer.write(memoryview(JPEG + b'\x01'), timestamp=1.6, sequence=8)
+    writer.release()
+    path = writer.rename(str(tmp_path / "renamed"))
+    assert os.path.exists(str(tmp_path / "renamed.idx"))
+    frames = list(read_mjpeg_segment(path))
+    assert frames == [(1500, 7, JPEG), (1600, 8, JPEG + b'\x01')]
+
+def test_truncated_segment_without_index(tmp_path):
+    writer = MJPEGSegmentWriter(str(tmp_path / "seg"))
+    writer.write(JPEG)
+    writer.write(JPEG)
+    writer.release()
+    os.remove(writer.index_path)
+    with open(writer.path, "r+b") as f:
+        f.truncate(writer.bytes_written - 10)  # 기록 중 종료된 경우
+    assert [data for _, _, data in read_mjpeg_segment(writer.path)] == [JPEG]
@@ -0,0 +1,84 @@
+import json
+import threading
+import config as cfg
+from server import mqtt_manager
+from server.metrics import MetricsRegistry
+from server.stream_server import register_stream_metrics
+from server.frame_sources import SyntheticSource
+
+class _Client:
+    def __init__(self):
+        self.published = []
+        self.will = None
+        self.disconnects = 0
+
+    def publish(self, topic, payload, *args, **kwargs):
+        self.published.append((topic, payload))
+
+    def will_set(self, topic, payload, *args, **kwargs):
+        self.will = (topic, json.loads(payload))
+
+    def disconnect(self):
+        self.disconnects += 1
+
+class _Supervisor:
+    def __init__(self, source):
+        self.source = source
+        self.stats = type('Stats', (), {'frames_in': 0, 'bytes_in': 0, 'fps': 29.7})()
+        self.is_capturing = True
+        self.restarts = self.stalls = 0
+        self.time_to_first_frame = None
+
+def test_descriptor_uses_polled_source_stats(monkeypatch):
+    registry = MetricsRegistry()
+    register_stream_metrics(registry, _Supervisor(SyntheticSource(fps=15.0)), None)
+    snapshot = json.dumps({name: value for name, value in registry.snapshot().items() if name != 'timestamp'})
+    monkeypatch.setattr(mqtt_manager, 'fetch_stats', lambda: snapshot.encode())
+    monkeypatch.setattr(mqtt_manager, '_stats_cache', {'stats': None})
+    monkeypatch.setattr(cfg, 'STATS_PUBLISH_INTERVAL', 1e-9)
+    client, stop_event = _Client(), threading.Event()
+    stop_event.set()  # 한 번만 조회
+    mqtt_manager.poll_stats(client, stop_event)
+    assert len(client.published) == 1
+
+    # 탐색 응답은 MQTT 콜백에서 지표를 조회하지 않고 마지막 조회 값을 사용
+    def blocking_fetch():
+        raise AssertionError("build_descriptor must not fetch stats")
+    monkeypatch.setattr(mqtt_manager, 'fetch_stats', blocking_fetch)
+    descriptor = mqtt_manager.build_descriptor()
+    assert descriptor['resolution'] == [8, 8]  # 실행 중인 합성 소스 기준 (libcamera 명령어가 아님)
+    assert descriptor['fps'] == 29.7
+
+def test_descriptor_without_stats(monkeypatch):
+    monkeypatch.setattr(mqtt_manager, '_stats_cache', {'stats': None})
+    descriptor = mqtt_manager.build_descriptor()
+    assert descriptor['resolution'] is None and descriptor['fps'] is None and descriptor['viewers'] is None
+
+def test_presence_moves_with_ip_change(monkeypatch):
+    monkeypatch.setattr(mqtt_manager, '_presence', {'topic': None, 'stale': set(), 'reconnect': False})
+    monkeypatch.setattr(mqtt_manager, 'responder', mqtt_manager.DiscoveryResponder())
+    monkeypatch.setattr(mqtt_manager, '_stats_cache', {'stats': None})
+    ip = {'value': '10.0.0.1'}
+    monkeypatch.setattr(mqtt_manager, 'get_ip_address', lambda: ip['value'])
+    client = _Client()
+    mqtt_manager.set_last_will(client)
+    mqtt_manager.refresh_presence(client)
+    assert client.will == (f"{cfg.MQTT_TOPIC_PRESENCE}/10.0.0.1", {'ip': '10.0.0.1', 'status': 'offline'})
+    assert [topic for topic, _ in client.published] == [f"{cfg.MQTT_TOPIC_PRESENCE}/10.0.0.1"]
+
+    ip['value'] = '10.0.0.2'
+    client.published.clear()
+    mqtt_manager.refresh_presence(client)
+    # LWT를 새 토픽으로 옮기고 다시 연결하도록 연결을 끊음
+    assert client.will == (f"{cfg.MQTT_TOPIC_PRESENCE}/10.0.0.2", {'ip': '10.0.0.2', 'status': 'offline'})
+    assert client.disconnects == 1 and mqtt_manager._presence['reconnect']
+    assert not client.published
+
+    # 재연결 후 on_connect: 이전 토픽의 retained presence를 지우고 새 토픽에 발행
+    mqtt_manager.publish_presence(client)
+    assert client.published[0] == (f"{cfg.MQTT_TOPIC_PRESENCE}/10.0.0.1", b'')
+    topic, payload = client.published[1]
+    assert topic == f"{cfg.MQTT_TOPIC_PRESENCE}/10.0.0.2"
+    assert json.loads(payload)['status'] == 'online' and json.loads(payload)['ip'] == '10.0.0.2'
+    mqtt_manager.publish_presence(client)
+    assert [topic for topic, _ in client.published[2:]] == [f"{cfg.MQTT_TOPIC_PRESENCE}/10.0.0.2"]
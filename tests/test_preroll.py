@@ -0,0 +1,66 @@
+from protocol import Frame, FLAG_H264, FLAG_KEYFRAME
+from server.preroll import PrerollBuffer
+
+def frame(sequence, capture_us, size=100, flags=0):
+    return Frame(bytes(size), sequence, capture_us, flags)
+
+def test_old_frames_are_evicted_by_age():
+    buffer = PrerollBuffer(max_seconds=1.0, max_bytes=1 << 20)
+    for i in range(30):
+        buffer.append(frame(i, i * 100_000))  # 10fps, 3초
+    assert [f.sequence for f in buffer.frames_since(0)] == list(range(19, 30))
+    assert buffer.duration == 1.0 and buffer.evicted == 19
+    assert buffer.total_bytes == 11 * 100
+
+def test_old_frames_are_evicted_by_size():
+    buffer = PrerollBuffer(max_seconds=60.0, max_bytes=450)
+    for i in range(10):
+        buffer.append(frame(i, i * 1000))
+    assert [f.sequence for f in buffer.frames_since(0)] == [6, 7, 8, 9]
+    assert buffer.total_bytes == 400
+
+def test_tier_frames_count_toward_size():
+    buffer = PrerollBuffer(max_seconds=60.0, max_bytes=400)
+    for i in range(4):
+        full = frame(i, i * 1000)
+        buffer.append(full, {'full': full, 'half': frame(i, i * 1000, size=50)})
+    entries = buffer.entries_since(0)
+    assert [f.sequence for f, _ in entries] == [2, 3]
+    assert buffer.total_bytes == 300 and len(entries[0][1]['half'].data) == 50
+
+def test_largest_frame_is_kept_alone():
+    buffer = PrerollBuffer(max_seconds=60.0, max_bytes=150)
+    buffer.append(frame(0, 0))
+    buffer.append(frame(1, 1000, size=500))
+    assert [f.sequence for f in buffer.frames_since(0)] == [1]
+
+def test_disabled_buffer_keeps_nothing():
+    buffer = PrerollBuffer(max_seconds=0, max_bytes=1 << 20)
+    buffer.append(frame(0, 0))
+    assert len(buffer) == 0 and buffer.frames_since(0) == []
+
+def test_frames_since_starts_at_requested_time():
+    buffer = PrerollBuffer(max_seconds=60.0, max_bytes=1 << 20)
+    for i in range(10):
+        buffer.append(frame(i, i * 1000))
+    assert [f.sequence for f in buffer.frames_since(4500)] == [5, 6, 7, 8, 9]
+    assert buffer.frames_since(10_000) == []
+
+def test_h264_backtracks_to_keyframe():
+    buffer = PrerollBuffer(max_seconds=60.0, max_bytes=1 << 20)
+    for i in range(12):
+        flags = FLAG_H264 | (FLAG_KEYFRAME if i % 5 == 0 else 0)  # 0, 5, 10번이 키프레임
+        buffer.append(frame(i, i * 1000, flags=flags))
+    assert buffer.frames_since(7000)[0].sequence == 5
+    assert buffer.frames_since(5000)[0].sequence == 5
+    assert [f.sequence for f in buffer.frames_since(10_500)] == [10, 11]
+
+def test_h264_without_earlier_keyframe_starts_at_next_keyframe():
+    buffer = PrerollBuffer(max_seconds=60.0, max_bytes=1 << 20)
+    for i in range(1, 8):
+        flags = FLAG_H264 | (FLAG_KEYFRAME if i == 6 else 0)
+        buffer.append(frame(i, i * 1000, flags=flags))
+    assert [f.sequence for f in buffer.frames_since(2000)] == [6, 7]
+    buffer.clear()
+    buffer.append(frame(8, 8000, flags=FLAG_H264))
+    assert buffer.frames_since(0) == [] and buffer.total_bytes == 100
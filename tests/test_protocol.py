@@ -0,0 +1,67 @@
+import json
+import pytest
+from protocol import (Frame, ProtocolError, PROTOCOL_V1, PROTOCOL_V2, FRAME_MAGIC, V1_HEADER, V2_HEADER,
+                      HELLO_HEADER, FLAG_JPEG, FLAG_H264, FLAG_KEYFRAME, FLAG_PREROLL, FLAG_CONTROL,
+                      pack_v1_header, pack_v2_header, unpack_v2_header, control_frame, pack_hello,
+                      try_unpack_hello, negotiate_version, now_us)
+
+def test_v2_header_round_trip():
+    frame = Frame(b'x' * 1234, 2**40 + 7, 2**50 + 3, FLAG_H264 | FLAG_KEYFRAME)
+    header = pack_v2_header(frame, FLAG_PREROLL)
+    assert len(header) == V2_HEADER.size
+    assert header[:2] == FRAME_MAGIC
+    assert unpack_v2_header(header) == (FLAG_H264 | FLAG_KEYFRAME | FLAG_PREROLL, 1234, 2**40 + 7, 2**50 + 3)
+    assert frame.flags == FLAG_H264 | FLAG_KEYFRAME  # 추가 플래그는 헤더에만 설정
+
+def test_v1_header_is_payload_length():
+    assert V1_HEADER.unpack(pack_v1_header(Frame(b'abc'))) == (3,)
+
+def test_v2_header_rejects_bad_magic_and_version():
+    header = pack_v2_header(Frame(b'abc', 1, 2))
+    with pytest.raises(ProtocolError):
+        unpack_v2_header(b'\x00\x00' + header[2:])
+    with pytest.raises(ProtocolError):
+        unpack_v2_header(header[:2] + bytes([PROTOCOL_V1]) + header[3:])
+
+def test_control_frame_carries_json():
+    before = now_us()
+    frame = control_frame({'cmd': 'preroll_end', 'count': 3})
+    assert frame.flags == FLAG_CONTROL and not frame.flags & FLAG_JPEG
+    assert json.loads(frame.data) == {'cmd': 'preroll_end', 'count': 3}
+    assert frame.sequence == 0 and frame.capture_us >= before
+    flags, length, _, _ = unpack_v2_header(pack_v2_header(frame))
+    assert flags == FLAG_CONTROL and length == len(frame.data)
+
+def test_hello_round_trip_with_trailing_data():
+    message = {'versions': [1, 2], 'tier': 'half', 'max_fps': 10}
+    data = pack_hello(message)
+    assert try_unpack_hello(bytearray(data + b'next')) == (message, len(data))
+
+def test_hello_partial_input_waits_for_more():
+    data = pack_hello({'versions': [2]})
+    # 매직 일부, 헤더 일부, 본문 일부 모두 아직 부족한 것으로 판단
+    for end in range(len(data)):
+        assert try_unpack_hello(data[:end]) is None
+    assert try_unpack_hello(data) == ({'versions': [2]}, len(data))
+
+def test_hello_rejects_malformed_input():
+    with pytest.raises(ProtocolError):
+        try_unpack_hello(b'GE')  # 매직 일부만 받았어도 틀리면 바로 거부
+    with pytest.raises(ProtocolError):
+        try_unpack_hello(b'GET / HTTP/1.1\r\n')
+    body = b'{not json'
+    with pytest.raises(ProtocolError):
+        try_unpack_hello(HELLO_HEADER.pack(b'CAMS', len(body)) + body)
+    body = b'[1, 2]'
+    with pytest.raises(ProtocolError):
+        try_unpack_hello(HELLO_HEADER.pack(b'CAMS', len(body)) + body)
+
+def test_negotiate_version():
+    assert negotiate_version([1, 2]) == PROTOCOL_V2
+    assert negotiate_version([2, 3]) == PROTOCOL_V2
+    assert negotiate_version(2) == PROTOCOL_V2
+    assert negotiate_version([1]) == PROTOCOL_V1
+    # 공통 버전이 없거나 값이 없으면 v1로 처리
+    assert negotiate_version([3, 4]) == PROTOCOL_V1
+    assert negotiate_version([]) == PROTOCOL_V1
+    assert negotiate_version(None) == PROTOCOL_V1
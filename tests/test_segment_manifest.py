@@ -0,0 +1,20 @@
+from client.core.segment_manifest import SegmentManifest
+
+def test_find_overlapping_segments(tmp_path):
+    manifest = SegmentManifest(str(tmp_path))
+    manifest.append(1000, 1999, 30, 100, str(tmp_path / "1000-1999.mp4"))
+    manifest.append(2000, 2999, 30, 100, str(tmp_path / "2000-2999.mp4"))
+    manifest.append(5000, 5999, 30, 100, str(tmp_path / "5000-5999.mp4"))
+    assert [e[0] for e in manifest.find(1500, 2500)] == [1000, 2000]
+    assert [e[0] for e in manifest.find(3000, 4000)] == []
+    assert manifest.find(5999, 9000)[0][4] == "5000-5999.mp4"
+
+def test_reload_from_disk_and_skip_truncated_line(tmp_path):
+    manifest = SegmentManifest(str(tmp_path))
+    manifest.append(2000, 2999, 30, 100, str(tmp_path / "b.mp4"))
+    manifest.append(1000, 2500, 45, 100, str(tmp_path / "a.mp4"))  # pre-roll로 앞 구간과 겹친 파일
+    with open(manifest.path, "a") as f:
+        f.write("3000,39")
+    reloaded = SegmentManifest(str(tmp_path))
+    assert [e[4] for e in reloaded.entries] == ["a.mp4", "b.mp4"]
+    assert [e[4] for e in reloaded.find(2600, 2700)] == ["b.mp4"]
@@ -0,0 +1,85 @@
+import csv
+import os
+import json
+import queue
+import time
+import threading
+import pytest
+import config as cfg
+from types import SimpleNamespace
+from client.core.sensor_ingest import SensorBatcher, SensorIngestStats, queue_depth
+from client.core.sensor_logger import SensorDataLogger
+from client.core.mqtt_listener import MQTTListener
+
+def message(topic, payload):
+    return SimpleNamespace(topic=topic, payload=payload.encode())
+
+def drain(q):
+    items = []
+    while not q.empty():
+        items.append(q.get_nowait())
+    return items
+
+def test_batch_by_count_and_delay():
+    q = queue.Queue()
+    batcher = SensorBatcher(q, max_rows=3, max_delay=0.05)
+    for i in range(4):
+        batcher.add("sensor/air", {'mp905': i}, 1000 + i)
+    [(kind, (_, rows))] = drain(q)
+    assert kind == "sensor_batch"
+    assert rows == [("sensor/air", 1000 + i, {'mp905': i}) for i in range(3)]
+
+    # 남은 1행은 max_delay가 지나면 타이머 스레드가 전송
+    thread = threading.Thread(target=batcher.run, daemon=True)
+    thread.start()
+    _, (_, rows) = q.get(timeout=1.0)
+    assert rows == [("sensor/air", 1003, {'mp905': 3})]
+    batcher.stop()
+    thread.join(timeout=1.0)
+    assert batcher.rows_sent == 4 and batcher.batches_sent == 2
+    assert queue_depth(q) == 0
+
+def test_listener_parses_once_and_flushes_before_command(monkeypatch):
+    monkeypatch.setattr(cfg, 'SENSOR_BATCH_ROWS', 100)
+    q = queue.Queue()
+    listener = MQTTListener(q)
+    listener.on_message(None, None, message("sensor/air", json.dumps({'id': 7, 'mp905': 1.5})))
+    listener.on_message(None, None, message("sensor/air", "not json"))
+    assert q.empty()  # 묶음이 차기 전에는 큐로 보내지 않음
+
+    listener.on_message(None, None, message(cfg.MQTT_TOPIC_COMMAND, "start"))
+    batch, command = drain(q)
+    assert batch[0] == "sensor_batch"
+    [(topic, _, data)] = batch[1][1]
+    assert topic == "sensor/air" and data == {'mp905': 1.5}  # id 제거, 잘못된 JSON은 버림
+    assert command == ("recording_start", listener.session_id)
+
+@pytest.fixture
+def logger(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(cfg, 'SENSOR_PRETRIGGER_SECONDS', 0)
+    return SensorDataLogger()
+
+def test_save_batch_keeps_receive_timestamps(logger):
+    logger.start_recording("20260101_000000.000")
+    rows = [("sensor/air", 1000 + i, {'mp905': i}) for i in range(5)]
+    logger.save_batch((time.time(), rows), depth=3)
+    assert logger.store.latest("sensor/air")['timestamp'] == 1004
+    logger.stop_recording()
+
+    directory = os.path.join("Data", "sensors", "air")
+    [name] = os.listdir(directory)
+    with open(os.path.join(directory, name), newline="") as f:
+        recorded = list(csv.reader(f))[1:]
+    assert [row[0] for row in recorded] == [str(1000 + i) for i in range(5)]
+    assert logger.ingest.rows == 5 and logger.ingest.batches == 1
+    assert logger.ingest.max_queue_depth == 3
+
+def test_stats_lag_and_periodic_log(caplog):
+    stats = SensorIngestStats(interval=0.0)
+    now = time.time()
+    with caplog.at_level("INFO"):
+        stats.record(now, [("sensor/air", int((now - 0.5) * 1000), {})], depth=None)
+    assert 0.4 < stats.last_lag < 1.0
+    assert stats.max_queue_depth == 0
+    assert "Ingest stats" in caplog.text and "QueueDepth" not in caplog.text
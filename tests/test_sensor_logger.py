@@ -0,0 +1,94 @@
+import csv
+import os
+import time
+import pytest
+import config as cfg
+from client.core import sensor_writer
+from client.core.sensor_logger import SensorDataLogger
+
+@pytest.fixture
+def logger(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(cfg, 'SENSOR_FLUSH_ROWS', 10)
+    monkeypatch.setattr(cfg, 'SENSOR_FLUSH_SECONDS', 60.0)
+    return SensorDataLogger()
+
+def recorded_files(topic):
+    directory = os.path.join("Data", "sensors", topic)
+    return [os.path.join(directory, name) for name in os.listdir(directory) if not name.startswith("temp_")]
+
+def test_rows_are_buffered_and_flushed_on_stop(logger):
+    logger.start_recording()
+    for i in range(25):
+        logger.save_sensor_data("sensor/air", {'mp905': i, 'sgp30': 0.5})
+    writer = logger.active_recordings["sensor/air"][1]
+    assert writer.rows_written == 20 and writer.flushes == 2  # 10행마다 기록, 5행은 메모리에 대기
+    logger.stop_recording()
+
+    [path] = recorded_files("air")
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == logger.columns
+    assert len(rows) == 26
+    assert rows[-1][1] == "24" and rows[-1][2] == ""  # 없는 센서 값은 빈 칸
+    assert logger.active_recordings == {}
+
+def test_flush_by_time(logger, monkeypatch):
+    monkeypatch.setattr(cfg, 'SENSOR_FLUSH_SECONDS', 0.0)
+    logger.start_recording()
+    logger.save_sensor_data("sensor/air", {'mp905': 1})
+    assert logger.active_recordings["sensor/air"][1].rows_written == 1
+    logger.stop_recording()
+
+def test_quiet_topic_is_flushed_by_time(logger, monkeypatch):
+    monkeypatch.setattr(cfg, 'SENSOR_FLUSH_SECONDS', 0.2)
+    logger.start_recording()
+    logger.save_sensor_data("sensor/air", {'mp905': 1})
+    writer = logger.active_recordings["sensor/air"][1]
+    assert writer.rows_written == 0
+    # 다음 행이 오지 않아도 주기적 확인으로 기록
+    deadline = time.monotonic() + 5.0
+    while writer.rows_written == 0:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    with open(writer.path, newline="") as f:
+        assert len(list(csv.reader(f))) == 2
+    logger.stop_recording()
+    assert logger._flusher is None
+
+def test_parquet_output(monkeypatch, tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(cfg, 'SENSOR_FILE_FORMAT', 'parquet')
+    logger = SensorDataLogger()
+    logger.start_recording()
+    for i in range(150):
+        logger.save_sensor_data("sensor/air", {'mp905': i, 'ens160': None})
+    logger.stop_recording()
+
+    [path] = recorded_files("air")
+    assert path.endswith(".parquet")
+    table = pq.read_table(path)
+    assert table.num_rows == 150 and table.column_names == logger.columns
+    assert table.column('mp905').to_pylist()[-1] == 149.0
+    assert table.column('ens160').null_count == 150
+
+def test_parquet_falls_back_to_csv(monkeypatch):
+    monkeypatch.setattr(sensor_writer, 'pa', None)
+    assert sensor_writer.sensor_writer_class('parquet') is sensor_writer.CSVTopicWriter
+
+def test_pretrigger_history_is_recorded(logger, monkeypatch):
+    monkeypatch.setattr(cfg, 'SENSOR_PRETRIGGER_SECONDS', 60.0)
+    for i in range(3):
+        logger.save_sensor_data("sensor/air", {'mp905': i})  # 녹화 전: 파일 없이 메모리에만 보관
+    assert logger.active_recordings == {}
+    assert logger.store.latest("sensor/air")['mp905'] == 2.0
+    logger.start_recording()
+    logger.save_sensor_data("sensor/air", {'mp905': 3})
+    logger.stop_recording()
+
+    [path] = recorded_files("air")
+    with open(path, newline="") as f:
+        rows = list(csv.reader(f))[1:]
+    assert [float(row[1]) for row in rows] == [0.0, 1.0, 2.0, 3.0]
+    assert rows[0][2] == ""
@@ -0,0 +1,35 @@
+import numpy as np
+from client.core.sensor_store import SensorStore
+
+CHANNELS = ['mp905', 'sgp30']
+
+def filled_store(rows, capacity=100):
+    store = SensorStore(CHANNELS, capacity)
+    for i in range(rows):
+        store.append("sensor/air", 1000 + i * 100, {'mp905': i, 'sgp30': None if i % 2 else 'n/a' if i == 4 else i * 10})
+    return store
+
+def test_latest_and_missing_values():
+    store = filled_store(5)
+    assert store.latest("sensor/air") == {'timestamp': 1400, 'mp905': 4.0, 'sgp30': None}  # 숫자가 아니면 값 없음
+    assert store.latest("sensor/unknown") is None
+
+def test_window_aggregate_after_wraparound():
+    store = filled_store(250)  # 용량 100: 150~249번 행만 보관
+    timestamps, values = store.window("sensor/air")
+    assert len(timestamps) == 100 and timestamps[0] == 1000 + 150 * 100
+    assert (np.diff(timestamps) > 0).all()
+
+    stats = store.aggregate("sensor/air", 1000 + 200 * 100, 1000 + 209 * 100)
+    assert stats['mp905'] == {'count': 10, 'min': 200.0, 'max': 209.0, 'mean': 204.5}
+    assert stats['sgp30']['count'] == 5 and stats['sgp30']['max'] == 2080.0
+    assert store.aggregate("sensor/air", 0, 10)['mp905'] == {'count': 0, 'min': None, 'max': None, 'mean': None}
+
+def test_downsample_bucket_means():
+    store = filled_store(10)
+    starts, means = store.downsample("sensor/air", 1000, 1999, 500)
+    assert starts.tolist() == [1000, 1500]
+    assert means[:, 0].tolist() == [2.0, 7.0]
+    assert means[0, 1] == 10.0  # 0, 20, 'n/a'(4) 중 숫자 값 평균
+    starts, means = store.downsample("sensor/air", 5000, 5999, 500)
+    assert np.isnan(means).all()
@@ -0,0 +1,26 @@
+import time
+from client.core.server_registry import ServerRegistry
+
+def test_presence_registers_and_offline_removes():
+    registry = ServerRegistry(timeout=10.0)
+    assert registry.seen("10.0.0.2", {'codec': 'mjpeg'}, heartbeat=True)
+    assert not registry.seen("10.0.0.2", heartbeat=True)
+    assert registry.remove("10.0.0.2")
+    assert "10.0.0.2" not in registry
+
+def test_only_heartbeat_servers_expire():
+    registry = ServerRegistry(timeout=0.05)
+    registry.seen("10.0.0.2", heartbeat=True)
+    registry.seen("10.0.0.3")  # 폴링으로만 발견된 서버
+    time.sleep(0.1)
+    assert registry.expire() == ["10.0.0.2"]
+    assert "10.0.0.3" in registry
+
+def test_discovery_to_first_frame_latency():
+    registry = ServerRegistry()
+    registry.seen("10.0.0.2", heartbeat=True)
+    entry = registry.servers["10.0.0.2"]
+    registry.first_frame("10.0.0.2", entry.discovered_at + 0.5)
+    registry.first_frame("10.0.0.2", entry.discovered_at + 9.0)  # 첫 기록만 유지
+    assert abs(entry.discovery_latency - 0.5) < 1e-9
+    assert registry.stats()[0]['discovery_latency'] == entry.discovery_latency
@@ -0,0 +1,57 @@
+import os
+import time
+import numpy as np
+import pytest
+import config as cfg
+from client.core.sensor_logger import SensorDataLogger
+from client.core.session_manifest import RecordingSession
+from client.core.video_recorder import VideoRecorder
+
+def test_frames_and_sensor_rows_share_session(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(cfg, 'SENSOR_FLUSH_ROWS', 2)
+    logger = SensorDataLogger()
+    recorder = VideoRecorder("test-session")
+    recorder.backend = 'mjpeg'
+    logger.start_recording("20250101_000000.000")
+    recorder.start_recording("20250101_000000.000")
+    for i in range(6):
+        logger.save_sensor_data("sensor/air", {'mp905': i, 'fermion': 'é' if i == 2 else None})
+        recorder.write_encoded(b'\xff\xd8jpeg\xff\xd9', True, time.time(), i)
+        time.sleep(0.01)
+    recorder.stop_recording()
+    logger.stop_recording()
+
+    assert RecordingSession.list() == ["20250101_000000.000"]
+    session = RecordingSession("20250101_000000.000")
+    assert session.cameras == ["test-session"] and session.topics == ["sensor/air"]
+    frames = session.frames("test-session", 0, 2 ** 62)
+    assert [position for _, _, position in frames] == list(range(6))
+    assert os.path.exists(frames[0][1]) and "-" in os.path.basename(frames[0][1])  # 닫힌 뒤 바뀐 이름
+    for i, (timestamp_ms, _, _) in enumerate(frames):
+        row = session.sensors_for_frame("test-session", timestamp_ms)["sensor/air"]
+        assert row['mp905'] == str(i)  # ASCII가 아닌 값 이후의 행도 바이트 오프셋으로 정확히 읽음
+    rows = session.sensor_rows("sensor/air", frames[1][0] + 1, frames[3][0])
+    assert [row['mp905'] for row in rows] == ['2', '3']
+    assert rows[0]['fermion'] == 'é'
+    assert session.sensor_at("sensor/air", frames[0][0] - 1000) is None
+
+def test_cfr_index_points_at_first_copy(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    recorder = VideoRecorder("test-session-cfr")
+    recorder.fps = 30.0
+    recorder.frame_policy = 'cfr'
+    recorder.encoder_process = False
+    recorder.queue_size = 1000
+    recorder.start_recording("20250101_000001.000")
+    frame = np.zeros((48, 64, 3), np.uint8)
+    for i in range(10):
+        recorder.update_frame(frame, 1000.0 + i / 15)
+    recorder.stop_recording()
+
+    session = RecordingSession("20250101_000001.000")
+    frames = session.frames("test-session-cfr", 1000000, 1000210)
+    assert [position for _, _, position in frames] == [0, 2, 4, 6]  # 15fps 입력은 30fps 파일에서 두 칸씩
+    assert session.frame_at("test-session-cfr", 1000100)[2] == 2  # 1000067ms 프레임이 1000100ms에도 표시됨
+    with pytest.raises(KeyError):
+        session.frames("unknown", 0, 1)
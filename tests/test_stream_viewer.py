@@ -0,0 +1,29 @@
+import cv2
+import numpy as np
+import config as cfg
+from client.core.stream_viewer import StreamViewer, reduced_scale
+
+def test_reduced_scale_keeps_target_width():
+    assert reduced_scale(1920, 960) == 2
+    assert reduced_scale(1920, 400) == 4
+    assert reduced_scale(1920, 240) == 8
+    assert reduced_scale(1920, 1280) == 1
+    assert reduced_scale(640, 960) == 1
+
+def test_only_display_frames_are_decoded_when_not_recording():
+    viewer = StreamViewer("test-display")
+    viewer.display_interval = 4
+    viewer.source_width = 1920
+    decode = [viewer.accept_frame(0, seq, None, b'') for seq in range(8)]
+    assert decode == [False, False, False, True] * 2
+    assert viewer.frames_skipped == 6
+    assert viewer.decode_scale == reduced_scale(1920, cfg.DISPLAY_WIDTH)
+
+def test_reduced_decode_size():
+    viewer = StreamViewer("test-decode")
+    ok, jpeg = cv2.imencode('.jpg', np.zeros((1080, 1920, 3), np.uint8))
+    assert ok
+    frame = viewer.decode(jpeg.tobytes(), 4)
+    assert frame.shape == (270, 480, 3)
+    assert viewer.source_width == 1920
+    assert viewer.frames_decoded == 1
@@ -0,0 +1,77 @@
+import threading
+import time
+from server.frame_sources import FrameSource
+from server.supervisor import CaptureSupervisor
+
+class _Collector:
+    def __init__(self):
+        self.frames = []
+
+    def publish(self, frame):
+        self.frames.append(frame)
+
+class _EndingSource(FrameSource):
+    """매 실행마다 프레임 3개를 내보낸 뒤 종료되는 소스"""
+
+    def __init__(self):
+        self.starts = 0
+        self._remaining = 0
+
+    def start(self):
+        self.starts += 1
+        self._remaining = 3
+
+    def read(self):
+        if self._remaining == 0:
+            return None
+        self._remaining -= 1
+        time.sleep(0.001)
+        return [b'\xff\xd8frame\xff\xd9']
+
+class _StallingSource(FrameSource):
+    """프레임 하나를 보낸 뒤 stop()이 호출될 때까지 멈추는 소스"""
+
+    def __init__(self):
+        self.starts = 0
+        self._sent = False
+        self._stopped = threading.Event()
+
+    def start(self):
+        self.starts += 1
+        self._sent = False
+        self._stopped.clear()
+
+    def read(self):
+        if not self._sent:
+            self._sent = True
+            return [b'\xff\xd8frame\xff\xd9']
+        self._stopped.wait()
+        return None
+
+    def stop(self):
+        self._stopped.set()
+
+def _run(supervisor, until, timeout=3.0):
+    thread = threading.Thread(target=supervisor.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + timeout
+    while not until() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    supervisor.stop()
+    thread.join(timeout=1.0)
+
+def test_restarts_ended_source_and_keeps_sequence():
+    source, sink = _EndingSource(), _Collector()
+    supervisor = CaptureSupervisor(source, sink, stall_timeout=0, backoff_initial=0.01)
+    _run(supervisor, lambda: source.starts >= 3)
+    assert supervisor.restarts >= 2
+    sequences = [f.sequence for f in sink.frames]
+    assert sequences == list(range(len(sequences)))
+    assert supervisor.time_to_first_frame is not None
+
+def test_watchdog_restarts_stalled_source():
+    source, sink = _StallingSource(), _Collector()
+    supervisor = CaptureSupervisor(source, sink, stall_timeout=0.2, backoff_initial=0.01)
+    _run(supervisor, lambda: source.starts >= 2)
+    assert supervisor.stalls >= 1
+    assert source.starts >= 2
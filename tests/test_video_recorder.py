@@ -0,0 +1,192 @@
+import os
+import cv2
+import time
+import threading
+import numpy as np
+from client.core.video_recorder import VideoRecorder
+from client.core.segment_manifest import SegmentManifest
+
+def record(monkeypatch, tmp_path, server_ip, source_fps, policy, seconds=1.0):
+    """source_fps 간격의 캡처 시각을 가진 프레임을 녹화하고 파일 통계 반환"""
+    monkeypatch.chdir(tmp_path)
+    recorder = VideoRecorder(server_ip)
+    recorder.fps = 30.0
+    recorder.frame_policy = policy
+    recorder.queue_size = 1000  # 프레임을 한꺼번에 넣으므로 인코더 시작 전에 폐기되지 않도록
+    recorder.start_recording()
+    frame = np.zeros((48, 64, 3), np.uint8)
+    start = 1000.0
+    for i in range(int(seconds * source_fps)):
+        recorder.update_frame(frame, start + i / source_fps)
+    recorder.stop_recording()
+    return recorder.last_segment_stats, os.listdir(tmp_path / "Data" / "cam" / server_ip)
+
+def test_cfr_duplicates_slow_source(monkeypatch, tmp_path):
+    stats, _ = record(monkeypatch, tmp_path, "test-cfr-slow", 15, 'cfr')
+    assert stats['received'] == 15
+    assert stats['duplicated'] == 14
+    assert stats['frames'] == 29  # 1초 분량 (마지막 프레임 구간 제외)
+
+def test_cfr_drops_fast_source(monkeypatch, tmp_path):
+    stats, _ = record(monkeypatch, tmp_path, "test-cfr-fast", 60, 'cfr')
+    assert stats['received'] == 60
+    assert stats['dropped'] == 29
+    assert stats['frames'] == 31  # 0~30번 슬롯
+
+def test_vfr_writes_every_frame_with_timecodes(monkeypatch, tmp_path):
+    stats, files = record(monkeypatch, tmp_path, "test-vfr", 15, 'vfr')
+    assert stats['frames'] == 15 and stats['duplicated'] == 0
+    video = [f for f in files if f.endswith(".mp4")][0]
+    timecodes = video[:-len(".mp4")] + ".timecodes.txt"
+    assert timecodes in files
+    with open(tmp_path / "Data" / "cam" / "test-vfr" / timecodes) as f:
+        lines = f.read().splitlines()
+    assert lines[0] == "# timecode format v2"
+    assert abs(float(lines[2]) - 1000 / 15) < 1e-3
+
+def test_rotation_keeps_every_frame(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    recorder = VideoRecorder("test-rotate")
+    recorder.fps = 30.0
+    recorder.frame_policy = 'cfr'
+    recorder.segment_seconds = 0.5
+    recorder.queue_size = 1000
+    recorder.start_recording()
+    frame = np.zeros((48, 64, 3), np.uint8)
+    for i in range(45):
+        recorder.update_frame(frame, 1000.0 + i / 30)
+    recorder.stop_recording()
+    entries = recorder.find_segments(0, 2000000)
+    assert len(entries) == 3
+    assert sum(entry[2] for entry in entries) == 45
+    assert all(os.path.exists(tmp_path / "Data" / "cam" / "test-rotate" / entry[4]) for entry in entries)
+    assert [entry[0] for entry in recorder.find_segments(1000600, 1000700)] == [1000500]
+
+def test_passthrough_rotation_at_keyframes(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    recorder = VideoRecorder("test-rotate-mjpeg")
+    recorder.backend = 'mjpeg'
+    recorder.segment_seconds = 0.5
+    recorder.start_recording()
+    for i in range(30):
+        recorder.write_encoded(b'\xff\xd8jpeg\xff\xd9', True, 1000.0 + i / 30, i)
+    recorder.stop_recording()
+    entries = recorder.find_segments(0, 2000000)
+    assert [entry[2] for entry in entries] == [15, 15]
+    assert entries[1][0] == 1000500
+
+def test_manifest_is_created_once_across_threads(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    recorder = VideoRecorder("test-manifest-threads")
+    created = []
+    original = SegmentManifest.__init__
+
+    def slow_init(self, directory):
+        created.append(self)
+        time.sleep(0.05)  # 두 스레드가 동시에 처음 사용하도록 생성 구간을 늘림
+        original(self, directory)
+
+    monkeypatch.setattr(SegmentManifest, '__init__', slow_init)
+    threads = [threading.Thread(target=lambda: recorder.manifest) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1
+
+def test_stop_does_not_hold_lock_while_closing_writer(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    recorder = VideoRecorder("test-stop-lock")
+    recorder.backend = 'mjpeg'
+    recorder.start_recording()
+    recorder.write_encoded(b'\xff\xd8jpeg\xff\xd9', True, 1000.0, 0)
+    releasing, finish = threading.Event(), threading.Event()
+    writer = recorder.encoded_writer
+    original_release = writer.release
+
+    def slow_release():
+        releasing.set()
+        finish.wait(2.0)  # ffmpeg 종료 대기처럼 오래 걸리는 닫기
+        original_release()
+
+    writer.release = slow_release
+    stopper = threading.Thread(target=recorder.stop_recording)
+    stopper.start()
+    assert releasing.wait(1.0)
+    started = time.monotonic()
+    recorder.write_encoded(b'\xff\xd8jpeg\xff\xd9', True, 1000.1, 1)  # 수신 스레드는 막히지 않음
+    assert time.monotonic() - started < 0.5
+    finish.set()
+    stopper.join()
+    assert [entry[2] for entry in recorder.find_segments(0, 2000000)] == [1]
+
+def test_dead_encoder_process_is_restarted(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    recorder = VideoRecorder("test-encoder-restart")
+    recorder.encoder_process = True
+    recorder.segment_seconds = 0.5
+    recorder.queue_size = 1000
+    starts = []
+    original_start = recorder._start_encoder_process
+    monkeypatch.setattr(recorder, '_start_encoder_process', lambda: (starts.append(1), original_start()))
+    recorder.start_recording()
+    frame = np.zeros((48, 64, 3), np.uint8)
+    recorder.update_frame(frame.copy(), 1000.0)
+    deadline = time.monotonic() + 30.0
+    while recorder._encoder_process is None or recorder.writer is None:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    first = recorder._encoder_process
+    first._process.kill()
+    first._process.join()
+    # 죽은 프로세스에 쓰다가 실패하면 파일을 닫고, 다음 파일은 새 인코더 프로세스로 기록
+    for i in range(1, 30):
+        recorder.update_frame(frame.copy(), 1000.0 + i / 30)
+    recorder.stop_recording()
+    assert len(starts) == 2
+    assert any(entry[0] >= 1000500 for entry in recorder.find_segments(0, 2000000))
+
+def test_preroll_jpeg_queue_is_bounded(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    recorder = VideoRecorder("test-preroll-bound")
+    recorder.preroll_queue_bytes = 250
+    recorder.is_recording = True  # 녹화 스레드 없이 대기열만 확인
+    for i in range(5):
+        recorder.add_preroll_jpeg(bytes(100), 1000.0 + i)
+    assert [timestamp for timestamp, _ in recorder._preroll] == [1003.0, 1004.0]
+    assert recorder._preroll_bytes == 200 and recorder.segment_stats['queue_dropped'] == 3
+    recorder.is_recording = False
+
+def test_preroll_jpeg_is_recorded_before_live_frames(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    recorder = VideoRecorder("test-preroll-record")
+    recorder.frame_policy = 'vfr'
+    recorder.queue_size = 1000
+    recorder.start_recording()
+    ok, jpeg = cv2.imencode('.jpg', np.zeros((48, 64, 3), np.uint8))
+    for i in range(10):
+        recorder.add_preroll_jpeg(jpeg.tobytes(), 1000.0 + i / 30)
+    recorder.add_preroll_jpeg(b'not a jpeg', 1000.0 + 10 / 30)  # 손상된 프레임은 건너뜀
+    frame = np.zeros((48, 64, 3), np.uint8)
+    for i in range(11, 20):
+        recorder.update_frame(frame.copy(), 1000.0 + i / 30)
+    recorder.stop_recording()
+    entries = recorder.find_segments(0, 2000000)
+    assert [(entry[0], entry[2]) for entry in entries] == [(1000000, 19)]
+
+def test_cfr_gap_starts_new_segment(monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    recorder = VideoRecorder("test-cfr-gap")
+    recorder.fps = 30.0
+    recorder.frame_policy = 'cfr'
+    recorder.max_gap_seconds = 2.0
+    recorder.queue_size = 1000
+    recorder.start_recording()
+    frame = np.zeros((48, 64, 3), np.uint8)
+    for start in (1000.0, 1030.0):  # 30초 끊겼다가 재연결
+        for i in range(15):
+            recorder.update_frame(frame.copy(), start + i / 30)
+    recorder.stop_recording()
+    entries = recorder.find_segments(0, 2000000)
+    # 빈 30초를 직전 프레임 900장으로 채우지 않고 새 파일에서 이어서 기록
+    assert [(entry[0], entry[2]) for entry in entries] == [(1000000, 15), (1030000, 15)]